@@ -1,145 +1,137 @@
 import os
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import List, Optional
 
-import pdfplumber
+import numpy as np
 import pandas as pd
-from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5 import QtCore, QtWidgets
 
+from cargo_manifest import ExtractionCancelled
+from compare_session import RUN_FULL, CompareSession
+from export_ui import ExportThread, ask_export_path, save_trace
+from extraction_cache import default_cache
+from record_store import default_records
+from tracing import Trace, profile_mode
 
-@dataclass
-class SelectedFiles:
-    parent_1: Optional[str] = None
-    parent_2: Optional[str] = None
-    child: Optional[str] = None
-
-    def all_selected(self) -> bool:
-        return bool(self.parent_1 and self.parent_2 and self.child)
-
-
-def clean_cell(value):
-    if isinstance(value, str):
-        return value.replace("\\n", " ").replace("\n", " ").strip()
-    return value
-
-
-def extract_tables_from_page(page) -> List[pd.DataFrame]:
-    tables = page.extract_tables() or []
-    dfs: List[pd.DataFrame] = []
-
-    for tbl in tables:
-        if not tbl or len(tbl) < 2:
-            continue
-        header = [str(h).strip() if h is not None else "" for h in tbl[0]]
-        rows = tbl[1:]
-        dfs.append(pd.DataFrame(rows, columns=header))
-
-    return dfs
-
-
-def extract_all_tables(pdf_path: str) -> pd.DataFrame:
-    all_dfs: List[pd.DataFrame] = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            all_dfs.extend(extract_tables_from_page(page))
-
-    if not all_dfs:
-        return pd.DataFrame()
-
-    df = pd.concat(all_dfs, ignore_index=True)
-    df = df.apply(lambda col: col.map(clean_cell))
-    return df
-
-
-def rename_columns_parent(df: pd.DataFrame) -> pd.DataFrame:
-    rename: Dict[str, str] = {}
-
-    if "HAWB\nNumber" in df.columns:
-        rename["HAWB\nNumber"] = "HAWB"
-
-    if "Origin" not in df.columns:
-        origin_candidates = [c for c in df.columns if "origin" in str(c).lower()]
-        if len(origin_candidates) == 1:
-            rename[origin_candidates[0]] = "Origin"
 
-    return df.rename(columns=rename)
+# Preview column sizing (pixels / rows measured).
+COLUMN_WIDTH_SAMPLE_ROWS = 200
+COLUMN_PADDING = 32
+MAX_COLUMN_WIDTH = 420
 
 
-def rename_columns_child(df: pd.DataFrame) -> pd.DataFrame:
-    rename: Dict[str, str] = {}
-
-    if "HAWB\nShipment" in df.columns:
-        rename["HAWB\nShipment"] = "HAWB"
-
-    if "Secondary Tracking Numbers" in df.columns:
-        rename["Secondary Tracking Numbers"] = "secondary"
-
-    return df.rename(columns=rename)
-
-
-def ensure_required_columns(df_parent: pd.DataFrame, df_child: pd.DataFrame) -> Tuple[bool, str]:
-    if "HAWB" not in df_parent.columns:
-        return False, "No 'HAWB' column found in Parent manifests."
-    if not df_child.empty and "HAWB" not in df_child.columns:
-        return False, "No 'HAWB' column found in Child manifest."
-    return True, ""
-
-
-def merge_parent_child(df_parent: pd.DataFrame, df_child: pd.DataFrame) -> pd.DataFrame:
-    if df_child.empty:
-        df_parent = df_parent.copy()
-        if "secondary" not in df_parent.columns:
-            df_parent["secondary"] = ""
-        return df_parent
-
-    df_merged = pd.merge(df_parent, df_child, on="HAWB", how="left", suffixes=("_parent", "_child"))
-    if "secondary" not in df_merged.columns:
-        df_merged["secondary"] = ""
-    return df_merged
-
-
-def expand_secondary_to_master_baby(df: pd.DataFrame) -> pd.DataFrame:
-    final_rows: List[dict] = []
+@dataclass
+class SelectedFiles:
+    parents: List[str] = field(default_factory=list)
+    children: List[str] = field(default_factory=list)
 
-    for _, row in df.iterrows():
-        row_dict = row.to_dict()
-        sec_str = row_dict.get("secondary", "") or ""
-        if pd.isna(sec_str):
-            sec_str = ""
+    def all_selected(self) -> bool:
+        return bool(self.parents and self.children)
 
-        secondary_list = [s.strip() for s in str(sec_str).split(",") if s.strip()]
+    def copy(self) -> "SelectedFiles":
+        return SelectedFiles(list(self.parents), list(self.children))
 
-        master = row_dict.copy()
-        master["Type"] = "Master"
-        final_rows.append(master)
 
-        for sec in secondary_list:
-            baby = row_dict.copy()
-            baby["Type"] = "Baby"
-            baby["HAWB"] = sec
-            final_rows.append(baby)
+class ManifestTableModel(QtCore.QAbstractTableModel):
+    """
+    Read-only model over a DataFrame's columns as NumPy arrays. Cells are
+    formatted only when the view asks for them, so the cost of showing a
+    frame doesn't grow with its row count.
+    """
 
-    return pd.DataFrame(final_rows)
+    def __init__(self, df: Optional[pd.DataFrame] = None, parent=None):
+        super().__init__(parent)
+        self._headers: List[str] = []
+        self._columns: List[np.ndarray] = []
+        self._rows = 0
+        if df is not None:
+            self.set_df(df)
+
+    def set_df(self, df: pd.DataFrame):
+        self.beginResetModel()
+        self._headers = [str(c) for c in df.columns]
+        self._columns = [df.iloc[:, i].to_numpy(dtype=object) for i in range(df.shape[1])]
+        self._rows = len(df.index)
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def cell_text(self, row: int, column: int) -> str:
+        value = self._columns[column][row]
+        return "" if pd.isna(value) else str(value)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        return self.cell_text(index.row(), index.column())
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
+    def sample_rows(self, count: int) -> np.ndarray:
+        """Row numbers to measure when sizing columns: the top of the table plus an even spread."""
+        if self._rows <= count:
+            return np.arange(self._rows)
+        head = np.arange(count // 2)
+        spread = np.linspace(count // 2, self._rows - 1, count - count // 2).astype(int)
+        return np.unique(np.concatenate([head, spread]))
+
+
+class MergeManifestsThread(QtCore.QThread):
+    progress = QtCore.pyqtSignal(str, int, int)  # (message, pages_done, pages_total)
+    finished = QtCore.pyqtSignal(object, str)  # (df_or_none, error_message)
+    cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, files: SelectedFiles, session: CompareSession, parent=None):
+        super().__init__(parent)
+        self.files = files
+        self.session = session
+        self.trace = Trace("compare", profile=profile_mode())
+        self.trace.info["files"] = {"parents": list(files.parents), "children": list(files.children)}
+        self._labels = [f"Parent {os.path.basename(p)}" for p in files.parents]
+        self._labels += [f"Child {os.path.basename(p)}" for p in files.children]
+        self._file_pages = [0] * len(self._labels)
+        self._file_totals = [0] * len(self._labels)
+
+    def _on_progress(self, file_index: int, pages_done: int, pages_total: int):
+        self._file_pages[file_index] = pages_done
+        self._file_totals[file_index] = pages_total
+        self.progress.emit(
+            f"{self._labels[file_index]}: page {pages_done}/{pages_total}",
+            sum(self._file_pages),
+            sum(self._file_totals),
+        )
 
+    def _on_stage(self, message: str):
+        done = sum(self._file_pages)
+        self.progress.emit(message, done, sum(self._file_totals))
 
-def select_final_columns(df: pd.DataFrame) -> pd.DataFrame:
-    parent_columns_order = [
-        "Origin",
-        "#",
-        "HAWB",
-        "Pcs",
-        "Weight",
-        "Shipper Details",
-        "Dest",
-        "Bill\nTerm",
-        "Consignee Details",
-        "Description\nof Goods",
-        "Total\nValue",
-        "Total\nValue(LKR)",
-    ]
-    final_cols = parent_columns_order + ["Type"]
-    existing = [c for c in final_cols if c in df.columns]
-    return df[existing].copy()
+    def run(self):
+        try:
+            with self.trace:
+                df = self.session.run(
+                    self.files.parents,
+                    self.files.children,
+                    on_progress=self._on_progress,
+                    is_cancelled=self.isInterruptionRequested,
+                    on_stage=self._on_stage,
+                    cache=default_cache(),
+                    trace=self.trace,
+                    records=default_records(),
+                )
+            self.finished.emit(df, "")
+        except ExtractionCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.finished.emit(None, str(e))
 
 
 class CompareCargoPage(QtWidgets.QWidget):
@@ -147,6 +139,13 @@ class CompareCargoPage(QtWidgets.QWidget):
         super().__init__(parent)
         self.files = SelectedFiles()
         self.df_final: Optional[pd.DataFrame] = None
+        self.thread: Optional[MergeManifestsThread] = None
+        self.export_thread: Optional[ExportThread] = None
+        # Stage timings of the last run (and of its export), for Save Timings.
+        self.trace: Optional[Trace] = None
+        self.model = ManifestTableModel(parent=self)
+        # Keeps the parsed parents between runs, so a new child re-merges only what changed.
+        self.session = CompareSession()
 
         self.setupUi(self)
         self._wire_events()
@@ -155,14 +154,16 @@ class CompareCargoPage(QtWidgets.QWidget):
     def _set_initial_state(self):
         self.btn_run.setEnabled(False)
         self.btn_download.setEnabled(False)
-        self._set_status("Select 2 Parent PDFs + 1 Child PDF to continue.")
+        self.btn_timings.setEnabled(False)
+        self._set_status("Select the Parent PDFs and Child PDFs to continue.")
 
     def _wire_events(self):
-        self.btn_parent1.clicked.connect(lambda: self._select_pdf("parent_1"))
-        self.btn_parent2.clicked.connect(lambda: self._select_pdf("parent_2"))
-        self.btn_child.clicked.connect(lambda: self._select_pdf("child"))
+        self.btn_parents.clicked.connect(lambda: self._select_pdfs("parents"))
+        self.btn_children.clicked.connect(lambda: self._select_pdfs("children"))
         self.btn_run.clicked.connect(self.run_merge)
+        self.btn_cancel.clicked.connect(self.cancel_merge)
         self.btn_download.clicked.connect(self.download_result)
+        self.btn_timings.clicked.connect(self.save_timings)
         self.btn_back.clicked.connect(self.on_back)
 
     def setupUi(self, parent):
@@ -206,9 +207,8 @@ class CompareCargoPage(QtWidgets.QWidget):
         files_layout.setContentsMargins(18, 18, 18, 18)
         files_layout.setSpacing(12)
 
-        self._make_row(files_layout, "Parent PDF 1", "btn_parent1", "lbl_p1")
-        self._make_row(files_layout, "Parent PDF 2", "btn_parent2", "lbl_p2")
-        self._make_row(files_layout, "Child Manifest", "btn_child", "lbl_child")
+        self._make_row(files_layout, "Parent PDFs", "btn_parents", "lbl_parents")
+        self._make_row(files_layout, "Child Manifests", "btn_children", "lbl_children")
 
         root.addWidget(card_files)
 
@@ -227,10 +227,23 @@ class CompareCargoPage(QtWidgets.QWidget):
         self.tableView.verticalHeader().setVisible(False)
         self.tableView.setShowGrid(False)
 
+        # Fixed row heights and sampled column widths keep large previews instant.
+        self.tableView.setWordWrap(False)
+        self.tableView.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.tableView.setModel(self.model)
+
+        self.progress = QtWidgets.QProgressBar(card_table)
+        self.progress.setVisible(False)
+        self.progress.setTextVisible(False)
+        self.progress.setFixedHeight(10)
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+
         self.lbl_status = QtWidgets.QLabel("", card_table)
         self.lbl_status.setObjectName("Status")
 
         table_layout.addWidget(self.tableView)
+        table_layout.addWidget(self.progress)
         table_layout.addWidget(self.lbl_status)
 
         root.addWidget(card_table, 1)
@@ -238,15 +251,27 @@ class CompareCargoPage(QtWidgets.QWidget):
         actions = QtWidgets.QHBoxLayout()
         actions.setSpacing(12)
 
-        self.btn_download = QtWidgets.QPushButton("Download Excel", parent)
+        self.btn_download = QtWidgets.QPushButton("Download Result", parent)
         self.btn_download.setMinimumHeight(44)
         self.btn_download.setObjectName("Secondary")
 
+        self.btn_timings = QtWidgets.QPushButton("Save Timings", parent)
+        self.btn_timings.setMinimumHeight(44)
+        self.btn_timings.setObjectName("Secondary")
+        self.btn_timings.setToolTip("Save the stage timings of the last run as JSON")
+
+        self.btn_cancel = QtWidgets.QPushButton("Cancel", parent)
+        self.btn_cancel.setMinimumHeight(44)
+        self.btn_cancel.setObjectName("Secondary")
+        self.btn_cancel.setVisible(False)
+
         self.btn_run = QtWidgets.QPushButton("Run", parent)
         self.btn_run.setMinimumHeight(44)
 
+        actions.addWidget(self.btn_timings)
         actions.addStretch(1)
         actions.addWidget(self.btn_download)
+        actions.addWidget(self.btn_cancel)
         actions.addWidget(self.btn_run)
 
         root.addLayout(actions)
@@ -259,7 +284,7 @@ class CompareCargoPage(QtWidgets.QWidget):
         lbl.setFixedWidth(140)
         lbl.setStyleSheet("color: #CFCFCF; font-weight: 600;")
 
-        btn = QtWidgets.QPushButton("Select PDF")
+        btn = QtWidgets.QPushButton("Select PDFs")
         btn.setMinimumHeight(40)
 
         name = QtWidgets.QLabel("")
@@ -276,119 +301,166 @@ class CompareCargoPage(QtWidgets.QWidget):
         setattr(self, btn_attr, btn)
         setattr(self, lbl_attr, name)
 
-    def _set_status(self, text: str):
+    def _set_status(self, text: str, details: str = ""):
         self.lbl_status.setText(text)
+        self.lbl_status.setToolTip(details)
 
-    def _select_pdf(self, which: str):
-        file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
-            self, "Select PDF", "", "PDF Files (*.pdf);;All Files (*)"
+    def _select_pdfs(self, which: str):
+        """Replaces the parent or child file list with a multi-selection."""
+        file_paths, _ = QtWidgets.QFileDialog.getOpenFileNames(
+            self, "Select PDFs", "", "PDF Files (*.pdf);;All Files (*)"
         )
-        if not file_path:
+        if not file_paths:
             return
 
-        base = os.path.basename(file_path)
-
-        if which == "parent_1":
-            self.files.parent_1 = file_path
-            self.lbl_p1.setText(base)
-            self.lbl_p1.setToolTip(file_path)
-        elif which == "parent_2":
-            self.files.parent_2 = file_path
-            self.lbl_p2.setText(base)
-            self.lbl_p2.setToolTip(file_path)
-        elif which == "child":
-            self.files.child = file_path
-            self.lbl_child.setText(base)
-            self.lbl_child.setToolTip(file_path)
-
-        self._set_status(f"Selected: {base}")
+        names = [os.path.basename(p) for p in file_paths]
+        if len(names) == 1:
+            text = names[0]
+        else:
+            text = f"{len(names)} files: {', '.join(names[:3])}" + (", …" if len(names) > 3 else "")
+
+        label = self.lbl_parents if which == "parents" else self.lbl_children
+        setattr(self.files, which, list(file_paths))
+        label.setText(text)
+        label.setToolTip("\n".join(file_paths))
+
+        self._set_status(f"Selected: {text}")
         self.btn_run.setEnabled(self.files.all_selected())
 
+    def _set_busy(self, busy: bool):
+        for btn in (self.btn_parents, self.btn_children):
+            btn.setEnabled(not busy)
+        self.btn_run.setEnabled((not busy) and self.files.all_selected())
+        self.btn_download.setEnabled((not busy) and self.df_final is not None and not self.df_final.empty)
+        self.btn_timings.setEnabled((not busy) and self.trace is not None)
+        self.btn_cancel.setVisible(busy)
+        self.btn_cancel.setEnabled(busy)
+
+        self.progress.setVisible(busy)
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+
     def run_merge(self):
         if not self.files.all_selected():
-            QtWidgets.QMessageBox.warning(self, "Missing Files", "Please select all required PDFs.")
+            QtWidgets.QMessageBox.warning(
+                self, "Missing Files", "Please select at least one Parent PDF and one Child PDF."
+            )
+            return
+        if self.thread is not None and self.thread.isRunning():
             return
 
+        self.df_final = None
+        self.trace = None
         self._set_status("Processing PDFs…")
-        QtWidgets.QApplication.processEvents()
-
-        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
-        try:
-            df_p1 = extract_all_tables(self.files.parent_1)
-            df_p2 = extract_all_tables(self.files.parent_2)
-            df_parent = (
-                pd.concat([df_p1, df_p2], ignore_index=True)
-                if not df_p1.empty or not df_p2.empty
-                else pd.DataFrame()
-            )
-
-            df_child = extract_all_tables(self.files.child)
-
-            if df_parent.empty:
-                QtWidgets.QMessageBox.critical(self, "Error", "Parent PDFs produced no data.")
-                self._set_status("Parent PDFs produced no data.")
-                return
-
-            df_parent = rename_columns_parent(df_parent)
-            df_child = rename_columns_child(df_child)
-
-            ok, msg = ensure_required_columns(df_parent, df_child)
-            if not ok:
-                QtWidgets.QMessageBox.critical(self, "Error", msg)
-                self._set_status(f"Error: {msg}")
-                return
-
-            df_merged = merge_parent_child(df_parent, df_child)
-            df_expanded = expand_secondary_to_master_baby(df_merged)
-            self.df_final = select_final_columns(df_expanded)
+        self._set_busy(True)
+
+        self.thread = MergeManifestsThread(self.files.copy(), self.session, parent=self)
+        self.thread.progress.connect(self.on_merge_progress)
+        self.thread.finished.connect(self.on_merge_finished)
+        self.thread.cancelled.connect(self.on_merge_cancelled)
+        self.thread.start()
+
+    def cancel_merge(self):
+        if self.thread is not None and self.thread.isRunning():
+            self.thread.requestInterruption()
+            self.btn_cancel.setEnabled(False)
+            self._set_status("Cancelling…")
+
+    def on_merge_progress(self, message: str, pages_done: int, pages_total: int):
+        if pages_total:
+            self.progress.setValue(int(pages_done * 100 / pages_total))
+        self._set_status(message)
+
+    def on_merge_finished(self, df, error_message: str):
+        self.trace = self.thread.trace if self.thread is not None else None
+        self._set_busy(False)
+
+        if error_message:
+            QtWidgets.QMessageBox.critical(self, "Error", f"Processing failed:\n{error_message}")
+            self._set_status(f"Error: {error_message}")
+            return
 
+        self.df_final = df
+        with self.trace.stage("preview model", rows=len(df)):
             self._update_table_view(self.df_final)
-            self.btn_download.setEnabled(True)
-            self._set_status("Done. Click Download Excel to save.")
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Error", f"Processing failed:\n{e}")
-            self._set_status(f"Error: {e}")
-        finally:
-            QtWidgets.QApplication.restoreOverrideCursor()
-
-    def _update_table_view(self, df: pd.DataFrame):
-        model = QtGui.QStandardItemModel()
-        model.setHorizontalHeaderLabels([str(c) for c in df.columns])
+        self.btn_download.setEnabled(True)
+
+        done = "Done (parents reused)." if self.session.last_run != RUN_FULL else "Done."
+        report = self.session.report
+        if report is not None and report.duplicate_keys:
+            done = f"{done} {report.summary()}"
+        self._set_status(
+            f"{done} Click Download Result to save. {self.trace.summary()}", self.trace.details()
+        )
 
-        for _, row in df.iterrows():
-            items = []
-            for val in row.tolist():
-                item = QtGui.QStandardItem("" if pd.isna(val) else str(val))
-                item.setEditable(False)
-                items.append(item)
-            model.appendRow(items)
+    def on_merge_cancelled(self):
+        self._set_busy(False)
+        self._set_status("Cancelled.")
 
-        self.tableView.setModel(model)
+    def _update_table_view(self, df: pd.DataFrame):
+        self.model.set_df(df)
 
         # UX: better sizing/readability
         header = self.tableView.horizontalHeader()
         header.setStretchLastSection(True)
-        header.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
+        self._fit_columns()
+
+    def _fit_columns(self):
+        """Size columns from the header and a sample of rows instead of measuring every cell."""
+        metrics = self.tableView.fontMetrics()
+        rows = self.model.sample_rows(COLUMN_WIDTH_SAMPLE_ROWS)
+
+        for col in range(self.model.columnCount()):
+            texts = [self.model.headerData(col, QtCore.Qt.Horizontal)]
+            texts.extend(self.model.cell_text(r, col) for r in rows)
+            widest = max(metrics.horizontalAdvance(line) for t in texts for line in t.split("\n"))
+            self.tableView.setColumnWidth(col, min(widest + COLUMN_PADDING, MAX_COLUMN_WIDTH))
 
     def download_result(self):
         if self.df_final is None or self.df_final.empty:
             QtWidgets.QMessageBox.warning(self, "No Data", "No data to download.")
             return
 
-        save_file, _ = QtWidgets.QFileDialog.getSaveFileName(
-            self, "Save Excel File", "", "Excel Files (*.xlsx);;All Files (*)"
-        )
-        if not save_file:
+        target = ask_export_path(self, "Save Result")
+        if target is None:
             return
+        save_file, fmt = target
 
-        if not save_file.lower().endswith(".xlsx"):
-            save_file += ".xlsx"
+        self._set_busy(True)
+        self.btn_cancel.setVisible(False)
+        self._set_status("Saving…")
 
-        try:
-            self.df_final.to_excel(save_file, index=False)
-            QtWidgets.QMessageBox.information(self, "Success", f"Saved:\n{save_file}")
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Error", f"Unable to save:\n{e}")
+        self.export_thread = ExportThread(self.df_final, save_file, fmt=fmt, trace=self.trace, parent=self)
+        self.export_thread.progress.connect(self.on_export_progress)
+        self.export_thread.finished.connect(self.on_export_finished)
+        self.export_thread.start()
+
+    def on_export_progress(self, rows_written: int, rows_total: int):
+        if rows_total:
+            self.progress.setValue(int(rows_written * 100 / rows_total))
+        self._set_status(f"Saving… {rows_written}/{rows_total} rows")
+
+    def on_export_finished(self, save_file: str, error_message: str):
+        self._set_busy(False)
+
+        if error_message:
+            QtWidgets.QMessageBox.critical(self, "Error", f"Unable to save:\n{error_message}")
+            self._set_status(f"Error: {error_message}")
+            return
+
+        if self.trace is not None and self.trace.spans:
+            self._set_status(f"Saved: {save_file} ({self.trace.spans[-1].label()})", self.trace.details())
+        else:
+            self._set_status(f"Saved: {save_file}")
+        QtWidgets.QMessageBox.information(self, "Success", f"Saved:\n{save_file}")
+
+    def save_timings(self):
+        if self.trace is None:
+            return
+        message = save_trace(self, self.trace)
+        if message is not None:
+            self._set_status(message, self.trace.details())
 
     def on_back(self):
         # stacked navigation is handled in app.py
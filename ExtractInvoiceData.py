@@ -1,159 +1,154 @@
 import sys
 import os
-import re
+import threading
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from typing import Deque, Dict, List, Optional, Tuple
 
-import camelot
 import pandas as pd
 from PyQt5 import QtCore, QtGui, QtWidgets
 
+from batch_extract import SOURCE_COLUMN, extract_file
+from export_ui import ExportThread, ask_export_path, save_trace
+from invoice_extract import default_workers
+from tracing import Trace, profile_mode
 
-#############################################################################
-#                           Parsing / Logic Functions                        #
-#############################################################################
-
-def parse_marks_and_description(text: str):
-    match_1z = re.search(r"(?i)(1Z[A-Za-z0-9]+)(?![A-Za-z0-9])", text)
-    if match_1z:
-        container_number = match_1z.group(0).strip()
-        container_number = re.sub(r"(?i)of$", "", container_number).strip()
-    else:
-        match_container = re.search(r"(?i)Number and kind\s*(\S+)", text)
-        container_number = match_container.group(1).strip() if match_container else ""
-
-    match_desc = re.search(r"(?i)Description:\s*(.+)", text)
-    description = match_desc.group(1).strip() if match_desc else ""
-    return container_number, description
-
-
-def parse_commodity_and_grossmass(text: str):
-    commodity_code = ""
-    gross_mass = ""
-
-    pattern_commodity = re.compile(r"33 Commodity \(HS\) Code(\d+)", re.IGNORECASE)
-    match_com = pattern_commodity.search(text)
-    if match_com:
-        raw = match_com.group(1)
-        commodity_code = raw[:-2] if len(raw) >= 2 else raw
-
-    pattern_gross = re.compile(r"35 Gross Mass \(Kg\)[A-Za-z]*(\d+\.\d+)", re.IGNORECASE)
-    match_gross = pattern_gross.search(text)
-    if match_gross:
-        gross_mass = match_gross.group(1)
 
-    return commodity_code, gross_mass
+# How often the queue looks for newly added files while all running ones are busy.
+QUEUE_POLL_SECONDS = 0.2
+# Preview columns are sized from this many rows, not the whole result.
+PREVIEW_SIZE_SAMPLE_ROWS = 200
 
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
 
-def parse_all_numbers(text: str):
-    text = text.replace("\n", " ")
-    nums = re.findall(r"[\d,\.]+", text)
-    cleaned = []
-    for val in nums:
-        # ignore weird stray "42" you previously filtered
-        if val.replace(",", "").replace(".", "") == "42":
-            continue
-        cleaned.append(val)
-    return cleaned
-
-
-def parse_item_price(text: str):
-    found = parse_all_numbers(text)
-    return found[-1] if found else ""
-
-
-def extract_filtered_data_with_following_rows(pdf_path: str, rows_after: int = 4) -> Optional[pd.DataFrame]:
-    """
-    Extracts relevant blocks from PDF tables and returns a DataFrame.
-    """
-    try:
-        tables = camelot.read_pdf(
-            pdf_path,
-            pages="all",
-            flavor="lattice",          # consider switching to 'stream' if lattice fails for some PDFs
-            strip_text="\n",
-            line_scale=40
-        )
-
-        patterns = ["31 Packages", "Description of Goods"]
-        all_data_rows: List[Dict[str, str]] = []
-
-        for table in tables:
-            df = table.df
-            df.columns = [f"col_{i}" for i in range(len(df.columns))]
-
-            match_mask = df.apply(
-                lambda row: row.astype(str).str.contains("|".join(patterns), na=False, case=False).any(),
-                axis=1
-            )
-            match_indices = match_mask[match_mask].index
-
-            for match_index in match_indices:
-                start_index = match_index
-                end_index = min(match_index + rows_after + 1, len(df))
-                matched_block = df.iloc[start_index:end_index]
-
-                # Parse container number & description from col_1
-                col1_lines = matched_block.get("col_1", pd.Series(dtype=str)).dropna().astype(str).tolist()
-                filtered_lines = [ln for ln in col1_lines if ln.strip().lower() != "marks"]
-                col1_text = " ".join(filtered_lines).strip()
-                col1_text = re.sub(r"(?i)(1Z[A-Za-z0-9]+)(marks)", r"\1 Marks", col1_text)
-                container_number, description = parse_marks_and_description(col1_text)
-
-                # Parse commodity code & gross mass from col_12
-                col12_text = " ".join(matched_block.get("col_12", pd.Series(dtype=str)).dropna().astype(str)).strip()
-                commodity_code, gross_mass = parse_commodity_and_grossmass(col12_text)
-
-                # Parse item price from col_16
-                col16_text = " ".join(matched_block.get("col_16", pd.Series(dtype=str)).dropna().astype(str)).strip()
-                item_price = parse_item_price(col16_text)
-
-                if not item_price:
-                    combined_text = f"{col12_text} {col16_text}"
-                    combined_nums = parse_all_numbers(combined_text)
-                    if combined_nums:
-                        if gross_mass in combined_nums:
-                            combined_nums.remove(gross_mass)
-                        if combined_nums:
-                            item_price = combined_nums[-1]
-
-                all_data_rows.append({
-                    "Marks & Nosof Packages": container_number,
-                    "Description": description,
-                    "Commodity_Code": commodity_code,
-                    "Gross_Mass": gross_mass,
-                    "Item_Price": item_price
-                })
-
-        if not all_data_rows:
-            return None
+STATUS_COLORS = {
+    STATUS_QUEUED: "#A8A8A8",
+    STATUS_RUNNING: "#4DA3FF",
+    STATUS_DONE: "#5CC98A",
+    STATUS_FAILED: "#FF6B6B",
+}
 
-        return pd.DataFrame(all_data_rows)
 
-    except Exception as e:
-        raise RuntimeError(f"Failed to process the PDF: {e}")
+@dataclass
+class QueuedFile:
+    path: str
+    status: str = STATUS_QUEUED
+    rows: int = 0
+    seconds: float = 0.0
+    error: str = ""
+    df: Optional[pd.DataFrame] = None
 
 
 #############################################################################
 #                   PyQt Worker Thread (background processing)               #
 #############################################################################
 
-class ProcessPDFThread(QtCore.QThread):
-    finished = QtCore.pyqtSignal(object, str)  # (df_or_none, error_message)
+class InvoiceQueueThread(QtCore.QThread):
+    """
+    Runs queued invoice PDFs in a pool of at most `workers` processes, one
+    file per process, reporting each file as it starts and finishes. Files
+    can be added while the queue runs; the thread ends once it is empty.
+    """
+
+    file_started = QtCore.pyqtSignal(int)  # queue index
+    file_finished = QtCore.pyqtSignal(int, object, str, float)  # (queue index, df_or_none, error_message, seconds)
 
-    def __init__(self, pdf_path: str, parent=None):
+    def __init__(self, workers: int, trace: Trace, parent=None):
         super().__init__(parent)
-        self.pdf_path = pdf_path
+        self.workers = max(1, workers)
+        self.trace = trace
+        self.trace.info.setdefault("files", [])
+        self._pending: Deque[Tuple[int, str]] = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def add(self, index: int, pdf_path: str) -> bool:
+        """Queues a file; False once the thread has stopped taking files."""
+        with self._lock:
+            if self._closed:
+                return False
+            self._pending.append((index, pdf_path))
+            self.trace.info["files"].append(pdf_path)
+            return True
+
+    def _next(self, running: int) -> Optional[Tuple[int, str]]:
+        with self._lock:
+            if self._pending:
+                return self._pending.popleft()
+            if not running:
+                self._closed = True
+            return None
 
     def run(self):
+        with self.trace:
+            first = self._next(0)
+            if first is None:
+                return
+            with self._lock:
+                alone = not self._pending
+            if alone:
+                # A lone file gets the whole pool for its pages instead.
+                self._run_here(*first)
+                first = self._next(0)
+                if first is None:
+                    return
+
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                running: Dict[Future, Tuple[int, str]] = {}
+                item = first
+                while item is not None or running:
+                    # Submit only what a worker can start now, so "running" in the table is true.
+                    while item is not None:
+                        try:
+                            running[pool.submit(extract_file, item[1], use_records=True)] = item
+                        except BrokenProcessPool as e:
+                            self._fail_remaining([item, *running.values()], e)
+                            return
+                        self.file_started.emit(item[0])
+                        item = self._next(len(running)) if len(running) < self.workers else None
+                    done, _ = wait(list(running), timeout=QUEUE_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        index, pdf_path = running.pop(fut)
+                        try:
+                            df, seconds = fut.result()
+                            self._finish(index, pdf_path, df, "", seconds)
+                        except BrokenProcessPool as e:
+                            # A worker died (crash, out of memory): the pool takes no more work.
+                            self._fail_remaining([(index, pdf_path), *running.values()], e)
+                            return
+                        except Exception as e:
+                            self._finish(index, pdf_path, None, str(e), 0.0)
+                    if len(running) < self.workers:
+                        item = self._next(len(running))
+
+    def _fail_remaining(self, items: List[Tuple[int, str]], error: BrokenProcessPool):
+        """Fails items and every file still queued; later files go to a new queue."""
+        with self._lock:
+            self._closed = True
+            items = items + list(self._pending)
+            self._pending.clear()
+        message = f"Extraction worker stopped unexpectedly: {error}"
+        for index, pdf_path in items:
+            self._finish(index, pdf_path, None, message, 0.0)
+
+    def _run_here(self, index: int, pdf_path: str):
+        self.file_started.emit(index)
         try:
-            df = extract_filtered_data_with_following_rows(self.pdf_path)
-            if df is None or df.empty:
-                self.finished.emit(pd.DataFrame(), "No matching data found.")
-            else:
-                self.finished.emit(df, "")
+            df, seconds = extract_file(pdf_path, max_workers=self.workers, use_records=True)
+            self._finish(index, pdf_path, df, "", seconds)
         except Exception as e:
-            self.finished.emit(pd.DataFrame(), str(e))
+            self._finish(index, pdf_path, None, str(e), 0.0)
+
+    def _finish(self, index: int, pdf_path: str, df, error_message: str, seconds: float):
+        rows = 0 if df is None else len(df)
+        self.trace.add(f"extract {os.path.basename(pdf_path)}", seconds, rows=rows)
+        self.file_finished.emit(index, df, error_message, seconds)
 
 
 #############################################################################
@@ -161,22 +156,42 @@ class ProcessPDFThread(QtCore.QThread):
 #############################################################################
 
 class DataFrameTableModel(QtCore.QAbstractTableModel):
+    """
+    Rows of one or more frames with the same columns, shown one after the
+    other. insert_frame adds a frame's rows without touching the rest, so
+    streaming in results costs only the new rows.
+    """
+
     def __init__(self, df: pd.DataFrame):
         super().__init__()
-        self._df = df if df is not None else pd.DataFrame()
+        self._frames: List[pd.DataFrame] = []
+        self._starts: List[int] = []
+        self._columns: List[str] = []
+        self._rows = 0
+        self._set_frames([] if df is None or df.empty else [df], [] if df is None else list(df.columns))
+
+    def _set_frames(self, frames: List[pd.DataFrame], columns: List[str]):
+        self._frames = frames
+        self._columns = columns
+        self._starts = []
+        self._rows = 0
+        for df in frames:
+            self._starts.append(self._rows)
+            self._rows += len(df.index)
 
     def rowCount(self, parent=None):
-        return len(self._df.index)
+        return self._rows
 
     def columnCount(self, parent=None):
-        return len(self._df.columns)
+        return len(self._columns)
 
     def data(self, index, role=QtCore.Qt.DisplayRole):
         if not index.isValid():
             return None
 
         if role == QtCore.Qt.DisplayRole:
-            value = self._df.iat[index.row(), index.column()]
+            part = bisect_right(self._starts, index.row()) - 1
+            value = self._frames[part].iat[index.row() - self._starts[part], index.column()]
             return "" if pd.isna(value) else str(value)
 
         return None
@@ -185,14 +200,39 @@ class DataFrameTableModel(QtCore.QAbstractTableModel):
         if role != QtCore.Qt.DisplayRole:
             return None
         if orientation == QtCore.Qt.Horizontal:
-            return str(self._df.columns[section])
+            return str(self._columns[section])
         return str(section + 1)
 
     def set_df(self, df: pd.DataFrame):
         self.beginResetModel()
-        self._df = df if df is not None else pd.DataFrame()
+        df = df if df is not None else pd.DataFrame()
+        self._set_frames([] if df.empty else [df], list(df.columns))
         self.endResetModel()
 
+    def insert_frame(self, position: int, df: pd.DataFrame):
+        """Shows df's rows after the first `position` frames."""
+        if df is None or df.empty:
+            return
+        if not self._frames or list(df.columns) != self._columns:
+            frames = self._frames[:position] + [df] + self._frames[position:]
+            columns = self._columns or list(df.columns)
+            self.beginResetModel()
+            self._set_frames([f.reindex(columns=columns) for f in frames], columns)
+            self.endResetModel()
+            return
+        first = self._starts[position] if position < len(self._frames) else self._rows
+        self.beginInsertRows(QtCore.QModelIndex(), first, first + len(df.index) - 1)
+        self._set_frames(self._frames[:position] + [df] + self._frames[position:], self._columns)
+        self.endInsertRows()
+
+    def frame(self) -> pd.DataFrame:
+        """Every row shown, as one frame."""
+        if len(self._frames) == 1:
+            return self._frames[0]
+        if not self._frames:
+            return pd.DataFrame(columns=self._columns)
+        return pd.concat(self._frames, ignore_index=True)
+
 
 #############################################################################
 #                       Modern UI + Dialog Integration                       #
@@ -206,9 +246,13 @@ class PDFToExcelDialog(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        self.pdf_path: Optional[str] = None
+        # Files of the current batch in selection order; rows are combined in this order.
+        self.queue: List[QueuedFile] = []
         self.dataframe: Optional[pd.DataFrame] = None
-        self.thread: Optional[ProcessPDFThread] = None
+        self.thread: Optional[InvoiceQueueThread] = None
+        self.export_thread: Optional[ExportThread] = None
+        # Stage timings of the last extraction (and of its export), for Save Timings.
+        self.trace: Optional[Trace] = None
 
         self._build_ui()
         self._wire_events()
@@ -238,7 +282,7 @@ class PDFToExcelDialog(QtWidgets.QWidget):
         lbl_title = QtWidgets.QLabel("Extract Invoice Data", appbar)
         lbl_title.setObjectName("Title")
 
-        lbl_sub = QtWidgets.QLabel("Select a PDF, extract table fields, preview, then export to Excel.", appbar)
+        lbl_sub = QtWidgets.QLabel("Select invoice PDFs, extract table fields, preview, then export to Excel.", appbar)
         lbl_sub.setObjectName("Subtitle")
 
         title_box.addWidget(lbl_title)
@@ -259,20 +303,27 @@ class PDFToExcelDialog(QtWidgets.QWidget):
         row = QtWidgets.QHBoxLayout()
         row.setSpacing(12)
 
-        self.btn_select = QtWidgets.QPushButton("Select PDF & Extract", self)
+        self.btn_select = QtWidgets.QPushButton("Select PDFs & Extract", self)
         self.btn_select.setMinimumHeight(44)
+        self.btn_select.setToolTip("Files selected while extraction runs are added to the queue")
 
         self.btn_dummy = QtWidgets.QPushButton("Load Dummy Data", self)
         self.btn_dummy.setObjectName("Secondary")
         self.btn_dummy.setMinimumHeight(44)
 
-        self.btn_download = QtWidgets.QPushButton("Download Result (.xlsx)", self)
+        self.btn_download = QtWidgets.QPushButton("Download Result", self)
         self.btn_download.setObjectName("Secondary")
         self.btn_download.setMinimumHeight(44)
 
+        self.btn_timings = QtWidgets.QPushButton("Save Timings", self)
+        self.btn_timings.setObjectName("Secondary")
+        self.btn_timings.setMinimumHeight(44)
+        self.btn_timings.setToolTip("Save the stage timings of the last extraction as JSON")
+
         row.addWidget(self.btn_select)
         row.addWidget(self.btn_dummy)
         row.addWidget(self.btn_download)
+        row.addWidget(self.btn_timings)
 
         self.lbl_file = QtWidgets.QLabel("", self)
         self.lbl_file.setStyleSheet("color: #A8A8A8;")
@@ -288,10 +339,24 @@ class PDFToExcelDialog(QtWidgets.QWidget):
         self.lbl_status = QtWidgets.QLabel("", self)
         self.lbl_status.setObjectName("Status")
 
+        # One row per queued file: name, state, rows extracted, time or error.
+        self.queue_table = QtWidgets.QTableWidget(0, 4, self)
+        self.queue_table.setHorizontalHeaderLabels(["File", "Status", "Rows", "Details"])
+        self.queue_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.queue_table.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.queue_table.verticalHeader().setVisible(False)
+        self.queue_table.setShowGrid(False)
+        self.queue_table.setMaximumHeight(180)
+        self.queue_table.setVisible(False)
+        queue_header = self.queue_table.horizontalHeader()
+        queue_header.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        queue_header.setStretchLastSection(True)
+
         ctl.addLayout(row)
         ctl.addWidget(self.lbl_file)
         ctl.addWidget(self.progress)
         ctl.addWidget(self.lbl_status)
+        ctl.addWidget(self.queue_table)
 
         root.addWidget(card_controls)
 
@@ -324,34 +389,44 @@ class PDFToExcelDialog(QtWidgets.QWidget):
         self.btn_select.clicked.connect(self.on_select_pdf)
         self.btn_dummy.clicked.connect(self.load_dummy_data)
         self.btn_download.clicked.connect(self.on_download)
+        self.btn_timings.clicked.connect(self.save_timings)
         self.btn_back.clicked.connect(self.on_back)
 
     def _set_initial_state(self):
         self.btn_download.setEnabled(False)
-        self._set_status("Choose a PDF to extract data, or load dummy data to test UI.")
+        self.btn_timings.setEnabled(False)
+        self._set_status("Choose invoice PDFs to extract data, or load dummy data to test UI.")
         self._resize_table()
 
-    def _set_status(self, msg: str):
+    def _set_status(self, msg: str, details: str = ""):
         self.lbl_status.setText(msg)
+        self.lbl_status.setToolTip(details)
 
-    def _set_file_label(self, path: Optional[str]):
-        if not path:
+    def _set_file_label(self, paths: List[str]):
+        if not paths:
             self.lbl_file.setText("")
             self.lbl_file.setToolTip("")
             return
-        base = os.path.basename(path)
-        self.lbl_file.setText(f"Selected file: {base}")
-        self.lbl_file.setToolTip(path)
+        if len(paths) == 1:
+            self.lbl_file.setText(f"Selected file: {os.path.basename(paths[0])}")
+        else:
+            self.lbl_file.setText(f"Selected files: {len(paths)}")
+        self.lbl_file.setToolTip("\n".join(paths))
 
     def _resize_table(self):
+        # Sized once from a sample of rows: ResizeToContents would measure
+        # every row again on each file added to the preview.
         header = self.table.horizontalHeader()
         header.setStretchLastSection(True)
-        header.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
+        header.setResizeContentsPrecision(PREVIEW_SIZE_SAMPLE_ROWS)
+        self.table.resizeColumnsToContents()
 
     def _set_busy(self, busy: bool):
         self.btn_select.setEnabled(not busy)
         self.btn_dummy.setEnabled(not busy)
         self.btn_download.setEnabled((not busy) and self.dataframe is not None and not self.dataframe.empty)
+        self.btn_timings.setEnabled((not busy) and self.trace is not None)
 
         if busy:
             self.progress.setVisible(True)
@@ -366,45 +441,143 @@ class PDFToExcelDialog(QtWidgets.QWidget):
     #                              Actions                                      #
     #############################################################################
 
+    def _is_extracting(self) -> bool:
+        return self.thread is not None and self.thread.isRunning()
+
     def on_select_pdf(self):
-        pdf_file, _ = QtWidgets.QFileDialog.getOpenFileName(
-            self, "Select PDF File", "", "PDF Files (*.pdf);;All Files (*)"
+        pdf_files, _ = QtWidgets.QFileDialog.getOpenFileNames(
+            self, "Select PDF Files", "", "PDF Files (*.pdf);;All Files (*)"
         )
-        if not pdf_file:
+        if not pdf_files:
             return
 
-        self.pdf_path = pdf_file
-        self._set_file_label(pdf_file)
-
-        self.dataframe = None
-        self.model.set_df(pd.DataFrame())
-        self._resize_table()
-
-        self._set_status("Processing… please wait.")
+        if not self._is_extracting():
+            # A new batch replaces the previous results.
+            self.queue = []
+            self.queue_table.setRowCount(0)
+            self.dataframe = None
+            self.trace = Trace("invoice", profile=profile_mode())
+            self.model.set_df(pd.DataFrame())
+            self._resize_table()
+
+        waiting = {f.path for f in self.queue if f.status in (STATUS_QUEUED, STATUS_RUNNING)}
+        indices = [self._add_queue_row(p) for p in pdf_files if p not in waiting]
+        self._dispatch(indices)
+
+        self._set_file_label([f.path for f in self.queue])
+        self.queue_table.setVisible(True)
         self._set_busy(True)
-
-        self.thread = ProcessPDFThread(pdf_path=self.pdf_path)
-        self.thread.finished.connect(self.on_process_finished)
+        self.btn_select.setEnabled(True)  # more files can join the running queue
+        self._show_queue_progress()
+
+    def _add_queue_row(self, pdf_path: str) -> int:
+        index = len(self.queue)
+        self.queue.append(QueuedFile(path=pdf_path))
+        self.queue_table.insertRow(index)
+        self._update_queue_row(index)
+        return index
+
+    def _dispatch(self, indices: List[int]):
+        """Hands files to the running queue, or to a new one if none is taking files."""
+        if self.thread is not None:
+            indices = [i for i in indices if not self.thread.add(i, self.queue[i].path)]
+        if not indices:
+            return
+        self.thread = InvoiceQueueThread(default_workers(), self.trace, parent=self)
+        self.thread.file_started.connect(self.on_file_started)
+        self.thread.file_finished.connect(self.on_file_finished)
+        self.thread.finished.connect(self.on_queue_finished)
+        for index in indices:
+            self.thread.add(index, self.queue[index].path)
         self.thread.start()
 
-    def on_process_finished(self, df, error_message: str):
+    def _update_queue_row(self, index: int):
+        entry = self.queue[index]
+        if entry.status == STATUS_FAILED:
+            details = entry.error
+        elif entry.status == STATUS_DONE:
+            details = f"{entry.seconds:.1f}s" + ("" if entry.rows else " (no matching data)")
+        else:
+            details = ""
+        cells = [
+            os.path.basename(entry.path),
+            entry.status,
+            str(entry.rows) if entry.status == STATUS_DONE else "",
+            details,
+        ]
+        for column, text in enumerate(cells):
+            item = QtWidgets.QTableWidgetItem(text)
+            item.setToolTip(entry.path if column == 0 else text)
+            if column == 1:
+                item.setForeground(QtGui.QColor(STATUS_COLORS[entry.status]))
+            self.queue_table.setItem(index, column, item)
+
+    def _show_queue_progress(self):
+        finished = sum(f.status in (STATUS_DONE, STATUS_FAILED) for f in self.queue)
+        self.progress.setRange(0, len(self.queue))
+        self.progress.setValue(finished)
+        running = sum(f.status == STATUS_RUNNING for f in self.queue)
+        self._set_status(f"Processing… {finished}/{len(self.queue)} file(s) finished, {running} running.")
+
+    def _show_file_rows(self, index: int):
+        """Adds a finished file's rows to the preview, in selection order, tagged with their file."""
+        entry = self.queue[index]
+        df = entry.df.copy()
+        df.insert(0, SOURCE_COLUMN, os.path.basename(entry.path))
+        # Files selected before this one whose rows are already shown.
+        position = sum(1 for f in self.queue[:index] if f.status == STATUS_DONE and f.rows)
+        resize = self.model.rowCount() < PREVIEW_SIZE_SAMPLE_ROWS
+        self.model.insert_frame(position, df)
+        if resize:
+            self._resize_table()
+
+    def on_file_started(self, index: int):
+        self.queue[index].status = STATUS_RUNNING
+        self._update_queue_row(index)
+        self._show_queue_progress()
+
+    def on_file_finished(self, index: int, df, error_message: str, seconds: float):
+        entry = self.queue[index]
+        entry.seconds = seconds
+        if error_message:
+            entry.status = STATUS_FAILED
+            entry.error = error_message
+        else:
+            entry.status = STATUS_DONE
+            entry.df = df
+            entry.rows = 0 if df is None else len(df)
+        self._update_queue_row(index)
+        self._show_queue_progress()
+
+        if entry.rows:
+            # Stream each finished file into the preview.
+            with self.trace.stage("preview model", rows=entry.rows):
+                self._show_file_rows(index)
+
+    def on_queue_finished(self):
+        if self._is_extracting():
+            return  # a file selected as the old queue drained started a new one
+        # The preview holds each file's rows; combine them once, for export.
+        self.dataframe = self.model.frame() if self.model.rowCount() else None
         self._set_busy(False)
 
-        if error_message:
-            self._set_status(f"Error: {error_message}")
-            QtWidgets.QMessageBox.critical(self, "Error", error_message)
+        failed = [f for f in self.queue if f.status == STATUS_FAILED]
+        if failed and len(failed) == len(self.queue):
+            self._set_status(f"Error: {failed[0].error}", self.trace.details())
+            QtWidgets.QMessageBox.critical(self, "Error", failed[0].error)
             return
 
-        if df is None or df.empty:
-            self._set_status("No matching data found.")
+        problems = f" {len(failed)} file(s) failed." if failed else ""
+        if self.dataframe is None or self.dataframe.empty:
+            self._set_status(f"No matching data found.{problems}", self.trace.details())
             self.btn_download.setEnabled(False)
             return
 
-        self.dataframe = df
-        self.model.set_df(df)
-        self._resize_table()
-
-        self._set_status(f"Done. Extracted {len(df)} row(s). You can download now.")
+        self._set_status(
+            f"Done. Extracted {len(self.dataframe)} row(s) from {len(self.queue) - len(failed)} file(s).{problems} "
+            f"You can download now. {self.trace.summary()}",
+            self.trace.details(),
+        )
         self.btn_download.setEnabled(True)
 
     def on_download(self):
@@ -412,20 +585,44 @@ class PDFToExcelDialog(QtWidgets.QWidget):
             QtWidgets.QMessageBox.warning(self, "No Data", "No data to download.")
             return
 
-        save_file, _ = QtWidgets.QFileDialog.getSaveFileName(
-            self, "Save Excel File", "", "Excel Files (*.xlsx);;All Files (*)"
-        )
-        if not save_file:
+        target = ask_export_path(self, "Save Result")
+        if target is None:
             return
+        save_file, fmt = target
 
-        if not save_file.lower().endswith(".xlsx"):
-            save_file += ".xlsx"
+        self._set_busy(True)
+        self.progress.setRange(0, 100)  # row counts are known, show real progress
+        self._set_status("Saving file…")
 
-        try:
-            self.dataframe.to_excel(save_file, index=False)
-            QtWidgets.QMessageBox.information(self, "Success", f"File saved to:\n{save_file}")
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Error", f"Unable to save file:\n{e}")
+        self.export_thread = ExportThread(self.dataframe, save_file, fmt=fmt, trace=self.trace, parent=self)
+        self.export_thread.progress.connect(self.on_export_progress)
+        self.export_thread.finished.connect(self.on_export_finished)
+        self.export_thread.start()
+
+    def on_export_progress(self, rows_written: int, rows_total: int):
+        if rows_total:
+            self.progress.setValue(int(rows_written * 100 / rows_total))
+
+    def on_export_finished(self, save_file: str, error_message: str):
+        self._set_busy(False)
+
+        if error_message:
+            self._set_status(f"Error: {error_message}")
+            QtWidgets.QMessageBox.critical(self, "Error", f"Unable to save file:\n{error_message}")
+            return
+
+        if self.trace is not None and self.trace.spans:
+            self._set_status(f"Saved: {save_file} ({self.trace.spans[-1].label()})", self.trace.details())
+        else:
+            self._set_status(f"Saved: {save_file}")
+        QtWidgets.QMessageBox.information(self, "Success", f"File saved to:\n{save_file}")
+
+    def save_timings(self):
+        if self.trace is None:
+            return
+        message = save_trace(self, self.trace)
+        if message is not None:
+            self._set_status(message, self.trace.details())
 
     def on_back(self):
         # In your stacked app, app.py handles switching pages.
@@ -464,14 +661,18 @@ class PDFToExcelDialog(QtWidgets.QWidget):
             }
         ])
 
-        self.pdf_path = None
-        self._set_file_label(None)
+        self.queue = []
+        self.queue_table.setRowCount(0)
+        self.queue_table.setVisible(False)
+        self._set_file_label([])
 
         self.dataframe = dummy
+        self.trace = None
         self.model.set_df(dummy)
         self._resize_table()
 
         self.btn_download.setEnabled(True)
+        self.btn_timings.setEnabled(False)
         self._set_status("Dummy data loaded. Preview and download to test Excel export.")
 
 
@@ -0,0 +1,232 @@
+import os
+import sqlite3
+import time
+from typing import List
+
+from PyQt5 import QtCore, QtWidgets
+
+from record_store import (
+    FIELD_CONTAINER,
+    FIELD_HAWB,
+    FIELD_HS,
+    FIELD_SECONDARY,
+    RECORDS_ENV,
+    RecordHit,
+    default_records,
+)
+
+
+# Search-box choices: label -> record_store field (None: any field).
+FIELD_CHOICES = [
+    ("Any number", None),
+    ("HAWB", FIELD_HAWB),
+    ("Secondary tracking", FIELD_SECONDARY),
+    ("1Z container", FIELD_CONTAINER),
+    ("HS code", FIELD_HS),
+]
+KIND_LABELS = {"parent": "Parent manifest", "child": "Child manifest", "invoice": "Invoice"}
+RESULT_HEADERS = ["Number", "Matched", "Document", "File", "Page", "Last Seen", "Row"]
+RESULT_LIMIT = 500
+# Typing pauses this long before the search runs.
+SEARCH_DELAY_MS = 250
+# Shortest text searched while typing (Enter searches any length).
+MIN_LIVE_CHARS = 4
+
+
+class RecordSearchPage(QtWidgets.QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = default_records()
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(SEARCH_DELAY_MS)
+
+        self.setupUi(self)
+        self._wire_events()
+        self._set_initial_state()
+
+    def _set_initial_state(self):
+        if self.store is None:
+            self.txt_search.setEnabled(False)
+            self.btn_search.setEnabled(False)
+            self._set_status(f"The record store is switched off ({RECORDS_ENV}=0) or can't be opened.")
+            return
+        self._show_stats()
+
+    def _wire_events(self):
+        self.btn_back.clicked.connect(self.on_back)
+        self.btn_search.clicked.connect(self.search)
+        self.txt_search.returnPressed.connect(self.search)
+        self.txt_search.textChanged.connect(self._on_text_changed)
+        self.cmb_field.currentIndexChanged.connect(lambda _: self._on_text_changed(self.txt_search.text()))
+        self.chk_prefix.toggled.connect(lambda _: self._on_text_changed(self.txt_search.text()))
+        self.timer.timeout.connect(self.search)
+
+    def setupUi(self, parent):
+        parent.setObjectName("SearchRecords")
+        parent.setMinimumSize(900, 620)
+
+        root = QtWidgets.QVBoxLayout(parent)
+        root.setContentsMargins(24, 24, 24, 24)
+        root.setSpacing(18)
+
+        appbar = QtWidgets.QFrame(parent)
+        appbar.setObjectName("AppBar")
+        appbar_layout = QtWidgets.QHBoxLayout(appbar)
+        appbar_layout.setContentsMargins(18, 14, 18, 14)
+        appbar_layout.setSpacing(12)
+
+        self.btn_back = QtWidgets.QPushButton("← Back", appbar)
+        self.btn_back.setObjectName("Secondary")
+        self.btn_back.setMinimumHeight(40)
+
+        title_box = QtWidgets.QVBoxLayout()
+        title_box.setSpacing(2)
+
+        t = QtWidgets.QLabel("Search Records", appbar)
+        t.setObjectName("Title")
+
+        s = QtWidgets.QLabel("Find every manifest and invoice a number appeared in.", appbar)
+        s.setObjectName("Subtitle")
+
+        title_box.addWidget(t)
+        title_box.addWidget(s)
+
+        appbar_layout.addWidget(self.btn_back, 0)
+        appbar_layout.addLayout(title_box, 1)
+
+        root.addWidget(appbar)
+
+        card_search = QtWidgets.QFrame(parent)
+        card_search.setObjectName("Card")
+        search_layout = QtWidgets.QHBoxLayout(card_search)
+        search_layout.setContentsMargins(18, 18, 18, 18)
+        search_layout.setSpacing(12)
+
+        self.txt_search = QtWidgets.QLineEdit(card_search)
+        self.txt_search.setPlaceholderText("HAWB, secondary tracking number, 1Z number or HS code")
+        self.txt_search.setClearButtonEnabled(True)
+        self.txt_search.setMinimumHeight(40)
+
+        self.cmb_field = QtWidgets.QComboBox(card_search)
+        self.cmb_field.setMinimumHeight(40)
+        for label, field in FIELD_CHOICES:
+            self.cmb_field.addItem(label, field)
+
+        self.chk_prefix = QtWidgets.QCheckBox("Starts with", card_search)
+        self.chk_prefix.setToolTip("Match numbers that start with the text instead of the whole number")
+
+        self.btn_search = QtWidgets.QPushButton("Search", card_search)
+        self.btn_search.setMinimumHeight(40)
+
+        search_layout.addWidget(self.txt_search, 1)
+        search_layout.addWidget(self.cmb_field)
+        search_layout.addWidget(self.chk_prefix)
+        search_layout.addWidget(self.btn_search)
+
+        root.addWidget(card_search)
+
+        card_table = QtWidgets.QFrame(parent)
+        card_table.setObjectName("Card")
+        table_layout = QtWidgets.QVBoxLayout(card_table)
+        table_layout.setContentsMargins(18, 18, 18, 18)
+        table_layout.setSpacing(12)
+
+        self.results_table = QtWidgets.QTableWidget(0, len(RESULT_HEADERS), card_table)
+        self.results_table.setHorizontalHeaderLabels(RESULT_HEADERS)
+        self.results_table.setAlternatingRowColors(True)
+        self.results_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.results_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.results_table.verticalHeader().setVisible(False)
+        self.results_table.setShowGrid(False)
+        self.results_table.setWordWrap(False)
+        header = self.results_table.horizontalHeader()
+        header.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        header.setStretchLastSection(True)
+
+        self.lbl_status = QtWidgets.QLabel("", card_table)
+        self.lbl_status.setObjectName("Status")
+
+        table_layout.addWidget(self.results_table)
+        table_layout.addWidget(self.lbl_status)
+
+        root.addWidget(card_table, 1)
+
+    def _set_status(self, text: str, details: str = ""):
+        self.lbl_status.setText(text)
+        self.lbl_status.setToolTip(details)
+
+    def _show_stats(self):
+        try:
+            stats = self.store.stats()
+        except sqlite3.Error as e:
+            self._set_status(f"Can't read the record store: {e}", self.store.db_path)
+            return
+        self._set_status(
+            f"{stats['rows']:,} rows from {stats['files']:,} files stored. "
+            "Every compare and invoice run adds the rows it parses.",
+            self.store.db_path,
+        )
+
+    def _on_text_changed(self, text: str):
+        # Search as the user types, once there is enough to narrow it down.
+        self.timer.stop()
+        if len(text.strip()) >= MIN_LIVE_CHARS:
+            self.timer.start()
+
+    def search(self):
+        self.timer.stop()
+        if self.store is None:
+            return
+        term = self.txt_search.text().strip()
+        if not term:
+            self.results_table.setRowCount(0)
+            self._show_stats()
+            return
+
+        field = self.cmb_field.currentData()
+        started = time.perf_counter()
+        try:
+            hits = self.store.search(term, field=field, prefix=self.chk_prefix.isChecked(), limit=RESULT_LIMIT)
+        except sqlite3.Error as e:
+            self._set_status(f"Search failed: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self._show_hits(hits)
+        more = " (first matches only, narrow the search to see the rest)" if len(hits) == RESULT_LIMIT else ""
+        self._set_status(f"{len(hits)} match(es) in {elapsed_ms:.1f} ms{more}.")
+
+    def _show_hits(self, hits: List[RecordHit]):
+        labels = {field: label for label, field in FIELD_CHOICES}
+        self.results_table.setUpdatesEnabled(False)
+        self.results_table.setRowCount(len(hits))
+        for row, hit in enumerate(hits):
+            details = "; ".join(f"{name.replace(chr(10), ' ')}: {value}" for name, value in hit.data.items())
+            cells = [
+                hit.key,
+                labels.get(hit.field, hit.field),
+                KIND_LABELS.get(hit.kind, hit.kind),
+                os.path.basename(hit.path),
+                "" if hit.page is None else str(hit.page),
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(hit.last_seen)),
+                details,
+            ]
+            for column, text in enumerate(cells):
+                item = QtWidgets.QTableWidgetItem(text)
+                if column == 3:
+                    item.setToolTip(hit.path)
+                elif column == 6:
+                    item.setToolTip(details.replace("; ", "\n"))
+                self.results_table.setItem(row, column, item)
+        self.results_table.setUpdatesEnabled(True)
+
+    def showEvent(self, event):
+        # Runs made since the page was last open may have added rows.
+        super().showEvent(event)
+        if self.store is not None and not self.txt_search.text().strip():
+            self._show_stats()
+
+    def on_back(self):
+        # stacked navigation is handled in app.py
+        self.close()
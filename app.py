@@ -1,13 +1,43 @@
+import importlib
+import multiprocessing
+import os
 import sys
-from PyQt5 import QtWidgets
+import threading
+import time
+from typing import Dict
+
+from PyQt5 import QtCore, QtWidgets
 
 from main import Ui_Dialog as Ui_MainWindow
-from CompareCargoManifests import CompareCargoPage
-from ExtractInvoiceData import PDFToExcelDialog
+
+
+# Stack index -> (module, class) of each page. Pages are imported and built
+# on first use, so the menu doesn't wait for pandas, pdfplumber and Camelot
+# (which drags in OpenCV and Ghostscript bindings).
+PAGE_MENU = 0
+PAGE_COMPARE = 1
+PAGE_EXTRACT = 2
+PAGE_SEARCH = 3
+PAGES = {
+    PAGE_COMPARE: ("CompareCargoManifests", "CompareCargoPage"),
+    PAGE_EXTRACT: ("ExtractInvoiceData", "PDFToExcelDialog"),
+    PAGE_SEARCH: ("SearchRecords", "RecordSearchPage"),
+}
+
+# Imported in the background once the menu is up, shared backends first.
+# XTRACTPDF_WARMUP=0 turns this off (pages then import when first opened).
+WARMUP_MODULES = ["pandas", "cargo_manifest", "CompareCargoManifests", "invoice_extract", "ExtractInvoiceData"]
+WARMUP_ENV = "XTRACTPDF_WARMUP"
+# Lets the menu paint before the warm-up thread starts competing for the GIL.
+WARMUP_DELAY_MS = 200
+
+
+def warmup_enabled() -> bool:
+    return os.environ.get(WARMUP_ENV, "1").strip().lower() not in ("0", "off", "false", "no")
 
 
 class MainApp(QtWidgets.QMainWindow):
-    def __init__(self):
+    def __init__(self, warmup: bool = True):
         super().__init__()
         self.setWindowTitle("XtractPDF")
         self.setMinimumSize(900, 620)
@@ -16,24 +46,87 @@ class MainApp(QtWidgets.QMainWindow):
         self.setCentralWidget(self.stack)
 
         self.main_page = QtWidgets.QWidget()
-        self.compare_page = CompareCargoPage()
-        self.extract_page = PDFToExcelDialog()
-
         self.main_ui = Ui_MainWindow()
         self.main_ui.setupUi(self.main_page)
 
-        self.stack.addWidget(self.main_page)     # 0
-        self.stack.addWidget(self.compare_page)  # 1
-        self.stack.addWidget(self.extract_page)  # 2
+        self.stack.addWidget(self.main_page)  # 0
+        # Placeholders keep the stack indexes until a page is first opened.
+        for _ in PAGES:
+            self.stack.addWidget(QtWidgets.QWidget())
+
+        self.pages: Dict[int, QtWidgets.QWidget] = {}
+        # Seconds each module took to import, in the warm-up thread or on first use.
+        self.import_seconds: Dict[str, float] = {}
+        self.warmup_finished = threading.Event()
 
         # Navigation
-        self.main_ui.Extractinvoicbutton.clicked.connect(lambda: self.switch_page(2))
-        self.main_ui.pushButton_2.clicked.connect(lambda: self.switch_page(1))
-        self.compare_page.btn_back.clicked.connect(lambda: self.switch_page(0))
-        self.extract_page.btn_back.clicked.connect(lambda: self.switch_page(0))
+        self.main_ui.Extractinvoicbutton.clicked.connect(lambda: self.switch_page(PAGE_EXTRACT))
+        self.main_ui.pushButton_2.clicked.connect(lambda: self.switch_page(PAGE_COMPARE))
+        self.main_ui.searchRecordsButton.clicked.connect(lambda: self.switch_page(PAGE_SEARCH))
 
         self.apply_dark_theme()
 
+        if warmup and warmup_enabled():
+            QtCore.QTimer.singleShot(WARMUP_DELAY_MS, self.start_warmup)
+        else:
+            self.warmup_finished.set()
+
+    def start_warmup(self):
+        # A daemon thread rather than a QThread: closing the window mid-import
+        # must neither block on nor crash over an import that can't be stopped.
+        threading.Thread(target=self._warmup, name="warmup", daemon=True).start()
+
+    def _warmup(self):
+        try:
+            for name in WARMUP_MODULES:
+                try:
+                    self._import(name)
+                except Exception:
+                    pass  # Opening the page imports it again and reports the error there.
+        finally:
+            self.warmup_finished.set()
+
+    def _import(self, name: str):
+        if name in sys.modules:
+            return sys.modules[name]
+        t0 = time.perf_counter()
+        module = importlib.import_module(name)
+        self.import_seconds.setdefault(name, time.perf_counter() - t0)
+        return module
+
+    def page(self, index: int) -> QtWidgets.QWidget:
+        """The page at a stack index, imported and built the first time it is asked for."""
+        page = self.pages.get(index)
+        if page is not None:
+            return page
+
+        module_name, class_name = PAGES[index]
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            page = getattr(self._import(module_name), class_name)()
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+        placeholder = self.stack.widget(index)
+        self.stack.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self.stack.insertWidget(index, page)
+        page.btn_back.clicked.connect(lambda: self.switch_page(PAGE_MENU))
+        self.pages[index] = page
+        return page
+
+    @property
+    def compare_page(self):
+        return self.page(PAGE_COMPARE)
+
+    @property
+    def extract_page(self):
+        return self.page(PAGE_EXTRACT)
+
+    @property
+    def search_page(self):
+        return self.page(PAGE_SEARCH)
+
     def apply_dark_theme(self):
         qss = """
         * {
@@ -141,10 +234,18 @@ class MainApp(QtWidgets.QMainWindow):
         self.setStyleSheet(qss)
 
     def switch_page(self, index: int):
+        if index in PAGES:
+            try:
+                self.page(index)
+            except Exception as e:
+                QtWidgets.QMessageBox.critical(self, "Error", f"Unable to open this page:\n{e}")
+                return
         self.stack.setCurrentIndex(index)
 
 
 if __name__ == "__main__":
+    # Extraction runs in worker processes; needed for frozen Windows builds.
+    multiprocessing.freeze_support()
     app = QtWidgets.QApplication(sys.argv)
     window = MainApp()
     window.show()
@@ -0,0 +1,270 @@
+"""
+Headless batch mode for invoice extraction (no PyQt5 needed).
+
+    python batch_extract.py "D:/drops/2024-06-01" -o combined.xlsx --workers 6
+    python batch_extract.py "invoices/*.pdf" -o combined.csv --report status.csv
+
+Per-file results and a status journal are kept in <output>.parts/, so a run
+that crashed or was interrupted picks up where it left off when started
+again with the same output path.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from exporters import EXPORTERS, export_frame
+from extraction_cache import default_cache
+from invoice_extract import FLAVORS, extract_filtered_data_with_following_rows
+from record_store import default_records
+
+
+SOURCE_COLUMN = "Source File"
+JOURNAL_NAME = "status.jsonl"
+
+STATUS_DONE = "done"
+STATUS_EMPTY = "empty"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class FileStatus:
+    file: str
+    status: str
+    rows: int = 0
+    seconds: float = 0.0
+    error: str = ""
+    size: int = 0
+    mtime: float = 0.0
+    part: str = ""
+
+
+def collect_pdfs(inputs: List[str], recursive: bool = False) -> List[str]:
+    """Expand directories and glob patterns into a sorted, de-duplicated list of PDFs."""
+    found: List[str] = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*.pdf") if recursive else os.path.join(item, "*.pdf")
+            found.extend(glob.glob(pattern, recursive=recursive))
+            found.extend(glob.glob(pattern[:-3] + "PDF", recursive=recursive))
+        elif glob.has_magic(item):
+            found.extend(glob.glob(item, recursive=recursive))
+        elif os.path.isfile(item):
+            found.append(item)
+        else:
+            print(f"warning: no such file or directory: {item}", file=sys.stderr)
+
+    unique = {os.path.abspath(p) for p in found if os.path.isfile(p)}
+    return sorted(unique)
+
+
+def extract_file(
+    pdf_path: str,
+    use_cache: bool = True,
+    max_workers: Optional[int] = 1,
+    use_records: bool = False,
+    flavor: str = "auto",
+) -> Tuple[Optional[pd.DataFrame], float]:
+    """
+    One file's rows and the seconds it took. Pages are parsed in a single
+    process by default, for callers that already run files in parallel.
+    The rows are added to the record store only when use_records is set;
+    callers running files in parallel then all write to the one SQLite
+    store, serialised on its lock.
+    flavor is the Camelot flavor ("auto" picks one per page).
+    """
+    started = time.perf_counter()
+    df = extract_filtered_data_with_following_rows(
+        pdf_path,
+        cache=default_cache() if use_cache else None,
+        max_workers=max_workers,
+        records=default_records() if use_records else None,
+        flavor=flavor,
+    )
+    return df, time.perf_counter() - started
+
+
+class Journal:
+    """Append-only record of finished files; the last entry per file wins."""
+
+    def __init__(self, parts_dir: str):
+        self.parts_dir = parts_dir
+        self.path = os.path.join(parts_dir, JOURNAL_NAME)
+        os.makedirs(parts_dir, exist_ok=True)
+
+    def load(self) -> Dict[str, FileStatus]:
+        entries: Dict[str, FileStatus] = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = FileStatus(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue  # torn last line after a crash
+                entries[entry.file] = entry
+        return entries
+
+    def append(self, entry: FileStatus):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(entry)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _is_finished(entry: Optional[FileStatus], pdf_path: str, parts_dir: str) -> bool:
+    if entry is None or entry.status == STATUS_FAILED:
+        return False
+    try:
+        st = os.stat(pdf_path)
+    except OSError:
+        return False  # moved or deleted; the run records it as failed
+    if entry.size != st.st_size or entry.mtime != st.st_mtime:
+        return False  # the file changed since it was processed
+    return entry.status == STATUS_EMPTY or os.path.exists(os.path.join(parts_dir, entry.part))
+
+
+def _part_name(index: int, pdf_path: str) -> str:
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return f"{index:06d}_{stem}.pkl"
+
+
+def run_batch(
+    pdf_paths: List[str],
+    output_path: str,
+    workers: int,
+    report_path: Optional[str] = None,
+    resume: bool = True,
+    use_cache: bool = True,
+    fmt: Optional[str] = None,
+    use_records: bool = False,
+    flavor: str = "auto",
+) -> List[FileStatus]:
+    parts_dir = f"{output_path}.parts"
+    journal = Journal(parts_dir)
+    previous = journal.load() if resume else {}
+
+    statuses: Dict[str, FileStatus] = {}
+    todo: List[Tuple[int, str]] = []
+    for index, pdf_path in enumerate(pdf_paths):
+        entry = previous.get(pdf_path)
+        if _is_finished(entry, pdf_path, parts_dir):
+            statuses[pdf_path] = entry
+        else:
+            todo.append((index, pdf_path))
+
+    total = len(pdf_paths)
+    skipped = total - len(todo)
+    if skipped:
+        print(f"Resuming: {skipped} of {total} file(s) already processed.")
+
+    finished = skipped
+    # Off unless asked for (--records): every worker would write to the one
+    # shared SQLite store, serialised on its lock.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(extract_file, path, use_cache, 1, use_records, flavor): (index, path)
+            for index, path in todo
+        }
+        for fut in as_completed(futures):
+            index, pdf_path = futures[fut]
+            entry = FileStatus(file=pdf_path, status=STATUS_FAILED)
+            try:
+                # The file may have been moved or deleted since it was queued.
+                st = os.stat(pdf_path)
+                entry.size, entry.mtime = st.st_size, st.st_mtime
+                df, seconds = fut.result()
+                entry.seconds = round(seconds, 3)
+                if df is None or df.empty:
+                    entry.status = STATUS_EMPTY
+                else:
+                    entry.part = _part_name(index, pdf_path)
+                    df.to_pickle(os.path.join(parts_dir, entry.part))
+                    entry.status = STATUS_DONE
+                    entry.rows = len(df)
+            except Exception as e:
+                entry.error = str(e)
+
+            journal.append(entry)
+            statuses[pdf_path] = entry
+            finished += 1
+            detail = entry.error if entry.status == STATUS_FAILED else f"{entry.rows} row(s)"
+            print(f"[{finished}/{total}] {entry.status:<6} {os.path.basename(pdf_path)} ({detail})")
+
+    ordered = [statuses[p] for p in pdf_paths]
+    write_combined(ordered, parts_dir, output_path, fmt=fmt)
+    if report_path:
+        write_report(ordered, report_path)
+    return ordered
+
+
+def write_combined(statuses: List[FileStatus], parts_dir: str, output_path: str, fmt: Optional[str] = None):
+    frames = []
+    for entry in statuses:
+        if entry.status != STATUS_DONE:
+            continue
+        df = pd.read_pickle(os.path.join(parts_dir, entry.part))
+        df.insert(0, SOURCE_COLUMN, os.path.basename(entry.file))
+        frames.append(df)
+
+    combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[SOURCE_COLUMN])
+    export_frame(combined, output_path, fmt=fmt)
+
+
+def write_report(statuses: List[FileStatus], report_path: str):
+    report = pd.DataFrame(
+        [{"File": s.file, "Status": s.status, "Rows": s.rows, "Seconds": s.seconds, "Error": s.error}
+         for s in statuses]
+    )
+    report.to_csv(report_path, index=False)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Extract invoice data from many PDFs without the GUI.")
+    ap.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    ap.add_argument("-o", "--output", required=True, help="combined output (.xlsx, .csv, .parquet or .arrow)")
+    ap.add_argument("-f", "--format", choices=sorted(EXPORTERS), help="output format (default: from the extension)")
+    ap.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="parallel worker processes")
+    ap.add_argument("-r", "--report", help="per-file status report (.csv)")
+    ap.add_argument("--recursive", action="store_true", help="search directories recursively")
+    ap.add_argument("--no-resume", action="store_true", help="ignore results of a previous run")
+    ap.add_argument("--no-cache", action="store_true", help="don't use the extraction cache")
+    ap.add_argument("--flavor", choices=FLAVORS, default="auto",
+                    help="Camelot flavor (default: auto, chosen per page from its ruling lines)")
+    ap.add_argument("--records", action="store_true", help="add the rows to the record store (off by default)")
+    args = ap.parse_args(argv)
+
+    pdf_paths = collect_pdfs(args.inputs, recursive=args.recursive)
+    if not pdf_paths:
+        print("No PDF files found.", file=sys.stderr)
+        return 2
+
+    statuses = run_batch(
+        pdf_paths,
+        args.output,
+        workers=max(1, args.workers),
+        report_path=args.report,
+        resume=not args.no_resume,
+        use_cache=not args.no_cache,
+        fmt=args.format,
+        use_records=args.records,
+        flavor=args.flavor,
+    )
+
+    failed = sum(1 for s in statuses if s.status == STATUS_FAILED)
+    print(f"Wrote {args.output} ({len(statuses) - failed} ok, {failed} failed).")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Compares the vectorised expand_secondary_to_master_baby with the original
+row-by-row loop on synthetic merged manifests.
+
+    python benchmarks/bench_expand.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cargo_manifest import expand_secondary_to_master_baby  # noqa: E402
+from synthetic import make_merged  # noqa: E402
+
+
+def expand_secondary_loop(df: pd.DataFrame) -> pd.DataFrame:
+    """The original iterrows implementation, kept as the reference."""
+    final_rows: List[dict] = []
+
+    for _, row in df.iterrows():
+        row_dict = row.to_dict()
+        sec_str = row_dict.get("secondary", "") or ""
+        if pd.isna(sec_str):
+            sec_str = ""
+
+        secondary_list = [s.strip() for s in str(sec_str).split(",") if s.strip()]
+
+        master = row_dict.copy()
+        master["Type"] = "Master"
+        final_rows.append(master)
+
+        for sec in secondary_list:
+            baby = row_dict.copy()
+            baby["Type"] = "Baby"
+            baby["HAWB"] = sec
+            final_rows.append(baby)
+
+    return pd.DataFrame(final_rows)
+
+
+def _timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--skip-loop-above", type=int, default=None,
+                    help="don't run the slow loop for sizes above this (no equality check either)")
+    args = ap.parse_args()
+
+    print(f"{'rows':>10} {'out rows':>10} {'loop s':>10} {'vector s':>10} {'speedup':>8}")
+    for n in args.sizes:
+        df = make_merged(n)
+        fast, t_fast = _timed(expand_secondary_to_master_baby, df)
+
+        if args.skip_loop_above is not None and n > args.skip_loop_above:
+            print(f"{n:>10} {len(fast):>10} {'-':>10} {t_fast:>10.3f} {'-':>8}")
+            continue
+
+        slow, t_slow = _timed(expand_secondary_loop, df)
+        pd.testing.assert_frame_equal(fast, slow)
+        print(f"{n:>10} {len(fast):>10} {t_slow:>10.3f} {t_fast:>10.3f} {t_slow / t_fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
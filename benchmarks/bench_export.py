@@ -0,0 +1,43 @@
+"""
+Write time and file size of every export format on a synthetic master/baby
+result frame.
+
+    python benchmarks/bench_export.py --rows 10000 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cargo_manifest import expand_secondary_to_master_baby, select_final_columns  # noqa: E402
+from exporters import available_exporters  # noqa: E402
+from synthetic import make_merged  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 200_000],
+                    help="merged rows before expansion (output is roughly 1.9x)")
+    ap.add_argument("--formats", nargs="+", help="subset of formats to run")
+    args = ap.parse_args()
+
+    exporters = [e for e in available_exporters() if not args.formats or e.name in args.formats]
+
+    print(f"{'rows':>9} {'format':>8} {'write s':>9} {'rows/s':>10} {'size MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            df = select_final_columns(expand_secondary_to_master_baby(make_merged(n)))
+            for exporter in exporters:
+                path = os.path.join(tmp, f"out{exporter.extension}")
+                t0 = time.perf_counter()
+                exporter.write(df, path)
+                elapsed = time.perf_counter() - t0
+                size_mb = os.path.getsize(path) / 1e6
+                print(f"{len(df):>9} {exporter.name:>8} {elapsed:>9.3f} {len(df) / elapsed:>10.0f} {size_mb:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
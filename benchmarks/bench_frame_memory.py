@@ -0,0 +1,82 @@
+"""
+Memory and build time of manifest frames: the original path (a DataFrame
+per table, concatenated, then clean_cell mapped over every column) against
+build_frame + type_columns, on the bundled parent PDFs and on synthetic
+raw tables.
+
+    python benchmarks/bench_frame_memory.py --pdf PDF/Parent.pdf "PDF/Parent (2).pdf" --rows 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import List
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cargo_manifest import (  # noqa: E402
+    _table_to_frame,
+    clean_cell,
+    combine_parents,
+    extract_many_pages,
+    rename_columns_parent,
+)
+from extraction_cache import PageTables  # noqa: E402
+from synthetic import make_parent_tables  # noqa: E402
+
+
+def legacy_frame(files: List[PageTables]) -> pd.DataFrame:
+    """The original construction, kept as the reference."""
+    frames = [_table_to_frame(tbl) for pages in files for tables in pages for tbl in tables]
+    df = pd.concat(frames, ignore_index=True)
+    df = df.apply(lambda col: col.map(clean_cell))
+    return rename_columns_parent(df)
+
+
+def _measure(fn, files):
+    # Timed without tracing (tracemalloc slows allocation-heavy code a lot),
+    # then run again under tracemalloc for the peak.
+    t0 = time.perf_counter()
+    df = fn(files)
+    seconds = time.perf_counter() - t0
+    del df
+
+    tracemalloc.start()
+    df = fn(files)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, seconds, peak
+
+
+def _report(label: str, files: List[PageTables]):
+    old, t_old, peak_old = _measure(legacy_frame, files)
+    new, t_new, peak_new = _measure(combine_parents, files)
+    mem_old = old.memory_usage(deep=True).sum()
+    mem_new = new.memory_usage(deep=True).sum()
+
+    mb = 1024 * 1024
+    print(f"{label:>22} {len(new):>9} {mem_old / mb:>9.1f} {mem_new / mb:>9.1f} {mem_old / mem_new:>6.1f}x "
+          f"{peak_old / mb:>9.1f} {peak_new / mb:>9.1f} {t_old:>8.2f} {t_new:>8.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pdf", nargs="*", default=[], help="parent manifest PDFs to measure as well")
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = ap.parse_args()
+
+    print(f"{'input':>22} {'rows':>9} {'frame MB':>9} {'typed MB':>9} {'ratio':>7} "
+          f"{'peak MB':>9} {'peak MB':>9} {'old s':>8} {'new s':>8}")
+    if args.pdf:
+        _report("PDFs", extract_many_pages(args.pdf))
+    for n in args.rows:
+        _report(f"synthetic {n}", [make_parent_tables(n)])
+
+    print("\nframe/typed MB: DataFrame.memory_usage(deep=True); peak MB: tracemalloc peak while building.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Micro-benchmark of invoice_parser.scan_block against the original per-field
+parse_* functions (tests/test_invoice_parser.py checks they agree).
+
+    python benchmarks/bench_invoice_parser.py --blocks 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+from invoice_parser import scan_block  # noqa: E402
+from synthetic import make_block  # noqa: E402
+from test_invoice_parser import legacy_block  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--blocks", type=int, default=50_000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    blocks = [make_block(rng) for _ in range(args.blocks)]
+
+    for name, fn in (("legacy", legacy_block), ("scan_block", lambda *b: scan_block(*b).as_row())):
+        t0 = time.perf_counter()
+        for block in blocks:
+            fn(*block)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>10}: {elapsed:.3f}s  ({elapsed / len(blocks) * 1e6:.1f} us/block)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compares the ChildIndex join with pd.merge on synthetic parent/child
+manifests, and the join alone once the child index is built.
+
+    python benchmarks/bench_join.py --sizes 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hawb_join import ChildIndex, left_join  # noqa: E402
+from synthetic import make_child, make_parent  # noqa: E402
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = ap.parse_args()
+
+    print(f"{'parent':>10} {'child':>9} {'merge s':>9} {'index s':>9} {'join s':>9} "
+          f"{'join rows/s':>12} {'speedup':>8}")
+    for n in args.sizes:
+        parent = make_parent(n)
+        child = make_child(parent)
+        # pd.merge multiplies rows on repeated keys; keep the comparison like for like.
+        child = child[~child["HAWB"].duplicated()]
+
+        merged, t_merge = _timed(
+            lambda: pd.merge(parent, child, on="HAWB", how="left", suffixes=("_parent", "_child"))
+        )
+        index, t_index = _timed(ChildIndex, child)
+        (joined, _), t_join = _timed(left_join, parent, index)
+        pd.testing.assert_frame_equal(joined, merged)
+
+        print(f"{n:>10} {len(child):>9} {t_merge:>9.3f} {t_index:>9.3f} {t_join:>9.3f} "
+              f"{n / t_join:>12,.0f} {t_merge / (t_index + t_join):>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Record store at scale: rows/s added from synthetic parent and child
+manifests, then the latency of exact and prefix lookups through the key
+index against a full scan of the stored rows for the same number.
+
+    python benchmarks/bench_record_search.py --rows 100000 1000000 --lookups 200
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from record_store import KIND_CHILD, KIND_PARENT, RecordStore, page_numbers  # noqa: E402
+from synthetic import make_child, make_parent, raw_tables  # noqa: E402
+
+# Parent rows per stored "file", about a large manifest.
+ROWS_PER_FILE = 50_000
+
+
+def _ms(samples):
+    return np.percentile(np.array(samples) * 1000, [50, 99])
+
+
+def _lookups(store, terms, **kwargs):
+    samples = []
+    for term in terms:
+        t0 = time.perf_counter()
+        store.search(term, **kwargs)
+        samples.append(time.perf_counter() - t0)
+    return _ms(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--lookups", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"{'parent rows':>12} {'stored':>9} {'keys':>9} {'add rows/s':>11} "
+          f"{'exact p50/p99 ms':>17} {'prefix p50/p99 ms':>18} {'scan ms':>8}")
+    for n in args.rows:
+        work_dir = tempfile.mkdtemp(prefix="bench-records-")
+        store = RecordStore(os.path.join(work_dir, "records.sqlite3"))
+        parent, rng = make_parent(n), np.random.default_rng(7)
+        child = make_child(parent)
+
+        files = -(-n // ROWS_PER_FILE)
+        parts = [
+            (kind, df.iloc[bounds[0]:bounds[-1] + 1])
+            for kind, df in ((KIND_PARENT, parent), (KIND_CHILD, child))
+            for bounds in np.array_split(np.arange(len(df)), files)
+        ]
+
+        t0 = time.perf_counter()
+        for file_no, (kind, part) in enumerate(parts):
+            # The store keys files by path, size and mtime; any file will do.
+            path = os.path.join(work_dir, f"{kind}-{file_no}.pdf")
+            with open(path, "wb") as f:
+                f.write(path.encode())
+            store.add_frame(path, kind, part, page_numbers(raw_tables(part, {})))
+        seconds = time.perf_counter() - t0
+        stats = store.stats()
+
+        hawbs = rng.choice(parent["HAWB"].to_numpy(), size=args.lookups)
+        babies = child["secondary"].str.split(", ").explode().dropna()
+        babies = rng.choice(babies[babies != ""].to_numpy(), size=args.lookups)
+        exact = _lookups(store, list(hawbs) + list(babies))
+        prefix = _lookups(store, [h[:6] for h in hawbs], prefix=True, limit=200)
+
+        db = sqlite3.connect(store.db_path)
+        t0 = time.perf_counter()
+        db.execute("SELECT COUNT(*) FROM records WHERE data LIKE ?", (f"%{hawbs[0]}%",)).fetchone()
+        scan_ms = (time.perf_counter() - t0) * 1000
+        db.close()
+
+        print(f"{n:>12} {stats['rows']:>9} {stats['keys']:>9} {stats['rows'] / seconds:>11,.0f} "
+              f"{exact[0]:>8.2f}/{exact[1]:<8.2f} {prefix[0]:>9.2f}/{prefix[1]:<8.2f} {scan_ms:>8.0f}")
+
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+    print("\nscan ms: one LIKE over every stored row, what a lookup costs without the key index.")
+
+
+if __name__ == "__main__":
+    main()
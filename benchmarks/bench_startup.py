@@ -0,0 +1,133 @@
+"""
+Cold-start times of the desktop app, each measured in a fresh interpreter:
+
+- import: how long each heavy module takes to import on its own;
+- eager: process start until the main menu is shown when both pages are
+  imported up front (what app.py used to do);
+- lazy: the same with app.py as it is (pages imported on first use), plus
+  the time until the background warm-up has imported every page;
+- navigate: opening each page right after the menu appears, warm-up off
+  (the worst case, a user clicking before the warm-up got there).
+
+    python benchmarks/bench_startup.py --repeat 5
+
+Runs Qt offscreen unless --onscreen is given.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = [
+    "PyQt5.QtWidgets",
+    "main",
+    "app",
+    "pandas",
+    "pdfplumber",
+    "camelot",
+    "cargo_manifest",
+    "invoice_extract",
+    "CompareCargoManifests",
+    "ExtractInvoiceData",
+]
+
+# Runs in the child interpreter. Prints one JSON line per milestone, flushed,
+# so the parent can timestamp them from process start.
+CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+mode = sys.argv[1]
+
+def mark(name, **extra):
+    print(json.dumps(dict(extra, event=name)), flush=True)
+
+from PyQt5 import QtWidgets
+if mode == "eager":
+    import CompareCargoManifests, ExtractInvoiceData
+import app
+
+qapp = QtWidgets.QApplication(sys.argv[:1])
+window = app.MainApp(warmup=(mode == "lazy"))
+window.show()
+qapp.processEvents()
+mark("menu")
+
+if mode == "lazy":
+    while not window.warmup_finished.wait(0.01):
+        qapp.processEvents()
+    mark("warm")
+elif mode == "navigate":
+    for index, name in ((app.PAGE_COMPARE, "compare page"), (app.PAGE_EXTRACT, "extract page")):
+        t0 = time.perf_counter()
+        window.switch_page(index)
+        qapp.processEvents()
+        mark(name, seconds=time.perf_counter() - t0)
+os._exit(0)
+"""
+
+
+def _env(onscreen: bool) -> dict:
+    env = dict(os.environ)
+    if not onscreen:
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def time_import(module: str, env: dict) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def run_child(mode: str, env: dict) -> Dict[str, float]:
+    """Milestone -> seconds since the child process was started."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", CHILD, mode], cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True
+    )
+    times: Dict[str, float] = {}
+    for line in proc.stdout:
+        if not line.startswith("{"):
+            continue
+        event = json.loads(line)
+        name = event["event"]
+        # Page opening is timed inside the child; the rest from process start.
+        times[name] = event["seconds"] if "seconds" in event else time.perf_counter() - t0
+    proc.wait()
+    return times
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=3, help="runs per measurement; the median is shown")
+    ap.add_argument("--onscreen", action="store_true", help="use the real display instead of offscreen Qt")
+    ap.add_argument("--skip-imports", action="store_true")
+    args = ap.parse_args()
+    env = _env(args.onscreen)
+
+    if not args.skip_imports:
+        print(f"{'module':<24} {'import s':>9}")
+        for module in IMPORTS:
+            samples = [time_import(module, env) for _ in range(args.repeat)]
+            print(f"{module:<24} {statistics.median(samples):>9.3f}")
+        print()
+
+    print(f"{'mode':<10} {'milestone':<14} {'s':>8}")
+    for mode in ("eager", "lazy", "navigate"):
+        runs: List[Dict[str, float]] = [run_child(mode, env) for _ in range(args.repeat)]
+        for name in runs[0]:
+            values = [r[name] for r in runs if name in r]
+            print(f"{mode:<10} {name:<14} {statistics.median(values):>8.3f}")
+
+    print("\nmenu/warm: seconds from process start (interpreter startup included); "
+          "pages: seconds to open each page.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Peak memory of a compare run held in memory (combine, join, expand,
+select, export) against the streamed run (spill chunks, index the child,
+merge and write chunk by chunk), on synthetic raw manifest tables. Both
+write Parquet; the output files are compared row for row.
+
+    python benchmarks/bench_stream_memory.py --rows 100000 1000000 --chunk-rows 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cargo_manifest import (  # noqa: E402
+    build_frame,
+    combine_children,
+    combine_parents,
+    expand_secondary_to_master_baby,
+    join_parent_child,
+    rename_columns_child,
+    rename_columns_parent,
+    select_final_columns,
+)
+from exporters import export_frame, get_exporter  # noqa: E402
+from manifest_stream import STREAM_CHUNK_ROWS, SpillStore, write_compare  # noqa: E402
+from synthetic import make_child_tables, make_parent_tables  # noqa: E402
+
+# Pages per spilled chunk, as extraction hands them over.
+PAGES_PER_CHUNK = 16
+
+
+def in_memory(parent_pages, child_pages, path):
+    df_parent = combine_parents([parent_pages])
+    df_child = combine_children([child_pages])
+    merged, _ = join_parent_child(df_parent, df_child)
+    del df_parent, df_child
+    out = select_final_columns(expand_secondary_to_master_baby(merged))
+    del merged
+    export_frame(out, path, fmt="parquet")
+    return len(out)
+
+
+def streamed(parent_pages, child_pages, path, chunk_rows):
+    work_dir = tempfile.mkdtemp(prefix="bench-spill-")
+    parents = SpillStore(work_dir, "parent")
+    children = SpillStore(work_dir, "child")
+    for pages, store, rename in ((parent_pages, parents, rename_columns_parent),
+                                 (child_pages, children, rename_columns_child)):
+        for start in range(0, len(pages), PAGES_PER_CHUNK):
+            chunk = pages[start:start + PAGES_PER_CHUNK]
+            store.append(build_frame((tbl for tables in chunk for tbl in tables), rename=rename))
+    result = write_compare(parents, children, path, get_exporter("parquet"), chunk_rows=chunk_rows)
+    for part in parents.parts + children.parts:
+        os.remove(part)
+    os.rmdir(work_dir)
+    return result.rows_written
+
+
+def _measure(fn, *args):
+    # The raw pages are already allocated, so the peak is what the run adds.
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = fn(*args)
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, seconds, peak
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--chunk-rows", type=int, default=STREAM_CHUNK_ROWS)
+    args = ap.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="bench-stream-")
+    mb = 1024 * 1024
+    print(f"{'parent rows':>12} {'out rows':>9} {'mem peak MB':>12} {'stream peak MB':>15} "
+          f"{'mem s':>7} {'stream s':>9} {'same':>5}")
+    for n in args.rows:
+        parent_pages, child_pages = make_parent_tables(n), make_child_tables(n)
+        mem_path = os.path.join(out_dir, f"memory-{n}.parquet")
+        stream_path = os.path.join(out_dir, f"stream-{n}.parquet")
+
+        rows, t_mem, peak_mem = _measure(in_memory, parent_pages, child_pages, mem_path)
+        _, t_stream, peak_stream = _measure(streamed, parent_pages, child_pages, stream_path, args.chunk_rows)
+
+        # Categoricals are plain strings in the streamed file.
+        same = pd.read_parquet(mem_path).astype(str).equals(pd.read_parquet(stream_path).astype(str))
+        print(f"{n:>12} {rows:>9} {peak_mem / mb:>12.1f} {peak_stream / mb:>15.1f} "
+              f"{t_mem:>7.2f} {t_stream:>9.2f} {str(same):>5}")
+        os.remove(mem_path)
+        os.remove(stream_path)
+
+    os.rmdir(out_dir)
+    print("\npeak MB: tracemalloc peak during the run, not counting the raw tables it starts from.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+Benchmark suite for the extraction and compare stages, for catching speed
+and memory regressions between commits.
+
+Two suites run by default:
+
+- pdf: extract_all_tables on every PDF in PDF/ (names containing "child"
+  are child manifests, the rest parents), then merge_parent_child,
+  expand_secondary_to_master_baby and select_final_columns on the result,
+  and extract_filtered_data_with_following_rows on every PDF (plus any
+  --invoice PDFs). The extraction cache is not used.
+- synthetic: manifests with 10x/100x/1000x the rows of the bundled parent
+  manifests, handed over as raw page tables. combine_parents /
+  combine_children stand in for extract_all_tables (frame building without
+  the pdfplumber parse), followed by the same merge/expand/select stages and
+  blocks_to_frame on as many synthetic invoice blocks.
+
+Every stage records wall time, peak RSS of this process while it ran
+(worker processes are not included) and rows/s into a JSON results file:
+
+    python benchmarks/run_benchmarks.py run -o before.json
+    python benchmarks/run_benchmarks.py run -o after.json --baseline before.json
+    python benchmarks/run_benchmarks.py compare before.json after.json
+
+compare exits non-zero when a stage got slower, or its RSS growth (peak
+minus RSS at the start of the stage) larger, by more than --threshold.
+"""
+import argparse
+import datetime
+import gc
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:  # optional: /proc or the Win32 API are used instead
+    psutil = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cargo_manifest import (  # noqa: E402
+    combine_children,
+    combine_parents,
+    count_pages,
+    expand_secondary_to_master_baby,
+    extract_all_tables,
+    merge_parent_child,
+    rename_columns_child,
+    rename_columns_parent,
+    select_final_columns,
+    type_columns,
+)
+from invoice_extract import blocks_to_frame, extract_filtered_data_with_following_rows  # noqa: E402
+from synthetic import make_child_tables, make_invoice_tables, make_parent_tables  # noqa: E402
+
+RESULTS_VERSION = 1
+DEFAULT_SCALES = [10, 100, 1000]
+
+# Rows in the bundled parent manifests (PDF/Parent.pdf + PDF/Parent (2).pdf),
+# the 1x of the synthetic scales. Fixed so results stay comparable when PDF/ changes.
+BASE_ROWS = 77
+
+# How often peak RSS is sampled while a stage runs.
+RSS_POLL_SECONDS = 0.005
+
+# compare: relative change that counts as a regression, and timings / RSS
+# growth too small to judge (scheduler and allocator noise dominate).
+DEFAULT_THRESHOLD = 0.10
+MIN_COMPARE_SECONDS = 0.05
+MIN_COMPARE_MB = 5.0
+
+MB = 1024 * 1024
+
+
+def _windows_rss() -> Optional[int]:
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
+def rss_source() -> Optional[str]:
+    if psutil is not None:
+        return "psutil"
+    if os.path.exists("/proc/self/statm"):
+        return "proc"
+    if sys.platform == "win32":
+        return "win32"
+    return None
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, None where it can't be read."""
+    source = rss_source()
+    if source == "psutil":
+        return psutil.Process().memory_info().rss
+    if source == "proc":
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    if source == "win32":
+        return _windows_rss()
+    return None
+
+
+class PeakRss:
+    """Samples RSS on a background thread while the with-block runs."""
+
+    def __init__(self, interval: float = RSS_POLL_SECONDS):
+        self.interval = interval
+        self.start: Optional[int] = None
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "PeakRss":
+        self.start = current_rss()
+        self.peak = self.start
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+@dataclass
+class StageResult:
+    suite: str
+    input: str
+    stage: str
+    rows: int
+    seconds: float
+    rows_out: Optional[int] = None
+    pages: Optional[int] = None
+    peak_rss_mb: Optional[float] = None
+    rss_growth_mb: Optional[float] = None
+
+    @property
+    def rows_per_s(self) -> Optional[float]:
+        return self.rows / self.seconds if self.seconds > 0 else None
+
+    def as_dict(self) -> dict:
+        out = asdict(self)
+        out["rows_per_s"] = self.rows_per_s
+        return out
+
+
+def _rows(out) -> int:
+    if out is None:
+        return 0
+    if isinstance(out, tuple):
+        return sum(_rows(part) for part in out)
+    return len(out)
+
+
+def measure(
+    suite: str,
+    input_name: str,
+    stage: str,
+    fn: Callable[[], object],
+    repeat: int,
+    rows: Optional[int] = None,
+    pages: Optional[int] = None,
+):
+    """
+    Runs fn repeat times and keeps the fastest run and the highest RSS peak.
+    rows is the stage's input row count; when None the output's is used
+    (extraction stages, whose input is pages).
+    """
+    seconds, peak, growth, out = None, None, None, None
+    for _ in range(repeat):
+        out = None
+        gc.collect()
+        with PeakRss() as rss:
+            t0 = time.perf_counter()
+            out = fn()
+            elapsed = time.perf_counter() - t0
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+        if rss.peak is not None:
+            peak = rss.peak if peak is None else max(peak, rss.peak)
+            grew = rss.peak - rss.start
+            growth = grew if growth is None else max(growth, grew)
+
+    rows_out = _rows(out)
+    result = StageResult(
+        suite=suite,
+        input=input_name,
+        stage=stage,
+        rows=rows_out if rows is None else rows,
+        rows_out=rows_out,
+        seconds=seconds,
+        pages=pages,
+        peak_rss_mb=None if peak is None else round(peak / MB, 1),
+        rss_growth_mb=None if growth is None else round(growth / MB, 1),
+    )
+    rate = result.rows_per_s
+    print(f"  {suite:<9} {input_name:<22} {stage:<42} {result.rows:>9} rows {seconds:>9.3f}s "
+          f"{rate or 0:>12,.0f} rows/s  peak {result.peak_rss_mb if peak is not None else '-'} MB",
+          flush=True)
+    return out, result
+
+
+def _compare_stages(
+    suite: str,
+    input_name: str,
+    df_parent: pd.DataFrame,
+    df_child: pd.DataFrame,
+    repeat: int,
+) -> List[StageResult]:
+    """merge_parent_child -> expand_secondary_to_master_baby -> select_final_columns."""
+    results = []
+    merged, r = measure(suite, input_name, "merge_parent_child",
+                        lambda: merge_parent_child(df_parent, df_child), repeat,
+                        rows=len(df_parent) + len(df_child))
+    results.append(r)
+    expanded, r = measure(suite, input_name, "expand_secondary_to_master_baby",
+                          lambda: expand_secondary_to_master_baby(merged), repeat, rows=len(merged))
+    results.append(r)
+    _, r = measure(suite, input_name, "select_final_columns",
+                   lambda: select_final_columns(expanded), repeat, rows=len(expanded))
+    results.append(r)
+    return results
+
+
+def _is_child(path: str) -> bool:
+    return "child" in os.path.basename(path).lower()
+
+
+def pdf_suite(
+    pdf_dir: str, invoice_pdfs: Sequence[str], repeat: int, workers: Optional[int]
+) -> List[StageResult]:
+    pdfs = sorted(glob.glob(os.path.join(pdf_dir, "*.pdf")))
+    if not pdfs:
+        print(f"  no PDFs in {pdf_dir}, skipping the pdf suite")
+        return []
+
+    results: List[StageResult] = []
+    parents: List[pd.DataFrame] = []
+    children: List[pd.DataFrame] = []
+    for path in pdfs:
+        df, r = measure("pdf", os.path.basename(path), "extract_all_tables",
+                        lambda: extract_all_tables(path, max_workers=workers), repeat,
+                        pages=count_pages(path))
+        results.append(r)
+        if _is_child(path):
+            children.append(rename_columns_child(df))
+        else:
+            parents.append(rename_columns_parent(df))
+
+    # Normalised like the compare pipeline does it; not timed.
+    if parents:
+        df_parent = type_columns(pd.concat(parents, ignore_index=True))
+        df_child = type_columns(pd.concat(children, ignore_index=True)) if children else pd.DataFrame()
+        results += _compare_stages("pdf", "PDF", df_parent, df_child, repeat)
+
+    for path in list(pdfs) + list(invoice_pdfs):
+        _, r = measure("pdf", os.path.basename(path), "extract_filtered_data_with_following_rows",
+                       lambda: extract_filtered_data_with_following_rows(path, max_workers=workers), repeat,
+                       pages=count_pages(path))
+        results.append(r)
+    return results
+
+
+def synthetic_suite(scale: int, base_rows: int, repeat: int) -> List[StageResult]:
+    n = scale * base_rows
+    name = f"x{scale}"
+    parent_tables = make_parent_tables(n)
+    child_tables = make_child_tables(n)
+    results: List[StageResult] = []
+
+    df_parent, r = measure("synthetic", name, "combine_parents",
+                           lambda: combine_parents([parent_tables]), repeat)
+    results.append(r)
+    df_child, r = measure("synthetic", name, "combine_children",
+                          lambda: combine_children([child_tables]), repeat)
+    results.append(r)
+    del parent_tables, child_tables
+
+    results += _compare_stages("synthetic", name, df_parent, df_child, repeat)
+    del df_parent, df_child
+
+    tables = make_invoice_tables(n)
+    _, r = measure("synthetic", name, "blocks_to_frame", lambda: blocks_to_frame(tables), repeat,
+                   rows=sum(len(t) for t in tables))
+    results.append(r)
+    return results
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args: argparse.Namespace) -> dict:
+    commit = _git("rev-parse", "--short", "HEAD")
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "version": RESULTS_VERSION,
+        "commit": commit,
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "rss_source": rss_source(),
+        "scales": args.scales,
+        "base_rows": args.base_rows,
+        "repeat": args.repeat,
+        "workers": args.workers,
+    }
+
+
+def load_results(path: str) -> Tuple[dict, Dict[Tuple[str, str, str], dict]]:
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    stages = {(s["suite"], s["input"], s["stage"]): s for s in data["results"]}
+    return data.get("environment", {}), stages
+
+
+def _ratio(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None or old <= 0:
+        return None
+    return new / old
+
+
+def compare(old_path: str, new_path: str, threshold: float = DEFAULT_THRESHOLD) -> int:
+    """Prints old vs new per stage; returns the number of regressions."""
+    old_env, old = load_results(old_path)
+    new_env, new = load_results(new_path)
+    print(f"old: {old_path} ({old_env.get('commit')}), new: {new_path} ({new_env.get('commit')})")
+    print(f"{'suite':<9} {'input':<22} {'stage':<42} {'old s':>9} {'new s':>9} {'time':>7} "
+          f"{'old +MB':>8} {'new +MB':>8} {'memory':>7}")
+
+    regressions = 0
+    for key in list(old) + [k for k in new if k not in old]:
+        o, n = old.get(key), new.get(key)
+        if o is None or n is None:
+            print(f"{key[0]:<9} {key[1]:<22} {key[2]:<42} {'only in ' + ('old' if n is None else 'new'):>9}")
+            continue
+
+        t_ratio = _ratio(o["seconds"], n["seconds"])
+        o_mb, n_mb = o.get("rss_growth_mb"), n.get("rss_growth_mb")
+        m_ratio = _ratio(o_mb, n_mb)
+        flags = []
+        if t_ratio is not None and max(o["seconds"], n["seconds"]) >= MIN_COMPARE_SECONDS:
+            if t_ratio > 1 + threshold:
+                flags.append("SLOWER")
+            elif t_ratio < 1 - threshold:
+                flags.append("faster")
+        if m_ratio is not None and m_ratio > 1 + threshold and n_mb - o_mb >= MIN_COMPARE_MB:
+            flags.append("MORE MEMORY")
+        if o["rows"] != n["rows"]:
+            flags.append(f"rows {o['rows']} -> {n['rows']}")
+        regressions += sum(f in ("SLOWER", "MORE MEMORY") for f in flags)
+
+        print(f"{key[0]:<9} {key[1]:<22} {key[2]:<42} {o['seconds']:>9.3f} {n['seconds']:>9.3f} "
+              f"{t_ratio or 0:>6.2f}x {o_mb or 0:>8.1f} {n_mb or 0:>8.1f} "
+              f"{m_ratio or 0:>6.2f}x  {' '.join(flags)}")
+
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}.")
+    return regressions
+
+
+def run(args: argparse.Namespace) -> int:
+    results: List[StageResult] = []
+    if not args.skip_pdf:
+        print(f"pdf suite ({args.pdf_dir}):")
+        results += pdf_suite(args.pdf_dir, args.invoice, args.repeat, args.workers)
+    for scale in args.scales:
+        print(f"synthetic x{scale} ({scale * args.base_rows} parent rows):")
+        results += synthetic_suite(scale, args.base_rows, args.repeat)
+
+    env = environment(args)
+    out = args.output or os.path.join(ROOT, "benchmarks", "results", f"{env['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump({"environment": env, "results": [r.as_dict() for r in results]}, fh, indent=2)
+    print(f"\nwrote {len(results)} stage results to {out}")
+
+    if args.baseline:
+        print()
+        return 1 if compare(args.baseline, out, args.threshold) else 0
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="run the suites and write a results file")
+    run_p.add_argument("-o", "--output", help="results file (default: benchmarks/results/<commit>.json)")
+    run_p.add_argument("--pdf-dir", default=os.path.join(ROOT, "PDF"))
+    run_p.add_argument("--invoice", nargs="*", default=[], help="invoice PDFs to time as well")
+    run_p.add_argument("--scales", type=int, nargs="*", default=DEFAULT_SCALES,
+                       help="synthetic sizes as multiples of --base-rows")
+    run_p.add_argument("--base-rows", type=int, default=BASE_ROWS)
+    run_p.add_argument("--repeat", type=int, default=1, help="runs per stage; the fastest is kept")
+    run_p.add_argument("--workers", type=int, default=None, help="extraction worker processes")
+    run_p.add_argument("--skip-pdf", action="store_true", help="synthetic suite only")
+    run_p.add_argument("--baseline", help="results file to compare this run against")
+    run_p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    cmp_p = sub.add_parser("compare", help="compare two results files")
+    cmp_p.add_argument("old")
+    cmp_p.add_argument("new")
+    cmp_p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = ap.parse_args()
+    if args.command == "compare":
+        return 1 if compare(args.old, args.new, args.threshold) else 0
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
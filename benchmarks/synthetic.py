@@ -0,0 +1,157 @@
+"""
+Synthetic manifests shaped like the frames the compare pipeline produces,
+for benchmarks that need more rows than the bundled PDFs provide, and
+the raw tables that pdfplumber / Camelot would hand over for them.
+"""
+import random
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from extraction_cache import PageTables, RawTable
+
+
+# Rows per raw table, about what one manifest page holds.
+ROWS_PER_TABLE = 40
+
+# Camelot columns scan_block reads, and the width of an invoice table.
+INVOICE_COLUMNS = (1, 12, 16)
+INVOICE_WIDTH = 17
+
+ORIGINS = ["CMB", "DXB", "SIN", "HKG", "LHR", "FRA", "JFK", "BOM"]
+BILL_TERMS = ["PP", "CC", "DDP", "DAP"]
+
+
+def _hawbs(rng: np.random.Generator, n: int, prefix: str = "") -> np.ndarray:
+    return np.char.add(prefix, rng.integers(10**9, 10**10, size=n).astype(str))
+
+
+def make_parent(n: int, seed: int = 0) -> pd.DataFrame:
+    """Normalised parent manifest (after rename_columns_parent)."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "#": np.arange(1, n + 1).astype(str),
+        "Origin": rng.choice(ORIGINS, size=n),
+        "HAWB": _hawbs(rng, n),
+        "Pcs": rng.integers(1, 20, size=n).astype(str),
+        "Weight": np.round(rng.uniform(0.1, 500, size=n), 2).astype(str),
+        "Shipper Details": np.char.add("SHIPPER ", rng.integers(0, 5000, size=n).astype(str)),
+        "Dest": rng.choice(ORIGINS, size=n),
+        "Bill\nTerm": rng.choice(BILL_TERMS, size=n),
+        "Consignee Details": np.char.add("CONSIGNEE ", rng.integers(0, 20000, size=n).astype(str)),
+        "Description\nof Goods": rng.choice(["DOCUMENTS", "SPARE PARTS", "GARMENTS", "SAMPLES"], size=n),
+        "Total\nValue": np.round(rng.uniform(1, 5000, size=n), 2).astype(str),
+        "Total\nValue(LKR)": np.round(rng.uniform(300, 1_500_000, size=n), 2).astype(str),
+    })
+
+
+def _secondary_lists(rng: np.random.Generator, n: int, share: float) -> list:
+    counts = np.where(rng.random(n) < share, rng.integers(1, 6, size=n), 0)
+    babies = _hawbs(rng, int(counts.sum()), "1Z")
+    out, pos = [], 0
+    for c in counts:
+        out.append(", ".join(babies[pos:pos + c]))
+        pos += c
+    return out
+
+
+def make_child(parent: pd.DataFrame, share_matched: float = 0.6, seed: int = 1) -> pd.DataFrame:
+    """Normalised child manifest (after rename_columns_child) covering part of parent."""
+    rng = np.random.default_rng(seed)
+    hawb = parent["HAWB"].to_numpy()
+    picked = hawb[rng.random(len(hawb)) < share_matched]
+    n = len(picked)
+    return pd.DataFrame({
+        "#": np.arange(1, n + 1).astype(str),
+        "Origin": rng.choice(ORIGINS, size=n),
+        "HAWB": picked,
+        "Pcs": rng.integers(1, 20, size=n).astype(str),
+        "Weight": np.round(rng.uniform(0.1, 500, size=n), 2).astype(str),
+        "secondary": _secondary_lists(rng, n, share=0.5),
+        "Description\nof Goods": rng.choice(["DOCUMENTS", "SPARE PARTS"], size=n),
+        "Status": rng.choice(["OK", "HOLD"], size=n),
+        "Consignee\nDetails": np.char.add("CONSIGNEE ", rng.integers(0, 20000, size=n).astype(str)),
+    })
+
+
+def make_merged(n: int, seed: int = 0) -> pd.DataFrame:
+    """Merged parent/child frame, i.e. the input of expand_secondary_to_master_baby."""
+    parent = make_parent(n, seed=seed)
+    child = make_child(parent, seed=seed + 1)
+    return pd.merge(parent, child, on="HAWB", how="left", suffixes=("_parent", "_child"))
+
+
+def raw_tables(df: pd.DataFrame, headers: Dict[str, str], rows_per_table: int = ROWS_PER_TABLE) -> PageTables:
+    """
+    df as the pages of one PDF, one table per page, the header row repeated
+    on every page and columns named as in the PDF (headers maps normalised
+    names back to the raw ones).
+    """
+    header = [headers.get(c, c) for c in df.columns]
+    rows = df.to_numpy(dtype=object).tolist()
+    pages: PageTables = []
+    for start in range(0, len(rows), rows_per_table):
+        tbl: RawTable = [header] + rows[start:start + rows_per_table]
+        pages.append([tbl])
+    return pages
+
+
+def make_parent_tables(n: int, seed: int = 0) -> PageTables:
+    """make_parent() as raw parent manifest pages, LKR values with thousands separators."""
+    df = make_parent(n, seed=seed)
+    df["Total\nValue(LKR)"] = df["Total\nValue(LKR)"].astype(float).map("{:,.2f}".format)
+    return raw_tables(df, {"HAWB": "HAWB\nNumber"})
+
+
+def make_child_tables(n: int, seed: int = 0) -> PageTables:
+    """make_child() for the parent of make_parent_tables(n, seed), as raw child manifest pages."""
+    child = make_child(make_parent(n, seed=seed), seed=seed + 1)
+    return raw_tables(child, {"HAWB": "HAWB\nShipment", "secondary": "Secondary Tracking Numbers"})
+
+
+def _pick(rng, options):
+    return options[rng.randrange(len(options))]
+
+
+def make_block(rng: random.Random):
+    """One synthetic block, deliberately covering the awkward cases seen in invoices."""
+    ups = f"1Z{rng.randrange(10**8, 10**9)}{_pick(rng, ['AB', 'x9', ''])}"
+    col1 = [
+        _pick(rng, ["Marks", "marks ", "31 Packages", ""]),
+        _pick(rng, [ups, ups + "marks", ups + "of", ups + "Of 2", f"Number and kind {rng.randrange(99)} PK", "", "CONT-778"]),
+        _pick(rng, [f"Description: PART {rng.randrange(1000)}", "description:   spare  ", "Desc PART", ""]),
+        _pick(rng, ["Number and kind", "1z123", "filler", ""]),
+    ]
+    code = str(rng.randrange(10**6, 10**9))
+    gross = f"{rng.randrange(1, 9999)}.{rng.randrange(10, 99)}"
+    col12 = [
+        _pick(rng, [f"33 Commodity (HS) Code{code}", f"33 commodity (hs) code{code[:1]}", "x", ""]),
+        _pick(rng, [f"35 Gross Mass (Kg){gross}", f"35 Gross Mass (Kg)KG{gross}", "35 Gross Mass (Kg)12", "42", ""]),
+        _pick(rng, [f"{rng.randrange(1, 999)},{rng.randrange(100, 999)}.00", "4.2", "", "1,2,3"]),
+    ]
+    col16 = [
+        _pick(rng, ["", f"{rng.randrange(1, 9)},{rng.randrange(100, 999)}.{rng.randrange(10, 99)}", "42", "USD", "4,2"]),
+        _pick(rng, ["", "\n", f"{rng.randrange(100)}"]),
+    ]
+    return col1, col12, col16
+
+
+def make_invoice_tables(n_blocks: int, seed: int = 0, blocks_per_table: int = 10) -> List[pd.DataFrame]:
+    """
+    Camelot tables holding n_blocks invoice blocks (make_block), each
+    starting on a "31 Packages" anchor row, as read_invoice_tables returns them.
+    """
+    rng = random.Random(seed)
+    block_rows = 5
+    tables: List[pd.DataFrame] = []
+    for first in range(0, n_blocks, blocks_per_table):
+        count = min(blocks_per_table, n_blocks - first)
+        cells = [["" for _ in range(INVOICE_WIDTH)] for _ in range(count * block_rows)]
+        for b in range(count):
+            for column, block_cells in zip(INVOICE_COLUMNS, make_block(rng)):
+                for r, text in enumerate(block_cells):
+                    cells[b * block_rows + r][column] = text
+            cells[b * block_rows][1] = "31 Packages"
+        tables.append(pd.DataFrame(cells))
+    return tables
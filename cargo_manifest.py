@@ -0,0 +1,495 @@
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pdfplumber
+import pandas as pd
+
+from extraction_cache import ExtractionCache, PageTables, RawTable
+from hawb_join import ChildIndex, JoinReport, left_join
+from record_store import KIND_CHILD, KIND_PARENT, RecordStore
+from tracing import Trace, stage
+
+
+ProgressCallback = Callable[[int, int, int], None]
+CancelCallback = Callable[[], bool]
+
+# Pages handed to one worker at a time. Each task re-opens the PDF, so a
+# chunk has to be large enough to amortise that, yet small enough to keep
+# every core busy on the last file.
+MAX_PAGES_PER_TASK = 16
+
+# Recorded in cache keys; change it whenever extract_tables() arguments change.
+EXTRACTOR_SETTINGS = {"extractor": "pdfplumber", "table_settings": {}}
+
+# How often a parallel run checks for cancellation while pages are in flight.
+CANCEL_POLL_SECONDS = 0.2
+
+# Typed frames: few distinct values repeated on every row are stored as
+# categoricals. Count/weight/value columns stay text, so exports keep the
+# PDF's formatting ("1,522,140.38", "0.00", blanks).
+CATEGORY_COLUMNS = ["Origin", "Dest", "Bill\nTerm"]
+
+
+class ExtractionCancelled(Exception):
+    pass
+
+
+def clean_cell(value):
+    if isinstance(value, str):
+        return value.replace("\\n", " ").replace("\n", " ").strip()
+    return value
+
+
+def _header(tbl: RawTable) -> List[str]:
+    return [str(h).strip() if h is not None else "" for h in tbl[0]]
+
+
+def _table_to_frame(tbl: RawTable) -> pd.DataFrame:
+    return pd.DataFrame(tbl[1:], columns=_header(tbl))
+
+
+def _is_usable(tbl: Optional[RawTable]) -> bool:
+    return bool(tbl) and len(tbl) >= 2
+
+
+def _page_tables(page) -> List[RawTable]:
+    return [tbl for tbl in (page.extract_tables() or []) if _is_usable(tbl)]
+
+
+def extract_tables_from_page(page) -> List[pd.DataFrame]:
+    return [_table_to_frame(tbl) for tbl in _page_tables(page)]
+
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> PageTables:
+    """
+    Worker entry point: opens the PDF itself and returns the raw tables of
+    pages [start, stop), one list per page.
+    """
+    page_numbers = list(range(start + 1, stop + 1))  # pdfplumber is 1-based
+    with pdfplumber.open(pdf_path, pages=page_numbers) as pdf:
+        return [_page_tables(page) for page in pdf.pages]
+
+
+def pages_to_frame(pages: PageTables, typed: bool = False) -> pd.DataFrame:
+    return tables_to_frame([tbl for tables in pages for tbl in tables], typed=typed)
+
+
+def build_frame(
+    tables: Iterable[RawTable],
+    rename: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+) -> pd.DataFrame:
+    """
+    Stacks raw tables into one frame, the same as concatenating a DataFrame
+    per table and mapping clean_cell over the result, but built column by
+    column: each cell is cleaned as it is appended, and no per-table frames
+    or post-concat copy exist. rename, when given, normalises each table's
+    header before its rows are placed.
+    """
+    # (name, n-th occurrence in its table) -> cell values; keeps repeated headers apart.
+    slots: Dict[Tuple[str, int], List] = {}
+    # Raw header -> slot keys; manifests repeat the same header on every page.
+    header_keys: Dict[Tuple[str, ...], List[Tuple[str, int]]] = {}
+    total = 0
+    for tbl in tables:
+        raw_header = tuple(_header(tbl))
+        keys = header_keys.get(raw_header)
+        if keys is None:
+            header = list(raw_header)
+            if rename is not None:
+                header = [str(c) for c in rename(pd.DataFrame(columns=header)).columns]
+            seen: Dict[str, int] = {}
+            keys = []
+            for name in header:
+                keys.append((name, seen.get(name, 0)))
+                seen[name] = keys[-1][1] + 1
+            header_keys[raw_header] = keys
+
+        width = len(keys)
+        rows = [row if len(row) == width else (list(row) + [None] * width)[:width] for row in tbl[1:]]
+        for key in keys:
+            slots.setdefault(key, [None] * total)
+        for key, cells in zip(keys, zip(*rows)):
+            slots[key].extend(map(clean_cell, cells))
+
+        total += len(rows)
+        for values in slots.values():
+            if len(values) < total:
+                values.extend([None] * (total - len(values)))
+
+    if not slots:
+        return pd.DataFrame()
+
+    names = [name for name, _ in slots]
+    # Convert and release one column at a time, so only one list of boxed
+    # strings is alive next to the finished columns.
+    columns = {i: pd.Series(slots.pop(key)) for i, key in enumerate(list(slots))}
+    df = pd.DataFrame(columns)
+    df.columns = names
+    return df
+
+
+def type_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Categoricals for CATEGORY_COLUMNS; they export as the same text. Other
+    columns are untouched.
+    """
+    names = list(df.columns)
+    for col in CATEGORY_COLUMNS:
+        if names.count(col) == 1:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def tables_to_frame(tables: Sequence[RawTable], typed: bool = False) -> pd.DataFrame:
+    df = build_frame(tables)
+    return type_columns(df) if typed else df
+
+
+def count_pages(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def _plan_tasks(page_counts: Sequence[int], workers: int) -> List[Tuple[int, int, int]]:
+    """Split every file into (file_index, start, stop) page ranges."""
+    total = sum(page_counts)
+    per_task = max(1, min(MAX_PAGES_PER_TASK, math.ceil(total / (workers * 4)) if total else 1))
+
+    tasks: List[Tuple[int, int, int]] = []
+    for file_index, pages in enumerate(page_counts):
+        for start in range(0, pages, per_task):
+            tasks.append((file_index, start, min(start + per_task, pages)))
+    return tasks
+
+
+def _check_cancelled(is_cancelled: Optional[CancelCallback]):
+    if is_cancelled is not None and is_cancelled():
+        raise ExtractionCancelled("Extraction cancelled.")
+
+
+def extract_many_pages(
+    pdf_paths: Sequence[str],
+    max_workers: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    is_cancelled: Optional[CancelCallback] = None,
+    cache: Optional[ExtractionCache] = None,
+) -> List[PageTables]:
+    """
+    Extracts the tables of several PDFs at once, spreading their pages across
+    a process pool. Returns the raw tables of every input path, identical to
+    what the serial extractor finds in each file.
+
+    on_progress(file_index, pages_done, pages_total) is called as pages
+    finish; is_cancelled() is polled between pages and raises
+    ExtractionCancelled when it returns True. Files found in cache are not
+    parsed at all; freshly parsed files are stored in it.
+    """
+    per_file: List[Optional[PageTables]] = [None] * len(pdf_paths)
+    keys: List[Optional[str]] = [None] * len(pdf_paths)
+    if cache is not None:
+        for file_index, pdf_path in enumerate(pdf_paths):
+            keys[file_index] = cache.key(pdf_path, EXTRACTOR_SETTINGS)
+            per_file[file_index] = cache.get(keys[file_index])
+
+    page_counts = [
+        len(pages) if pages is not None else count_pages(p) for p, pages in zip(pdf_paths, per_file)
+    ]
+    pages_done = [0] * len(pdf_paths)
+
+    def report(file_index: int, pages: int):
+        pages_done[file_index] += pages
+        if on_progress is not None:
+            on_progress(file_index, pages_done[file_index], page_counts[file_index])
+
+    for file_index, pages in enumerate(per_file):
+        if pages is not None:
+            report(file_index, len(pages))
+
+    todo = [i for i, pages in enumerate(per_file) if pages is None]
+    workers = max_workers or os.cpu_count() or 1
+    tasks = _plan_tasks([page_counts[i] for i in todo], workers)
+    tasks = [(todo[i], start, stop) for i, start, stop in tasks]
+
+    if workers <= 1 or len(tasks) <= 1:
+        for file_index in todo:
+            per_file[file_index] = []
+            with pdfplumber.open(pdf_paths[file_index]) as pdf:
+                for page in pdf.pages:
+                    _check_cancelled(is_cancelled)
+                    per_file[file_index].append(_page_tables(page))
+                    report(file_index, 1)
+    else:
+        results: Dict[Tuple[int, int], PageTables] = {}
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+        try:
+            futures = {
+                pool.submit(extract_page_range, pdf_paths[file_index], start, stop): (file_index, start, stop)
+                for file_index, start, stop in tasks
+            }
+            pending = set(futures)
+            while pending:
+                _check_cancelled(is_cancelled)
+                done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    file_index, start, stop = futures[fut]
+                    results[(file_index, start)] = fut.result()
+                    report(file_index, stop - start)
+        except BaseException:
+            # Don't wait for queued pages once the caller has given up.
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+
+        # Reassemble in page order so the output matches a front-to-back walk.
+        for file_index in todo:
+            per_file[file_index] = []
+        for file_index, start, _ in tasks:
+            per_file[file_index].extend(results[(file_index, start)])
+
+    if cache is not None:
+        for file_index in todo:
+            cache.put(keys[file_index], per_file[file_index])
+
+    return per_file
+
+
+def extract_many(
+    pdf_paths: Sequence[str],
+    max_workers: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    is_cancelled: Optional[CancelCallback] = None,
+    cache: Optional[ExtractionCache] = None,
+    typed: bool = False,
+) -> List[pd.DataFrame]:
+    """extract_many_pages(), with one DataFrame per input path (typed: see type_columns)."""
+    per_file = extract_many_pages(
+        pdf_paths, max_workers=max_workers, on_progress=on_progress, is_cancelled=is_cancelled, cache=cache
+    )
+    return [pages_to_frame(pages, typed=typed) for pages in per_file]
+
+
+def extract_all_tables(
+    pdf_path: str,
+    max_workers: Optional[int] = None,
+    cache: Optional[ExtractionCache] = None,
+    typed: bool = False,
+) -> pd.DataFrame:
+    return extract_many([pdf_path], max_workers=max_workers, cache=cache, typed=typed)[0]
+
+
+def rename_columns_parent(df: pd.DataFrame) -> pd.DataFrame:
+    rename: Dict[str, str] = {}
+
+    if "HAWB\nNumber" in df.columns:
+        rename["HAWB\nNumber"] = "HAWB"
+
+    if "Origin" not in df.columns:
+        origin_candidates = [c for c in df.columns if "origin" in str(c).lower()]
+        if len(origin_candidates) == 1:
+            rename[origin_candidates[0]] = "Origin"
+
+    return df.rename(columns=rename)
+
+
+def rename_columns_child(df: pd.DataFrame) -> pd.DataFrame:
+    rename: Dict[str, str] = {}
+
+    if "HAWB\nShipment" in df.columns:
+        rename["HAWB\nShipment"] = "HAWB"
+
+    if "Secondary Tracking Numbers" in df.columns:
+        rename["Secondary Tracking Numbers"] = "secondary"
+
+    return df.rename(columns=rename)
+
+
+def manifest_frame(
+    files: Sequence[PageTables], rename: Callable[[pd.DataFrame], pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    One typed frame (see type_columns) from the tables of several files.
+    Headers are normalised per table, so files that spell a column
+    differently still line up, and all tables are stacked in a single
+    build_frame() pass instead of per file and again across files.
+    """
+    df = build_frame((tbl for pages in files for tables in pages for tbl in tables), rename=rename)
+    return type_columns(df)
+
+
+def combine_parents(parent_files: Sequence[PageTables]) -> pd.DataFrame:
+    """Stacks the parent manifests' tables with normalised headers."""
+    df_parent = manifest_frame(parent_files, rename_columns_parent)
+    if df_parent.empty:
+        raise ValueError("Parent PDFs produced no data.")
+    return df_parent
+
+
+def combine_children(child_files: Sequence[PageTables]) -> pd.DataFrame:
+    """Stacks the child manifests' tables with normalised headers (may be empty)."""
+    return manifest_frame(child_files, rename_columns_child)
+
+
+def ensure_required_columns(df_parent: pd.DataFrame, df_child: pd.DataFrame) -> Tuple[bool, str]:
+    if "HAWB" not in df_parent.columns:
+        return False, "No 'HAWB' column found in Parent manifests."
+    if not df_child.empty and "HAWB" not in df_child.columns:
+        return False, "No 'HAWB' column found in Child manifests."
+    return True, ""
+
+
+def join_parent_child(
+    df_parent: pd.DataFrame, df_child: pd.DataFrame, child_index: Optional[ChildIndex] = None
+) -> Tuple[pd.DataFrame, JoinReport]:
+    """
+    Left join on HAWB through a ChildIndex (built from df_child unless one
+    is passed in). Repeated child HAWBs keep their first row and are listed
+    in the report instead of multiplying parent rows.
+    """
+    if df_child.empty:
+        df_parent = df_parent.copy()
+        if "secondary" not in df_parent.columns:
+            df_parent["secondary"] = ""
+        return df_parent, JoinReport(parent_rows=len(df_parent))
+
+    if child_index is None:
+        child_index = ChildIndex(df_child)
+    df_merged, report = left_join(df_parent, child_index)
+    if "secondary" not in df_merged.columns:
+        df_merged["secondary"] = ""
+    return df_merged, report
+
+
+def merge_parent_child(df_parent: pd.DataFrame, df_child: pd.DataFrame) -> pd.DataFrame:
+    return join_parent_child(df_parent, df_child)[0]
+
+
+def expand_secondary_to_master_baby(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One "Master" row per input row, followed by one "Baby" row per
+    comma-separated secondary tracking number with HAWB set to that number.
+    """
+    if len(df) == 0:
+        return pd.DataFrame()
+
+    base = df.reset_index(drop=True)
+
+    if "secondary" in base.columns:
+        sec = base["secondary"].astype(object)
+        sec = sec.where(sec.notna() & sec.astype(bool), "").astype(str)
+        babies_hawb = sec.str.split(",").explode().str.strip()
+        babies_hawb = babies_hawb[babies_hawb != ""]
+    else:
+        babies_hawb = pd.Series([], dtype=object)
+
+    parent_pos = babies_hawb.index.to_numpy(dtype=np.int64)
+
+    masters = base.copy()
+    masters["Type"] = "Master"
+
+    babies = base.take(parent_pos)
+    babies["Type"] = "Baby"
+    babies["HAWB"] = babies_hawb.to_numpy()
+    if "HAWB" in base.columns and pd.api.types.is_string_dtype(base["HAWB"]):
+        babies["HAWB"] = babies["HAWB"].astype(base["HAWB"].dtype)
+
+    # Masters come first in the concat, so a stable sort on the parent
+    # position yields master, baby 1, baby 2, ... for every input row.
+    out = pd.concat([masters, babies], ignore_index=True)
+    order = np.argsort(np.concatenate([np.arange(len(base)), parent_pos]), kind="stable")
+    return out.take(order).reset_index(drop=True)
+
+
+# Output columns of the compare pipeline, in order (those present are kept).
+FINAL_COLUMNS = [
+    "Origin",
+    "#",
+    "HAWB",
+    "Pcs",
+    "Weight",
+    "Shipper Details",
+    "Dest",
+    "Bill\nTerm",
+    "Consignee Details",
+    "Description\nof Goods",
+    "Total\nValue",
+    "Total\nValue(LKR)",
+    "Type",
+]
+
+
+def select_final_columns(df: pd.DataFrame) -> pd.DataFrame:
+    existing = [c for c in FINAL_COLUMNS if c in df.columns]
+    return df[existing].copy()
+
+
+def as_path_list(paths: Union[str, Sequence[str]]) -> List[str]:
+    """A single path or a sequence of paths, as a list."""
+    return [paths] if isinstance(paths, str) else list(paths)
+
+
+def run_compare_pipeline(
+    parent_paths: Sequence[str],
+    child_paths: Union[str, Sequence[str]],
+    on_progress: Optional[ProgressCallback] = None,
+    is_cancelled: Optional[CancelCallback] = None,
+    on_stage: Optional[Callable[[str], None]] = None,
+    cache: Optional[ExtractionCache] = None,
+    on_report: Optional[Callable[[JoinReport], None]] = None,
+    trace: Optional[Trace] = None,
+    max_workers: Optional[int] = None,
+    records: Optional[RecordStore] = None,
+) -> pd.DataFrame:
+    """
+    Full Compare Cargo Manifests run over any number of parent and child
+    PDFs, all extracted together: extract, normalise, merge, expand. File
+    indices passed to on_progress follow parent_paths, then child_paths.
+    on_report receives the join's JoinReport (match counts, repeated HAWBs;
+    a HAWB listed in two child files counts as repeated). Each step is
+    timed into trace, when given. max_workers bounds the extraction pool
+    (1 parses in this process). The parsed parent and child rows are added
+    to records, when given.
+    Raises ValueError for problems with the input manifests.
+    """
+    parent_paths = as_path_list(parent_paths)
+    child_paths = as_path_list(child_paths)
+    with stage(trace, "extract tables") as span:
+        files = extract_many_pages(
+            parent_paths + child_paths,
+            max_workers=max_workers,
+            on_progress=on_progress,
+            is_cancelled=is_cancelled,
+            cache=cache,
+        )
+        span.pages = sum(len(pages) for pages in files)
+    with stage(trace, "build frames") as span:
+        df_parent = combine_parents(files[:len(parent_paths)])
+        df_child = combine_children(files[len(parent_paths):])
+        span.rows = len(df_parent) + len(df_child)
+    if records is not None:
+        with stage(trace, "record rows", rows=len(df_parent) + len(df_child)):
+            records.add_manifests(parent_paths, KIND_PARENT, files[:len(parent_paths)], df_parent)
+            records.add_manifests(child_paths, KIND_CHILD, files[len(parent_paths):], df_child)
+    del files
+
+    ok, msg = ensure_required_columns(df_parent, df_child)
+    if not ok:
+        raise ValueError(msg)
+
+    _check_cancelled(is_cancelled)
+    if on_stage is not None:
+        on_stage("Merging manifests…")
+    with stage(trace, "merge", rows=len(df_parent)):
+        df_merged, report = join_parent_child(df_parent, df_child)
+    if on_report is not None:
+        on_report(report)
+
+    _check_cancelled(is_cancelled)
+    if on_stage is not None:
+        on_stage("Expanding secondary tracking numbers…")
+    with stage(trace, "expand", rows=len(df_merged)):
+        df_expanded = expand_secondary_to_master_baby(df_merged)
+    with stage(trace, "select columns", rows=len(df_expanded)):
+        return select_final_columns(df_expanded)
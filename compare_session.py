@@ -0,0 +1,287 @@
+"""
+Compare Cargo Manifests state kept between runs.
+
+Operators re-run the comparison as new child manifests arrive while the
+parent PDFs stay the same. A CompareSession remembers the normalised parent
+frame and, for the last set of child files, their HAWB index, a content
+hash of every child row and the finished result. When only the children
+changed, they are extracted and indexed, and just the parent rows whose
+matching child row was added, removed or edited are merged and expanded
+again; every other parent row keeps its block of the previous result.
+"""
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from cargo_manifest import (
+    FINAL_COLUMNS,
+    CancelCallback,
+    ProgressCallback,
+    _check_cancelled,
+    as_path_list,
+    combine_children,
+    combine_parents,
+    ensure_required_columns,
+    expand_secondary_to_master_baby,
+    extract_many_pages,
+    join_parent_child,
+    select_final_columns,
+)
+from extraction_cache import ExtractionCache
+from hawb_join import ChildIndex, JoinReport, left_join
+from record_store import KIND_CHILD, KIND_PARENT, RecordStore
+from tracing import Trace, stage
+
+
+# What CompareSession.run() had to do, in CompareSession.last_run.
+RUN_FULL = "full"
+RUN_INCREMENTAL = "incremental"
+RUN_UNCHANGED = "unchanged"
+
+FileStamp = Tuple[str, int, float]
+
+
+def file_stamp(path: str) -> FileStamp:
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """One 64-bit content hash per row, over all columns."""
+    if df.shape[1] == 0:
+        return np.zeros(len(df), dtype=np.uint64)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _result_columns(index: ChildIndex, df_parent: pd.DataFrame) -> List[str]:
+    """
+    Child columns that can reach the result: the secondary numbers, and final
+    columns the parent lacks (shared columns are suffixed and dropped).
+    """
+    return [
+        c for c in index.columns
+        if c == "secondary" or (c in FINAL_COLUMNS and c not in df_parent.columns)
+    ]
+
+
+def _result_owners(result: pd.DataFrame, parent_rows: np.ndarray) -> np.ndarray:
+    """Parent row behind every result row: each Master starts the block of the next parent row."""
+    if result.empty:
+        return np.empty(0, dtype=np.int64)
+    starts = (result["Type"] == "Master").to_numpy(dtype=bool)
+    return parent_rows[np.cumsum(starts) - 1]
+
+
+@dataclass
+class _ParentState:
+    stamps: List[FileStamp]
+    df: pd.DataFrame
+
+
+@dataclass
+class _ChildState:
+    stamps: List[FileStamp]
+    columns: List[str]
+    index: Optional[ChildIndex]
+    # Per parent row: matched a child row, and that row's content hash.
+    matched: np.ndarray
+    hashes: np.ndarray
+    result: pd.DataFrame
+    owners: np.ndarray
+    report: JoinReport
+
+
+class CompareSession:
+    """Runs the compare pipeline, reusing whatever the previous run already did."""
+
+    def __init__(self):
+        self._parents: Optional[_ParentState] = None
+        self._child: Optional[_ChildState] = None
+        self.last_run = ""
+
+    @property
+    def report(self) -> Optional[JoinReport]:
+        return self._child.report if self._child is not None else None
+
+    def clear(self):
+        self._parents = None
+        self._child = None
+
+    def run(
+        self,
+        parent_paths: Sequence[str],
+        child_paths: Union[str, Sequence[str]],
+        on_progress: Optional[ProgressCallback] = None,
+        is_cancelled: Optional[CancelCallback] = None,
+        on_stage: Optional[Callable[[str], None]] = None,
+        cache: Optional[ExtractionCache] = None,
+        trace: Optional[Trace] = None,
+        records: Optional[RecordStore] = None,
+    ) -> pd.DataFrame:
+        """
+        Same result as run_compare_pipeline. File indices passed to
+        on_progress follow parent_paths, then child_paths; files that are
+        reused from the previous run report no progress. Steps are timed
+        into trace, when given, and trace.info["run"] says what was reused.
+        Parsed rows of the files extracted in this run are added to records.
+        """
+        parent_paths = as_path_list(parent_paths)
+        child_paths = as_path_list(child_paths)
+        parent_stamps = [file_stamp(p) for p in parent_paths]
+        child_stamps = [file_stamp(p) for p in child_paths]
+
+        parents_known = self._parents is not None and self._parents.stamps == parent_stamps
+        if parents_known and self._child is not None and self._child.stamps == child_stamps:
+            self.last_run = RUN_UNCHANGED
+            if trace is not None:
+                trace.info["run"] = self.last_run
+            return self._child.result
+
+        if parents_known:
+            offset = len(parent_paths)
+
+            def child_progress(file_index: int, done: int, total: int):
+                if on_progress is not None:
+                    on_progress(offset + file_index, done, total)
+
+            with stage(trace, "extract child tables") as span:
+                child_files = extract_many_pages(
+                    child_paths, on_progress=child_progress, is_cancelled=is_cancelled, cache=cache
+                )
+                span.pages = sum(len(pages) for pages in child_files)
+            df_parent = self._parents.df
+        else:
+            self.clear()
+            with stage(trace, "extract tables") as span:
+                files = extract_many_pages(
+                    parent_paths + child_paths,
+                    on_progress=on_progress,
+                    is_cancelled=is_cancelled,
+                    cache=cache,
+                )
+                span.pages = sum(len(pages) for pages in files)
+            with stage(trace, "build parent frame") as span:
+                df_parent = combine_parents(files[:len(parent_paths)])
+                span.rows = len(df_parent)
+            if records is not None:
+                with stage(trace, "record parent rows", rows=len(df_parent)):
+                    records.add_manifests(parent_paths, KIND_PARENT, files[:len(parent_paths)], df_parent)
+            child_files = files[len(parent_paths):]
+            del files
+
+        with stage(trace, "build child frame") as span:
+            df_child = combine_children(child_files)
+            span.rows = len(df_child)
+        if records is not None:
+            with stage(trace, "record child rows", rows=len(df_child)):
+                records.add_manifests(child_paths, KIND_CHILD, child_files, df_child)
+        del child_files
+        ok, msg = ensure_required_columns(df_parent, df_child)
+        if not ok:
+            raise ValueError(msg)
+        self._parents = _ParentState(parent_stamps, df_parent)
+
+        _check_cancelled(is_cancelled)
+        if on_stage is not None:
+            on_stage("Merging manifests…")
+
+        previous = self._child
+        columns = [str(c) for c in df_child.columns]
+        if previous is not None and previous.columns == columns and previous.index is not None and not df_child.empty:
+            self._child = self._merge_changed(
+                df_parent, df_child, child_stamps, previous, is_cancelled, on_stage, trace
+            )
+            self.last_run = RUN_INCREMENTAL
+        else:
+            self._child = self._merge_all(df_parent, df_child, child_stamps, is_cancelled, on_stage, trace)
+            self.last_run = RUN_FULL
+        if trace is not None:
+            trace.info["run"] = self.last_run
+        return self._child.result
+
+    def _merge_all(self, df_parent, df_child, child_stamps, is_cancelled, on_stage, trace) -> _ChildState:
+        with stage(trace, "index child", rows=len(df_child)):
+            index = ChildIndex(df_child) if not df_child.empty else None
+        with stage(trace, "merge", rows=len(df_parent)):
+            df_merged, report = join_parent_child(df_parent, df_child, child_index=index)
+
+        _check_cancelled(is_cancelled)
+        if on_stage is not None:
+            on_stage("Expanding secondary tracking numbers…")
+        with stage(trace, "expand", rows=len(df_merged)) as span:
+            result = select_final_columns(expand_secondary_to_master_baby(df_merged))
+            span.info["output_rows"] = len(result)
+
+        with stage(trace, "hash child rows", rows=len(df_parent)):
+            matched, hashes = self._match_state(df_parent, index)
+        return _ChildState(
+            stamps=child_stamps,
+            columns=[str(c) for c in df_child.columns],
+            index=index,
+            matched=matched,
+            hashes=hashes,
+            result=result,
+            owners=_result_owners(result, np.arange(len(df_parent))),
+            report=report,
+        )
+
+    def _merge_changed(self, df_parent, df_child, child_stamps, previous, is_cancelled, on_stage, trace) -> _ChildState:
+        with stage(trace, "index child", rows=len(df_child)):
+            index = ChildIndex(df_child)
+        with stage(trace, "hash child rows", rows=len(df_parent)):
+            matched, hashes = self._match_state(df_parent, index)
+        changed = (matched != previous.matched) | (matched & (hashes != previous.hashes))
+        changed_rows = np.flatnonzero(changed)
+
+        _check_cancelled(is_cancelled)
+        if on_stage is not None:
+            on_stage(f"Expanding secondary tracking numbers for {len(changed_rows)} changed row(s)…")
+
+        result, owners = previous.result, previous.owners
+        if len(changed_rows):
+            with stage(trace, "merge changed", rows=len(changed_rows)):
+                df_merged, _ = left_join(df_parent.iloc[changed_rows], index)
+                fresh = select_final_columns(expand_secondary_to_master_baby(df_merged))
+
+            with stage(trace, "reassemble", rows=len(previous.result)) as span:
+                keep = ~changed[previous.owners]
+                owners = np.concatenate([previous.owners[keep], _result_owners(fresh, changed_rows)])
+                # Kept blocks and fresh blocks each stay contiguous; a stable sort on
+                # the owning parent row interleaves them back into parent order.
+                order = np.argsort(owners, kind="stable")
+                combined = pd.concat([previous.result[keep], fresh], ignore_index=True)
+                result = combined.take(order).reset_index(drop=True)
+                owners = owners[order]
+                span.info["output_rows"] = len(result)
+
+        report = JoinReport(
+            parent_rows=len(df_parent),
+            matched_rows=int(matched.sum()),
+            duplicate_keys=list(index.duplicate_keys),
+            dropped_child_rows=index.dropped_rows,
+        )
+        return _ChildState(
+            stamps=child_stamps,
+            columns=[str(c) for c in df_child.columns],
+            index=index,
+            matched=matched,
+            hashes=hashes,
+            result=result,
+            owners=owners,
+            report=report,
+        )
+
+    @staticmethod
+    def _match_state(df_parent: pd.DataFrame, index: Optional[ChildIndex]) -> Tuple[np.ndarray, np.ndarray]:
+        if index is None:
+            n = len(df_parent)
+            return np.zeros(n, dtype=bool), np.zeros(n, dtype=np.uint64)
+        codes = index.codes(df_parent[index.key])
+        child_hashes = row_hashes(index.rows[_result_columns(index, df_parent)])
+        matched = codes >= 0
+        hashes = np.zeros(len(codes), dtype=np.uint64)
+        hashes[matched] = child_hashes[codes[matched]]
+        return matched, hashes
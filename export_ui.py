@@ -0,0 +1,75 @@
+import os
+from typing import Optional, Tuple
+
+import pandas as pd
+from PyQt5 import QtCore, QtWidgets
+
+from exporters import available_exporters, export_frame, get_exporter
+from tracing import Trace, stage
+
+
+class ExportThread(QtCore.QThread):
+    progress = QtCore.pyqtSignal(int, int)  # (rows_written, rows_total)
+    finished = QtCore.pyqtSignal(str, str)  # (path, error_message)
+
+    def __init__(
+        self, df: pd.DataFrame, path: str, fmt: Optional[str] = None, trace: Optional[Trace] = None, parent=None
+    ):
+        super().__init__(parent)
+        self.df = df
+        self.path = path
+        self.fmt = fmt
+        self.trace = trace
+
+    def run(self):
+        try:
+            with stage(self.trace, f"export {self.fmt or 'file'}", rows=len(self.df)):
+                export_frame(self.df, self.path, fmt=self.fmt, on_progress=self.progress.emit)
+            self.finished.emit(self.path, "")
+        except Exception as e:
+            self.finished.emit(self.path, str(e))
+
+
+def ask_export_path(parent: QtWidgets.QWidget, title: str = "Save File") -> Optional[Tuple[str, str]]:
+    """
+    Save dialog offering every available export format. Returns (path, format
+    name) with the format's extension ensured, or None if cancelled.
+    """
+    exporters = available_exporters()
+    filters = [f"{e.label} (*{e.extension})" for e in exporters]
+
+    save_file, selected = QtWidgets.QFileDialog.getSaveFileName(
+        parent, title, "", ";;".join(filters + ["All Files (*)"])
+    )
+    if not save_file:
+        return None
+
+    # An explicit known extension wins over the selected filter.
+    ext = os.path.splitext(save_file)[1].lower()
+    for exporter in exporters:
+        if exporter.extension == ext:
+            return save_file, exporter.name
+
+    exporter = exporters[filters.index(selected)] if selected in filters else get_exporter("xlsx")
+    return save_file + exporter.extension, exporter.name
+
+
+def save_trace(parent: QtWidgets.QWidget, trace: Trace) -> Optional[str]:
+    """
+    Asks where to save the timings of the last run and writes them as JSON
+    (with the full profile next to it when one was captured). Returns a
+    status message, or None if cancelled.
+    """
+    path, _ = QtWidgets.QFileDialog.getSaveFileName(
+        parent, "Save Timings", f"{trace.name}-timings.json", "JSON (*.json);;All Files (*)"
+    )
+    if not path:
+        return None
+    if not os.path.splitext(path)[1]:
+        path += ".json"
+    try:
+        written = trace.write_json(path)
+    except OSError as e:
+        QtWidgets.QMessageBox.critical(parent, "Error", f"Unable to save timings:\n{e}")
+        return f"Error: {e}"
+    return "Timings saved: " + ", ".join(written)
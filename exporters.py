@@ -0,0 +1,291 @@
+import os
+from typing import Callable, Dict, List, Optional, Sequence
+
+import openpyxl
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet / Arrow export are optional
+    pa = None
+    pa_ipc = None
+    pq = None
+
+
+# Rows converted and written per step; bounds the transient copy and sets
+# the progress granularity.
+EXPORT_CHUNK_ROWS = 5000
+
+ExportProgressCallback = Callable[[int, int], None]
+
+
+class FrameWriter:
+    """Receives a frame in row chunks, all with the same columns."""
+
+    def write(self, chunk: pd.DataFrame):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Exporter:
+    name = ""
+    extension = ""
+    label = ""
+
+    def available(self) -> bool:
+        return True
+
+    def open_writer(self, path: str, columns: Sequence, sample: Optional[pd.DataFrame] = None) -> FrameWriter:
+        """
+        Starts a file at path. sample, when given, is representative data
+        for formats that need column types up front.
+        """
+        raise NotImplementedError
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        path: str,
+        on_progress: Optional[ExportProgressCallback] = None,
+        chunk_rows: int = EXPORT_CHUNK_ROWS,
+    ):
+        total = len(df.index)
+        with self.open_writer(path, list(df.columns), sample=df) as writer:
+            for start in range(0, total, chunk_rows):
+                writer.write(df.iloc[start:start + chunk_rows])
+                if on_progress is not None:
+                    on_progress(min(start + chunk_rows, total), total)
+
+
+#############################################################################
+#                                   Excel                                    #
+#############################################################################
+
+# Excel's sheet size; DataFrame.to_excel refuses anything larger.
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_MAX_COLUMNS = 16_384
+
+
+class _ExcelWriter(FrameWriter):
+    def __init__(self, path: str, columns: Sequence, sheet_name: str):
+        self.path = path
+        self.columns = len(columns)
+        self.rows = 1
+        self.too_large = False
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet(sheet_name)
+        self.ws.append(list(columns))
+
+    def write(self, chunk: pd.DataFrame):
+        rows = self.rows + len(chunk.index)
+        if rows > EXCEL_MAX_ROWS or self.columns > EXCEL_MAX_COLUMNS:
+            # Nothing is saved: a workbook past the limit won't open in Excel.
+            self.too_large = True
+            raise ValueError(
+                f"This sheet is too large! Your sheet size is: {rows}, {self.columns} "
+                f"Max sheet size is: {EXCEL_MAX_ROWS}, {EXCEL_MAX_COLUMNS}"
+            )
+        # A copy: an object-only frame hands out a read-only view.
+        block = chunk.to_numpy(dtype=object, copy=True)
+        block[pd.isna(block)] = ""  # to_excel's default na_rep
+        for row in block.tolist():
+            self.ws.append(row)
+        self.rows = rows
+
+    def close(self):
+        if self.too_large:
+            self.ws.close()  # finish the temporary sheet file; nothing is saved
+        else:
+            self.wb.save(self.path)
+
+
+class ExcelExporter(Exporter):
+    """
+    The columns and values DataFrame.to_excel(path, index=False) writes (the
+    header row is left unstyled), through an openpyxl write-only workbook:
+    rows go straight to a temporary sheet file instead of an in-memory cell
+    grid, so memory use doesn't grow with the number of rows. Like to_excel,
+    it raises ValueError past Excel's sheet size.
+    """
+
+    name = "xlsx"
+    extension = ".xlsx"
+    label = "Excel Files"
+
+    def __init__(self, sheet_name: str = "Sheet1"):
+        self.sheet_name = sheet_name
+
+    def open_writer(self, path, columns, sample=None):
+        return _ExcelWriter(path, columns, self.sheet_name)
+
+
+def write_excel_streaming(
+    df: pd.DataFrame,
+    path: str,
+    sheet_name: str = "Sheet1",
+    on_progress: Optional[ExportProgressCallback] = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+):
+    ExcelExporter(sheet_name).write(df, path, on_progress=on_progress, chunk_rows=chunk_rows)
+
+
+#############################################################################
+#                                    CSV                                     #
+#############################################################################
+
+class _CsvWriter(FrameWriter):
+    def __init__(self, path: str, columns: Sequence):
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        pd.DataFrame(columns=list(columns)).to_csv(self.f, index=False)
+
+    def write(self, chunk: pd.DataFrame):
+        chunk.to_csv(self.f, index=False, header=False)
+
+    def close(self):
+        self.f.close()
+
+
+class CsvExporter(Exporter):
+    name = "csv"
+    extension = ".csv"
+    label = "CSV Files"
+
+    def open_writer(self, path, columns, sample=None):
+        return _CsvWriter(path, columns)
+
+
+#############################################################################
+#                           Parquet / Arrow IPC                              #
+#############################################################################
+
+def arrow_schema(columns: Sequence, sample: Optional[pd.DataFrame] = None):
+    """
+    Schema from the sample's dtypes; columns with no usable values (or not in
+    the sample) become strings, which is what the manifests hold.
+    """
+    fields = []
+    for col in columns:
+        typ = pa.string()
+        if sample is not None and col in sample.columns:
+            try:
+                inferred = pa.Schema.from_pandas(sample[[col]], preserve_index=False).field(0).type
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                inferred = pa.string()
+            if not pa.types.is_null(inferred):
+                typ = pa.large_string() if pa.types.is_large_string(inferred) else inferred
+        fields.append(pa.field(str(col), typ))
+    return pa.schema(fields)
+
+
+def _to_record_batch(chunk: pd.DataFrame, schema):
+    chunk = chunk.copy(deep=False)
+    chunk.columns = schema.names
+    return pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+
+class _ParquetWriter(FrameWriter):
+    def __init__(self, path: str, schema, compression: str):
+        self.schema = schema
+        self.writer = pq.ParquetWriter(path, schema, compression=compression)
+
+    def write(self, chunk: pd.DataFrame):
+        self.writer.write_batch(_to_record_batch(chunk, self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class ParquetExporter(Exporter):
+    """Typed, zstd-compressed columns; one row group per chunk."""
+
+    name = "parquet"
+    extension = ".parquet"
+    label = "Parquet Files"
+
+    def __init__(self, compression: str = "zstd"):
+        self.compression = compression
+
+    def available(self):
+        return pa is not None
+
+    def write(self, df, path, on_progress=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        # Fewer, larger row groups compress and scan better than the default chunk.
+        super().write(df, path, on_progress=on_progress, chunk_rows=max(chunk_rows, 100_000))
+
+    def open_writer(self, path, columns, sample=None):
+        return _ParquetWriter(path, arrow_schema(columns, sample), self.compression)
+
+
+class _ArrowWriter(FrameWriter):
+    def __init__(self, path: str, schema):
+        self.schema = schema
+        self.sink = pa.OSFile(path, "wb")
+        self.writer = pa_ipc.new_file(self.sink, schema)
+
+    def write(self, chunk: pd.DataFrame):
+        self.writer.write_batch(_to_record_batch(chunk, self.schema))
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+class ArrowExporter(Exporter):
+    """Uncompressed Arrow IPC file: fastest to write, memory-mappable to read."""
+
+    name = "arrow"
+    extension = ".arrow"
+    label = "Arrow IPC Files"
+
+    def available(self):
+        return pa is not None
+
+    def open_writer(self, path, columns, sample=None):
+        return _ArrowWriter(path, arrow_schema(columns, sample))
+
+
+EXPORTERS: Dict[str, Exporter] = {
+    exporter.name: exporter
+    for exporter in (ExcelExporter(), CsvExporter(), ParquetExporter(), ArrowExporter())
+}
+
+
+def available_exporters() -> List[Exporter]:
+    return [exporter for exporter in EXPORTERS.values() if exporter.available()]
+
+
+def get_exporter(name: str) -> Exporter:
+    exporter = EXPORTERS.get(name.lower().lstrip("."))
+    if exporter is None:
+        raise ValueError(f"Unknown export format: {name}")
+    if not exporter.available():
+        raise ValueError(f"Export format '{exporter.name}' needs pyarrow (pip install pyarrow).")
+    return exporter
+
+
+def exporter_for_path(path: str, default: str = "xlsx") -> Exporter:
+    ext = os.path.splitext(path)[1].lower()
+    for exporter in EXPORTERS.values():
+        if exporter.extension == ext:
+            return get_exporter(exporter.name)
+    return get_exporter(default)
+
+
+def export_frame(
+    df: pd.DataFrame,
+    path: str,
+    fmt: Optional[str] = None,
+    on_progress: Optional[ExportProgressCallback] = None,
+):
+    exporter = get_exporter(fmt) if fmt else exporter_for_path(path)
+    exporter.write(df, path, on_progress=on_progress)
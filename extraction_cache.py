@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # caching is optional; extraction works without it
+    pa = None
+    pa_ipc = None
+
+
+# One table as extracted: header row followed by data rows.
+RawTable = List[List[Optional[str]]]
+# Tables of one document, grouped per page (page order preserved).
+PageTables = List[List[RawTable]]
+
+# Bump when the on-disk layout or the meaning of cached tables changes.
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".xtractpdf", "cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    On-disk cache of raw per-page tables, keyed by the PDF's content hash plus
+    the extractor settings that produced them. Entries are Arrow IPC files;
+    the directory is kept under max_bytes by evicting least recently used
+    entries (file mtime is bumped on every hit).
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> digest, so a run doesn't re-hash the same file.
+        self._digests: Dict[Tuple[str, int, float], str] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def available() -> bool:
+        return pa is not None
+
+    def key(self, pdf_path: str, settings: dict) -> str:
+        st = os.stat(pdf_path)
+        stamp = (os.path.abspath(pdf_path), st.st_size, st.st_mtime)
+        with self._lock:
+            digest = self._digests.get(stamp)
+        if digest is None:
+            # Hashed outside the lock; two threads may hash the same file once each.
+            digest = file_digest(pdf_path)
+            with self._lock:
+                self._digests[stamp] = digest
+
+        settings_blob = json.dumps(
+            {"v": CACHE_FORMAT_VERSION, "settings": settings}, sort_keys=True, default=str
+        )
+        settings_hash = hashlib.sha256(settings_blob.encode("utf-8")).hexdigest()[:16]
+        return f"{digest}-{settings_hash}"
+
+    def _entry_path(self, key: str, suffix: str = ".arrow") -> str:
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def get(self, key: str) -> Optional[PageTables]:
+        path = self._entry_path(key)
+        try:
+            with pa.memory_map(path, "r") as source:
+                table = pa_ipc.open_file(source).read_all()
+            pages = _decode(table)
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (pa.ArrowInvalid, KeyError):
+            # Truncated or not one of ours: drop it so the next put replaces it.
+            self._discard(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return pages
+
+    def put(self, key: str, pages: PageTables):
+        table = _encode(pages)
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        options = pa_ipc.IpcWriteOptions(compression="zstd")
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa_ipc.new_file(sink, table.schema, options=options) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+
+        self._evict()
+
+    def get_json(self, key: str):
+        """Small derived metadata (e.g. page indexes) kept next to the tables."""
+        path = self._entry_path(key, ".json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put_json(self, key: str, value):
+        path = self._entry_path(key, ".json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+
+        self._evict()
+
+    @staticmethod
+    def _discard(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith((".arrow", ".json")):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def _encode(pages: PageTables):
+    page_col: List[int] = []
+    table_col: List[int] = []
+    cells_col: List[List[Optional[str]]] = []
+
+    for page_index, tables in enumerate(pages):
+        for table_index, tbl in enumerate(tables):
+            for row in tbl:
+                page_col.append(page_index)
+                table_col.append(table_index)
+                cells_col.append([None if c is None else str(c) for c in row])
+
+    schema = pa.schema(
+        [
+            ("page", pa.int32()),
+            ("table", pa.int32()),
+            ("cells", pa.list_(pa.string())),
+        ],
+        # Table counts per page too: a table without rows has no row to mark it.
+        metadata={"pages": str(len(pages)), "tables": json.dumps([len(tables) for tables in pages])},
+    )
+    return pa.table(
+        {
+            "page": pa.array(page_col, type=pa.int32()),
+            "table": pa.array(table_col, type=pa.int32()),
+            "cells": pa.array(cells_col, type=pa.list_(pa.string())),
+        },
+        schema=schema,
+    )
+
+
+def _decode(table) -> PageTables:
+    metadata = table.schema.metadata or {}
+    page_count = int(metadata[b"pages"])
+    if b"tables" in metadata:
+        pages: PageTables = [[[] for _ in range(count)] for count in json.loads(metadata[b"tables"])]
+    else:
+        pages = [[] for _ in range(page_count)]
+
+    page_col = table.column("page").to_pylist()
+    table_col = table.column("table").to_pylist()
+    cells_col = table.column("cells").to_pylist()
+
+    for page_index, table_index, cells in zip(page_col, table_col, cells_col):
+        tables = pages[page_index]
+        if len(tables) <= table_index:
+            tables.extend([] for _ in range(table_index + 1 - len(tables)))
+        tables[table_index].append(cells)
+    return pages
+
+
+_default_cache: Optional[ExtractionCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> Optional[ExtractionCache]:
+    """
+    Shared cache for the desktop app, or None when pyarrow is missing or the
+    cache is switched off (XTRACTPDF_CACHE=0). XTRACTPDF_CACHE_DIR and
+    XTRACTPDF_CACHE_MAX_MB override the location and size bound.
+    """
+    global _default_cache
+
+    if not ExtractionCache.available() or os.environ.get("XTRACTPDF_CACHE", "1") == "0":
+        return None
+
+    with _default_lock:
+        if _default_cache is None:
+            cache_dir = os.environ.get("XTRACTPDF_CACHE_DIR", DEFAULT_CACHE_DIR)
+            max_mb = os.environ.get("XTRACTPDF_CACHE_MAX_MB")
+            max_bytes = int(max_mb) * 1024 * 1024 if max_mb else DEFAULT_MAX_BYTES
+            try:
+                _default_cache = ExtractionCache(cache_dir, max_bytes)
+            except OSError:
+                return None
+        return _default_cache
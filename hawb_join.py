@@ -0,0 +1,133 @@
+"""
+Parent/child manifest join on HAWB.
+
+The child manifest is indexed once (ChildIndex): its HAWBs are interned with
+pd.factorize, and the distinct keys, in the order of the de-duplicated child
+frame, become a pd.Index. Its hash table is built on the first lookup and
+kept, so a parent frame smaller than the child (a chunk of a compare
+session or a streamed partition) only looks its keys up. A parent frame at
+least as large is factorized after the child's keys in one pass instead,
+which is cheaper than the per-key lookup once the parent outnumbers the
+child. Either way child rows are then taken by position.
+
+Unlike pd.merge, a HAWB that appears more than once in the child does not
+multiply the parent row: the first child row wins and the repeat is listed
+in the JoinReport. Blank HAWB cells never match anything.
+"""
+from dataclasses import dataclass, field
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+KEY_COLUMN = "HAWB"
+SUFFIXES = ("_parent", "_child")
+
+# Duplicate keys spelled out in JoinReport.summary(); the rest are counted.
+REPORT_MAX_KEYS = 5
+
+
+@dataclass
+class JoinReport:
+    parent_rows: int = 0
+    matched_rows: int = 0
+    duplicate_keys: List[str] = field(default_factory=list)
+    dropped_child_rows: int = 0
+
+    @property
+    def unmatched_rows(self) -> int:
+        return self.parent_rows - self.matched_rows
+
+    def summary(self) -> str:
+        if not self.duplicate_keys:
+            return ""
+        shown = ", ".join(self.duplicate_keys[:REPORT_MAX_KEYS])
+        more = len(self.duplicate_keys) - REPORT_MAX_KEYS
+        if more > 0:
+            shown += f" (+{more} more)"
+        return (
+            f"Child manifest repeats {len(self.duplicate_keys)} HAWB(s): {shown}. "
+            f"Kept the first row of each; {self.dropped_child_rows} row(s) ignored."
+        )
+
+
+def _key_values(keys: Sequence) -> pd.Series:
+    """Keys as strings, missing where the cell is blank (blanks never match)."""
+    keys = pd.Series(keys, copy=False)
+    return keys.where(keys.notna() & (keys != ""))
+
+
+class ChildIndex:
+    """Child manifest rows keyed by HAWB, one row per distinct key."""
+
+    def __init__(self, df_child: pd.DataFrame, key: str = KEY_COLUMN):
+        self.key = key
+        # Codes follow first appearance, so the first row of each key is the
+        # row of its code in the de-duplicated frame; blanks get -1.
+        codes, uniques = pd.factorize(_key_values(df_child[key]))
+        usable = codes >= 0
+        repeated = usable & pd.Series(codes).duplicated().to_numpy()
+        first = usable & ~repeated
+
+        self.duplicate_keys: List[str] = sorted(set(uniques[np.unique(codes[repeated])].tolist()))
+        self.dropped_rows = int(repeated.sum())
+
+        self.keys = pd.Index(uniques)
+        self.rows = df_child.loc[first].drop(columns=[key]).reset_index(drop=True)
+        # rows plus one all-missing row at the end, which take() reaches with code -1.
+        self._rows_or_missing = pd.concat([self.rows, self.rows.iloc[:0].reindex([0])], ignore_index=True)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.rows.columns)
+
+    def codes(self, parent_keys: Sequence) -> np.ndarray:
+        """Child row number for every parent key, -1 where the child has no such HAWB."""
+        # Blank parent keys are missing, which no child key is.
+        parent_keys = _key_values(parent_keys)
+        if len(parent_keys) < len(self.keys):
+            return self.keys.get_indexer(parent_keys)
+        # The child's distinct keys come first, so each keeps its own row
+        # number as its code, and a key the child lacks gets a code past them.
+        codes, _ = pd.factorize(pd.concat([pd.Series(self.keys), parent_keys], ignore_index=True))
+        codes = codes[len(self.keys):]
+        codes[codes >= len(self.keys)] = -1
+        return codes
+
+    def take(self, codes: np.ndarray) -> pd.DataFrame:
+        """Child rows for codes from codes(); all-missing rows where the code is -1."""
+        if (codes < 0).any():
+            return self._rows_or_missing.take(codes).reset_index(drop=True)
+        return self.rows.take(codes).reset_index(drop=True)
+
+
+def left_join(
+    df_parent: pd.DataFrame,
+    index: ChildIndex,
+    suffixes: Tuple[str, str] = SUFFIXES,
+) -> Tuple[pd.DataFrame, JoinReport]:
+    """
+    Every parent row once, with the matching child columns (or NaN) to its
+    right. Columns present on both sides get suffixes, as with pd.merge.
+    """
+    codes = index.codes(df_parent[index.key])
+
+    right = index.take(codes)
+    left = df_parent.reset_index(drop=True)
+
+    overlap = (set(left.columns) & set(right.columns)) - {index.key}
+    if overlap:
+        left = left.rename(columns={c: f"{c}{suffixes[0]}" for c in overlap})
+        right = right.rename(columns={c: f"{c}{suffixes[1]}" for c in overlap})
+
+    report = JoinReport(
+        parent_rows=len(left),
+        matched_rows=int((codes >= 0).sum()),
+        duplicate_keys=list(index.duplicate_keys),
+        dropped_child_rows=index.dropped_rows,
+    )
+    return pd.concat([left, right], axis=1), report
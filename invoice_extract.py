@@ -0,0 +1,503 @@
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import camelot
+import numpy as np
+import pandas as pd
+import pdfplumber
+
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+except ImportError:  # pdfplumber's text extraction is the (slower) fallback
+    pdfium = None
+    pdfium_c = None
+
+from cargo_manifest import count_pages
+from extraction_cache import ExtractionCache, PageTables, RawTable
+from invoice_parser import scan_block
+from record_store import KIND_INVOICE, RecordStore
+from tracing import Trace, stage
+
+
+def parse_marks_and_description(text: str):
+    match_1z = re.search(r"(?i)(1Z[A-Za-z0-9]+)(?![A-Za-z0-9])", text)
+    if match_1z:
+        container_number = match_1z.group(0).strip()
+        container_number = re.sub(r"(?i)of$", "", container_number).strip()
+    else:
+        match_container = re.search(r"(?i)Number and kind\s*(\S+)", text)
+        container_number = match_container.group(1).strip() if match_container else ""
+
+    match_desc = re.search(r"(?i)Description:\s*(.+)", text)
+    description = match_desc.group(1).strip() if match_desc else ""
+    return container_number, description
+
+
+def parse_commodity_and_grossmass(text: str):
+    commodity_code = ""
+    gross_mass = ""
+
+    pattern_commodity = re.compile(r"33 Commodity \(HS\) Code(\d+)", re.IGNORECASE)
+    match_com = pattern_commodity.search(text)
+    if match_com:
+        raw = match_com.group(1)
+        commodity_code = raw[:-2] if len(raw) >= 2 else raw
+
+    pattern_gross = re.compile(r"35 Gross Mass \(Kg\)[A-Za-z]*(\d+\.\d+)", re.IGNORECASE)
+    match_gross = pattern_gross.search(text)
+    if match_gross:
+        gross_mass = match_gross.group(1)
+
+    return commodity_code, gross_mass
+
+
+def parse_all_numbers(text: str):
+    text = text.replace("\n", " ")
+    nums = re.findall(r"[\d,\.]+", text)
+    cleaned = []
+    for val in nums:
+        # ignore weird stray "42" you previously filtered
+        if val.replace(",", "").replace(".", "") == "42":
+            continue
+        cleaned.append(val)
+    return cleaned
+
+
+def parse_item_price(text: str):
+    found = parse_all_numbers(text)
+    return found[-1] if found else ""
+
+
+# Pages per Camelot worker task, and tasks a worker runs before it is
+# replaced (bounds memory held by rasterised pages).
+CAMELOT_PAGES_PER_TASK = 8
+CAMELOT_TASKS_PER_CHILD = 4
+
+# Anchor strings as they appear in a page's text layer once whitespace is
+# removed and case folded; used to skip pages before Camelot sees them.
+ANCHOR_KEYS = ["31packages", "descriptionofgoods"]
+RX_WHITESPACE = re.compile(r"\s+")
+
+# Camelot settings per flavor. line_scale is lattice-only; stream rejects it.
+CAMELOT_FLAVOR_SETTINGS = {
+    "lattice": {"flavor": "lattice", "strip_text": "\n", "line_scale": 40},
+    "stream": {"flavor": "stream", "strip_text": "\n"},
+}
+# "auto" picks lattice for pages with ruling lines and stream for the rest.
+FLAVORS = ["auto", "lattice", "stream"]
+
+# Vector line segments a page needs before it counts as ruled (a table grid
+# has many; a lone border box or underline has a handful).
+MIN_RULING_SEGMENTS = 8
+
+
+@dataclass
+class PageIndex:
+    """What a cheap pass over the text and vector layers found, 1-based pages."""
+
+    page_count: int
+    anchor_pages: List[int]
+    ruled_pages: List[int]
+
+
+def _page_spec(page_numbers: List[int]) -> str:
+    return ",".join(str(n) for n in page_numbers)
+
+
+def read_invoice_pages(pdf_path: str, page_numbers: List[int], flavor: str = "lattice") -> List[Tuple[int, List[RawTable]]]:
+    """
+    Worker entry point: Camelot over the given 1-based pages only. Returns
+    (page number, tables) for every requested page, in order.
+    """
+    settings = {**CAMELOT_FLAVOR_SETTINGS[flavor], "pages": _page_spec(page_numbers)}
+    found: Dict[int, List[RawTable]] = {number: [] for number in page_numbers}
+    for table in camelot.read_pdf(pdf_path, **settings):
+        found[int(table.page)].append(table.df.values.tolist())
+    return list(found.items())
+
+
+def _path_segments(page) -> int:
+    objects = page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_PATH,))
+    return sum(pdfium_c.FPDFPath_CountSegments(obj.raw) for obj in objects)
+
+
+def _page_layers(pdf_path: str):
+    """
+    Yields (text, ruling segments) per page; pdfium is ~100x faster than
+    pdfminer for this.
+    """
+    if pdfium is None:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                yield page.extract_text() or "", len(page.edges)
+        return
+
+    doc = pdfium.PdfDocument(pdf_path)
+    try:
+        for i in range(len(doc)):
+            page = doc[i]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range(), _path_segments(page)
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        doc.close()
+
+
+def scan_page_index(pdf_path: str) -> PageIndex:
+    """
+    Finds pages whose text layer contains an anchor and pages with ruling
+    lines. Whitespace and case are ignored for anchors, so a page is kept
+    whenever Camelot could find the anchor in one of its cells.
+    """
+    index = PageIndex(page_count=0, anchor_pages=[], ruled_pages=[])
+    for number, (text, segments) in enumerate(_page_layers(pdf_path), start=1):
+        index.page_count = number
+        squashed = RX_WHITESPACE.sub("", text).lower()
+        if any(anchor in squashed for anchor in ANCHOR_KEYS):
+            index.anchor_pages.append(number)
+        if segments >= MIN_RULING_SEGMENTS:
+            index.ruled_pages.append(number)
+    return index
+
+
+def page_index(pdf_path: str, cache: Optional[ExtractionCache] = None) -> PageIndex:
+    settings = {"index": "page-layers", "anchors": ANCHOR_KEYS, "min_ruling": MIN_RULING_SEGMENTS}
+    key = cache.key(pdf_path, settings) if cache is not None else None
+    cached = cache.get_json(key) if cache is not None else None
+    if cached is not None:
+        return PageIndex(**cached)
+
+    index = scan_page_index(pdf_path)
+    if cache is not None:
+        cache.put_json(key, asdict(index))
+    return index
+
+
+def default_workers() -> int:
+    """XTRACTPDF_WORKERS if set, else one worker per CPU."""
+    configured = os.environ.get("XTRACTPDF_WORKERS")
+    return int(configured) if configured else (os.cpu_count() or 1)
+
+
+def plan_flavors(page_numbers: List[int], index: Optional[PageIndex], flavor: str = "auto") -> Dict[str, List[int]]:
+    """Pages to run under each Camelot flavor."""
+    if flavor != "auto":
+        return {flavor: list(page_numbers)}
+    ruled = set(index.ruled_pages)
+    plan: Dict[str, List[int]] = {"lattice": [], "stream": []}
+    for number in page_numbers:
+        plan["lattice" if number in ruled else "stream"].append(number)
+    return plan
+
+
+def _other_flavor(flavor: str) -> str:
+    return "stream" if flavor == "lattice" else "lattice"
+
+
+def _complete_blocks(tables: List[RawTable]) -> Tuple[int, int]:
+    """
+    (anchor blocks, blocks with a commodity code, gross mass and item price)
+    on one page. A flavor that found the anchors but merged or split the
+    field cells comes out with empty fields.
+    """
+    rows, _ = parse_blocks(pd.DataFrame(raw) for raw in tables)
+    complete = sum(1 for row in rows if row["Commodity_Code"] and row["Gross_Mass"] and row["Item_Price"])
+    return len(rows), complete
+
+
+def _page_parsed(tables: List[RawTable]) -> bool:
+    blocks, complete = _complete_blocks(tables)
+    return blocks > 0 and complete == blocks
+
+
+def _camelot_pool(page_total: int, max_workers: Optional[int]) -> Optional[ProcessPoolExecutor]:
+    workers = max_workers or default_workers()
+    tasks = -(-page_total // CAMELOT_PAGES_PER_TASK)
+    if workers <= 1 or tasks <= 1:
+        return None
+
+    pool_kwargs = {}
+    if sys.version_info >= (3, 11):
+        # Lattice rasterises pages; recycle workers so their memory stays bounded.
+        pool_kwargs["max_tasks_per_child"] = CAMELOT_TASKS_PER_CHILD
+    return ProcessPoolExecutor(max_workers=min(workers, tasks), **pool_kwargs)
+
+
+def _camelot_pages(
+    pdf_path: str,
+    plan: Dict[str, List[int]],
+    pool: Optional[ProcessPoolExecutor],
+) -> Dict[int, List[RawTable]]:
+    if pool is None:
+        results = [read_invoice_pages(pdf_path, pages, flavor) for flavor, pages in plan.items() if pages]
+    else:
+        futures = [
+            pool.submit(read_invoice_pages, pdf_path, pages[i:i + CAMELOT_PAGES_PER_TASK], flavor)
+            for flavor, pages in plan.items()
+            for i in range(0, len(pages), CAMELOT_PAGES_PER_TASK)
+        ]
+        results = [fut.result() for fut in futures]
+    return {number: tables for result in results for number, tables in result}
+
+
+def _camelot_tables(
+    pdf_path: str,
+    page_numbers: List[int],
+    index: Optional[PageIndex],
+    flavor: str,
+    max_workers: Optional[int],
+    trace: Optional[Trace] = None,
+) -> PageTables:
+    """
+    Camelot over page_numbers with each page's flavor from plan_flavors. In
+    auto mode, anchor pages whose tables show no anchor, or blocks missing a
+    commodity code, gross mass or item price, are retried once with the
+    other flavor, and the retry is kept when it parses more complete blocks
+    (or finds blocks where the first pass found none). Every other page is
+    parsed exactly once.
+    """
+    if not page_numbers:
+        return []
+
+    plan = plan_flavors(page_numbers, index, flavor)
+    pool = _camelot_pool(len(page_numbers), max_workers)
+    try:
+        with stage(trace, "camelot", pages=len(page_numbers)) as span:
+            found = _camelot_pages(pdf_path, plan, pool)
+            span.info = {name: len(pages) for name, pages in plan.items()}
+
+        if flavor == "auto":
+            anchor_pages = set(index.anchor_pages)
+            retry = {
+                _other_flavor(first): [n for n in pages if n in anchor_pages and not _page_parsed(found[n])]
+                for first, pages in plan.items()
+            }
+            retry_pages = sum(len(pages) for pages in retry.values())
+            if retry_pages:
+                with stage(trace, "camelot retry", pages=retry_pages) as span:
+                    kept = 0
+                    for number, tables in _camelot_pages(pdf_path, retry, pool).items():
+                        blocks, complete = _complete_blocks(found[number])
+                        retry_blocks, retry_complete = _complete_blocks(tables)
+                        if retry_complete > complete or (blocks == 0 and retry_blocks > 0):
+                            found[number] = tables
+                            kept += 1
+                    span.info["kept"] = kept
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Page order, so tables line up with a serial run.
+    return [found[number] for number in page_numbers]
+
+
+def read_invoice_tables(
+    pdf_path: str,
+    cache: Optional[ExtractionCache] = None,
+    max_workers: Optional[int] = None,
+    prefilter: bool = True,
+    flavor: str = "auto",
+    trace: Optional[Trace] = None,
+) -> List[pd.DataFrame]:
+    """
+    Runs Camelot over the PDF, or loads its tables from cache when the same
+    file was parsed before with the same settings. With prefilter, only pages
+    whose text layer mentions an anchor are handed to Camelot. flavor is
+    "lattice", "stream" or "auto" (the default; chosen per page, see
+    _camelot_tables).
+    Long documents are split into page ranges and parsed in a process pool
+    of max_workers. Steps are timed into trace, when given. Each table's
+    1-based page number is in its attrs["page"].
+    """
+    if flavor not in FLAVORS:
+        raise ValueError(f"Unknown Camelot flavor: {flavor}")
+
+    settings = {
+        "extractor": "camelot",
+        "prefilter": prefilter,
+        "flavor": flavor,
+        "flavors": CAMELOT_FLAVOR_SETTINGS,
+        "min_ruling": MIN_RULING_SEGMENTS,
+    }
+    key, pages, page_numbers = None, None, None
+    if cache is not None:
+        with stage(trace, "cache lookup") as span:
+            key = cache.key(pdf_path, settings)
+            pages = cache.get(key)
+            span.info["hit"] = pages is not None
+            if pages is not None:
+                span.pages = len(pages)
+
+    if pages is None:
+        if prefilter or flavor == "auto":
+            with stage(trace, "page scan") as span:
+                index = page_index(pdf_path, cache)
+                span.pages = index.page_count
+        else:
+            index = None
+        if prefilter:
+            page_numbers = index.anchor_pages
+        else:
+            page_count = index.page_count if index is not None else count_pages(pdf_path)
+            page_numbers = list(range(1, page_count + 1))
+        pages = _camelot_tables(pdf_path, page_numbers, index, flavor, max_workers, trace)
+        if cache is not None:
+            cache.put(key, pages)
+
+    if page_numbers is None:
+        # Cache hit: the anchor pages come from the (also cached) page index.
+        page_numbers = page_index(pdf_path, cache).anchor_pages if prefilter else range(1, len(pages) + 1)
+
+    with stage(trace, "build tables") as span:
+        tables = []
+        for number, page_tables in zip(page_numbers, pages):
+            for rows in page_tables:
+                df = pd.DataFrame(rows)
+                df.attrs["page"] = number
+                tables.append(df)
+        span.rows = sum(len(df) for df in tables)
+    return tables
+
+
+# Rows containing either anchor start a block; compiled once for every table.
+ANCHOR_PATTERN = re.compile("31 Packages|Description of Goods", re.IGNORECASE)
+
+
+def cell_hits(cells: np.ndarray, pattern: "re.Pattern") -> np.ndarray:
+    """Boolean array, shaped like a table's cell array, of cells matching pattern."""
+    if cells.size == 0:
+        return np.zeros(cells.shape, dtype=bool)
+    flat = pd.Series(cells.astype(str).ravel(), dtype=object)
+    return flat.str.contains(pattern, na=False).to_numpy(dtype=bool).reshape(cells.shape)
+
+
+def find_anchor_rows(cells: np.ndarray) -> np.ndarray:
+    """Row numbers of a table's cell array where any cell contains an anchor."""
+    return np.flatnonzero(cell_hits(cells, ANCHOR_PATTERN).any(axis=1))
+
+
+# Lattice splits an invoice into fixed cell columns: marks and description,
+# commodity code and gross mass, item price.
+LATTICE_COLUMNS = (1, 12, 16)
+FIELD_LABEL_PATTERN = re.compile(r"Commodity \(HS\) Code|Gross Mass \(Kg\)", re.IGNORECASE)
+RX_DIGIT = re.compile(r"\d")
+
+
+def _column_has(cells: np.ndarray, column: int, pattern: "re.Pattern") -> bool:
+    return column < cells.shape[1] and any(
+        pattern.search(str(v)) for v in cells[:, column] if not pd.isna(v)
+    )
+
+
+class BlockColumns:
+    """
+    Finds the (marks, commodity/gross mass, item price) columns of each
+    block in one table. Lattice tables use LATTICE_COLUMNS; tables split
+    another way (stream) are mapped by position: the anchor's column, the
+    column holding the commodity/gross mass labels, and the rightmost column
+    after it with any digits.
+    """
+
+    def __init__(self, cells: np.ndarray):
+        self.cells = cells
+        self.anchors = cell_hits(cells, ANCHOR_PATTERN)
+
+    def anchor_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.anchors.any(axis=1))
+
+    def __call__(self, start: int, stop: int) -> Tuple[int, int, int]:
+        block = self.cells[start:stop]
+        if _column_has(block, LATTICE_COLUMNS[1], FIELD_LABEL_PATTERN):
+            return LATTICE_COLUMNS
+        width = block.shape[1]
+        labels = [c for c in range(width) if _column_has(block, c, FIELD_LABEL_PATTERN)]
+        if not labels:
+            return LATTICE_COLUMNS
+
+        anchors = np.flatnonzero(self.anchors[start])
+        marks = int(anchors[0]) if anchors.size else LATTICE_COLUMNS[0]
+        fields = labels[0]
+        numbers = [c for c in range(fields + 1, width) if _column_has(block, c, RX_DIGIT)]
+        # No number to the right: an out-of-range column reads as empty, and
+        # scan_block falls back to the numbers in the field column.
+        price = numbers[-1] if numbers else width
+        return marks, fields, price
+
+
+def _column_cells(cells: np.ndarray, start: int, stop: int, column: int) -> List[str]:
+    if column >= cells.shape[1]:
+        return []
+    return [str(v) for v in cells[start:stop, column] if not pd.isna(v)]
+
+
+def parse_blocks(tables: Iterable[pd.DataFrame], rows_after: int = 4) -> Tuple[List[Dict[str, str]], List[Optional[int]]]:
+    """
+    Parses every anchor row of the Camelot tables, plus the rows_after rows
+    below it, into one output row; BlockColumns finds the fields in tables
+    of either flavor. Returns the rows and the page each came from (the
+    table's attrs["page"], None when unknown).
+    """
+    all_data_rows: List[Dict[str, str]] = []
+    pages: List[Optional[int]] = []
+
+    for df in tables:
+        cells = df.to_numpy(dtype=object)
+        n_rows = cells.shape[0]
+        columns = BlockColumns(cells)
+
+        for start in columns.anchor_rows():
+            stop = min(start + rows_after + 1, n_rows)
+            fields = scan_block(*(_column_cells(cells, start, stop, c) for c in columns(start, stop)))
+            all_data_rows.append(fields.as_row())
+            pages.append(df.attrs.get("page"))
+
+    return all_data_rows, pages
+
+
+def blocks_to_frame(tables: Iterable[pd.DataFrame], rows_after: int = 4) -> Optional[pd.DataFrame]:
+    """parse_blocks() as a DataFrame. None when no table has an anchor."""
+    all_data_rows, _ = parse_blocks(tables, rows_after=rows_after)
+    if not all_data_rows:
+        return None
+
+    return pd.DataFrame(all_data_rows)
+
+
+def extract_filtered_data_with_following_rows(
+    pdf_path: str,
+    rows_after: int = 4,
+    cache: Optional[ExtractionCache] = None,
+    max_workers: Optional[int] = None,
+    prefilter: bool = True,
+    flavor: str = "auto",
+    trace: Optional[Trace] = None,
+    records: Optional[RecordStore] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Extracts relevant blocks from PDF tables and returns a DataFrame.
+    Steps are timed into trace, when given. The rows are added to records,
+    with the page each block was found on, when given.
+    """
+    try:
+        tables = read_invoice_tables(
+            pdf_path, cache=cache, max_workers=max_workers, prefilter=prefilter, flavor=flavor, trace=trace
+        )
+        with stage(trace, "parse blocks", rows=sum(len(df) for df in tables)) as span:
+            all_data_rows, pages = parse_blocks(tables, rows_after=rows_after)
+            df = pd.DataFrame(all_data_rows) if all_data_rows else None
+            span.info["output_rows"] = 0 if df is None else len(df)
+        if records is not None and df is not None:
+            with stage(trace, "record rows", rows=len(df)):
+                records.add_frame(pdf_path, KIND_INVOICE, df, pages)
+        return df
+
+    except Exception as e:
+        raise RuntimeError(f"Failed to process the PDF: {e}")
@@ -0,0 +1,97 @@
+"""
+Field scanner for one matched invoice block.
+
+All patterns are compiled once at import. Each column's text is built once
+and searched once per field, instead of re-joining and re-scanning
+col_12/col_16 for the item-price fallback. Output is the same as the parse_*
+helpers in invoice_extract (tests/test_invoice_parser.py).
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+
+RX_1Z = re.compile(r"(1Z[A-Za-z0-9]+)(?![A-Za-z0-9])", re.IGNORECASE)
+RX_1Z_MARKS = re.compile(r"(1Z[A-Za-z0-9]+)(marks)", re.IGNORECASE)
+RX_TRAILING_OF = re.compile(r"of$", re.IGNORECASE)
+RX_NUMBER_AND_KIND = re.compile(r"Number and kind\s*(\S+)", re.IGNORECASE)
+RX_DESCRIPTION = re.compile(r"Description:\s*(.+)", re.IGNORECASE)
+RX_COMMODITY = re.compile(r"33 Commodity \(HS\) Code(\d+)", re.IGNORECASE)
+RX_GROSS_MASS = re.compile(r"35 Gross Mass \(Kg\)[A-Za-z]*(\d+\.\d+)", re.IGNORECASE)
+RX_NUMBER = re.compile(r"[\d,\.]+")
+
+_DIGITS_ONLY = str.maketrans("", "", ",.")
+
+OUTPUT_COLUMNS = [
+    "Marks & Nosof Packages",
+    "Description",
+    "Commodity_Code",
+    "Gross_Mass",
+    "Item_Price",
+]
+
+
+@dataclass(slots=True)
+class InvoiceFields:
+    container_number: str = ""
+    description: str = ""
+    commodity_code: str = ""
+    gross_mass: str = ""
+    item_price: str = ""
+
+    def as_row(self) -> Dict[str, str]:
+        return dict(zip(OUTPUT_COLUMNS, (
+            self.container_number,
+            self.description,
+            self.commodity_code,
+            self.gross_mass,
+            self.item_price,
+        )))
+
+
+def _numbers(text: str) -> List[str]:
+    # ignore weird stray "42" you previously filtered
+    return [n for n in RX_NUMBER.findall(text) if n.translate(_DIGITS_ONLY) != "42"]
+
+
+def marks_text(col1_cells: Sequence[str]) -> str:
+    text = " ".join(c for c in col1_cells if c.strip().lower() != "marks").strip()
+    return RX_1Z_MARKS.sub(r"\1 Marks", text)
+
+
+def scan_block(col1_cells: Sequence[str], col12_cells: Sequence[str], col16_cells: Sequence[str]) -> InvoiceFields:
+    """Reads every field of a matched block from its col_1, col_12 and col_16 cells."""
+    fields = InvoiceFields()
+
+    col1_text = marks_text(col1_cells)
+    m = RX_1Z.search(col1_text)
+    if m:
+        fields.container_number = RX_TRAILING_OF.sub("", m.group(0).strip()).strip()
+    else:
+        m = RX_NUMBER_AND_KIND.search(col1_text)
+        fields.container_number = m.group(1).strip() if m else ""
+    m = RX_DESCRIPTION.search(col1_text)
+    fields.description = m.group(1).strip() if m else ""
+
+    col12_text = " ".join(col12_cells).strip()
+    m = RX_COMMODITY.search(col12_text)
+    if m:
+        raw = m.group(1)
+        fields.commodity_code = raw[:-2] if len(raw) >= 2 else raw
+    m = RX_GROSS_MASS.search(col12_text)
+    if m:
+        fields.gross_mass = m.group(1)
+
+    col16_nums = _numbers(" ".join(col16_cells))
+    if col16_nums:
+        fields.item_price = col16_nums[-1]
+    else:
+        # No price in col_16: fall back to col_12's numbers minus the gross mass.
+        # (Numbers never span the joining space, so col_16 adds nothing here.)
+        fallback = _numbers(col12_text)
+        if fields.gross_mass in fallback:
+            fallback.remove(fields.gross_mass)
+        if fallback:
+            fields.item_price = fallback[-1]
+
+    return fields
@@ -0,0 +1,633 @@
+"""
+Background extraction jobs with their state kept in SQLite.
+
+A job is one invoice extraction or one manifest compare. JobStore records
+every job (inputs, status, progress, result location) in
+<root>/jobs.sqlite3 and keeps finished results as pickles under
+<root>/results, so status and results survive a restart. A running job
+records the process that claimed it (host:pid) and that process's last
+heartbeat; jobs whose process has exited, or whose heartbeat has gone
+stale, are queued again. Jobs run by another live process are left alone.
+
+JobManager runs queued jobs in its own process pool, at most `workers` at a
+time, taking the next one by the scheduling policy:
+
+- "fifo": in submission order;
+- "shortest": smallest total file size first, so a short invoice isn't
+  stuck behind a 500-page manifest (ties in submission order).
+
+Progress is written to the store by the worker process running the job,
+and the same worker polls the store for a cancel request between pages
+(compare) or between stages (invoice). Closing the manager asks its
+running jobs to stop the same way and queues them again.
+"""
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from cargo_manifest import ExtractionCancelled, run_compare_pipeline
+from extraction_cache import default_cache
+from invoice_extract import default_workers, extract_filtered_data_with_following_rows
+from record_store import default_records
+from tracing import Trace
+
+
+JOBS_DIR_ENV = "XTRACTPDF_JOBS_DIR"
+DEFAULT_JOBS_DIR = os.path.join(os.path.expanduser("~"), ".xtractpdf", "jobs")
+
+KIND_INVOICE = "invoice"
+KIND_COMPARE = "compare"
+KINDS = (KIND_INVOICE, KIND_COMPARE)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+FINISHED = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+POLICY_FIFO = "fifo"
+POLICY_SHORTEST = "shortest"
+POLICIES = {
+    POLICY_FIFO: "submitted_at, seq",
+    POLICY_SHORTEST: "size_bytes, submitted_at, seq",
+}
+
+# How often a running job writes progress to / reads a cancel request from
+# the store; bounds the SQLite traffic of a job with thousands of pages.
+PROGRESS_INTERVAL_SECONDS = 0.5
+# How long the scheduler sleeps between looks at the queue when idle.
+SCHEDULER_POLL_SECONDS = 0.5
+# How often a scheduler marks its running jobs as alive, and how old that
+# mark may get before another process treats the jobs as interrupted.
+HEARTBEAT_SECONDS = 5.0
+STALE_AFTER_SECONDS = 60.0
+
+# cancel_requested values: asked by a user (the job ends cancelled), or by
+# the scheduler shutting down (the job is queued again).
+CANCEL_USER = 1
+CANCEL_REQUEUE = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    error TEXT NOT NULL DEFAULT '',
+    rows INTEGER,
+    result TEXT,
+    uploads TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, submitted_at);
+"""
+# Columns added after the first release; stores created before get them on open.
+ADDED_COLUMNS = {"owner": "TEXT", "heartbeat_at": "REAL"}
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str
+    inputs: Dict[str, List[str]]
+    size_bytes: int = 0
+    submitted_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    done: int = 0
+    total: int = 0
+    message: str = ""
+    error: str = ""
+    rows: Optional[int] = None
+    result: Optional[str] = None
+    uploads: Optional[str] = None
+    cancel_requested: bool = False
+    owner: Optional[str] = None
+    heartbeat_at: Optional[float] = None
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Fraction of the work done, None while the total isn't known yet."""
+        if self.status == STATUS_DONE:
+            return 1.0
+        return self.done / self.total if self.total else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out["progress"] = self.progress
+        del out["result"], out["uploads"]
+        return out
+
+
+def process_owner() -> str:
+    """This process as a job owner: host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_exited(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+def _owner_gone(owner: Optional[str], heartbeat_at: Optional[float], stale_before: float) -> bool:
+    if not owner or heartbeat_at is None or heartbeat_at < stale_before:
+        return True
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        # Our pid, yet not the caller's live owner: a previous process that had it.
+        return True
+    # Signal 0 only probes on POSIX; elsewhere rely on the heartbeat.
+    return os.name == "posix" and _pid_exited(int(pid))
+
+
+def _job(row: sqlite3.Row) -> Job:
+    values = {k: row[k] for k in row.keys() if k != "seq"}
+    values["inputs"] = json.loads(values["inputs"])
+    values["cancel_requested"] = bool(values["cancel_requested"])
+    return Job(**values)
+
+
+class JobStore:
+    """The jobs table plus result and upload files under one directory."""
+
+    def __init__(self, root: str = DEFAULT_JOBS_DIR):
+        self.root = root
+        self.db_path = os.path.join(root, "jobs.sqlite3")
+        self.results_dir = os.path.join(root, "results")
+        self.uploads_dir = os.path.join(root, "uploads")
+        os.makedirs(self.results_dir, exist_ok=True)
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            present = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for name, decl in ADDED_COLUMNS.items():
+                if name not in present:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        # A connection per call: the store is used from several threads and
+        # from worker processes, and SQLite serialises the writes.
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def upload_dir(self, job_id: str) -> str:
+        """Where a job's uploaded files are kept until it finishes."""
+        path = os.path.join(self.uploads_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def result_path(self, job_id: str) -> str:
+        return os.path.join(self.results_dir, f"{job_id}.pkl")
+
+    def add(self, kind: str, inputs: Dict[str, List[str]], job_id: Optional[str] = None,
+            uploads: Optional[str] = None) -> Job:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        paths = [p for files in inputs.values() for p in files]
+        job = Job(
+            id=job_id or self.new_id(),
+            kind=kind,
+            status=STATUS_QUEUED,
+            inputs=inputs,
+            size_bytes=sum(os.path.getsize(p) for p in paths),
+            submitted_at=time.time(),
+            uploads=uploads,
+        )
+        with self._db() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, inputs, size_bytes, submitted_at, uploads) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.id, kind, job.status, json.dumps(inputs), job.size_bytes, job.submitted_at, uploads),
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._db() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row is not None else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        """Most recent jobs first."""
+        query, args = "SELECT * FROM jobs", []
+        if status:
+            query, args = query + " WHERE status = ?", [status]
+        with self._db() as db:
+            rows = db.execute(query + " ORDER BY seq DESC LIMIT ?", (*args, limit)).fetchall()
+        return [_job(r) for r in rows]
+
+    def claim_next(self, policy: str = POLICY_FIFO, owner: Optional[str] = None) -> Optional[Job]:
+        """Marks the next queued job (by policy) as running by owner and returns it."""
+        order = POLICIES[policy]
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(f"SELECT * FROM jobs WHERE status = ? ORDER BY {order} LIMIT 1", (STATUS_QUEUED,)).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            now = time.time()
+            db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ?, heartbeat_at = ? WHERE id = ?",
+                (STATUS_RUNNING, now, owner, now, row["id"]),
+            )
+            db.execute("COMMIT")
+        return self.get(row["id"])
+
+    def heartbeat(self, owner: str):
+        """Marks owner's running jobs as alive."""
+        with self._db() as db:
+            db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?", (time.time(), owner, STATUS_RUNNING)
+            )
+
+    def set_progress(self, job_id: str, done: int, total: int, message: str = ""):
+        with self._db() as db:
+            db.execute("UPDATE jobs SET done = ?, total = ?, message = ? WHERE id = ?", (done, total, message, job_id))
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancels a queued job at once; a running one is asked to stop and
+        becomes cancelled when its worker notices. Finished jobs are left alone.
+        """
+        with self._db() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, cancel_requested = ? WHERE id = ? AND status = ?",
+                (STATUS_CANCELLED, time.time(), CANCEL_USER, job_id, STATUS_QUEUED),
+            )
+            db.execute(
+                "UPDATE jobs SET cancel_requested = ? WHERE id = ? AND status = ?", (CANCEL_USER, job_id, STATUS_RUNNING)
+            )
+        return self.get(job_id)
+
+    def interrupt(self, owner: str) -> int:
+        """
+        Asks owner's running jobs to stop so they can be queued again (a
+        user's cancel request takes precedence); returns how many.
+        """
+        with self._db() as db:
+            cur = db.execute(
+                "UPDATE jobs SET cancel_requested = ? WHERE owner = ? AND status = ? AND cancel_requested = 0",
+                (CANCEL_REQUEUE, owner, STATUS_RUNNING),
+            )
+            return cur.rowcount
+
+    def cancel_reason(self, job_id: str) -> int:
+        """0, CANCEL_USER or CANCEL_REQUEUE."""
+        with self._db() as db:
+            row = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return bool(self.cancel_reason(job_id))
+
+    def finish(self, job_id: str, status: str, rows: Optional[int] = None, result: Optional[str] = None,
+               error: str = ""):
+        with self._db() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, rows = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), rows, result, error, job_id),
+            )
+
+    def requeue(self, job_id: str):
+        with self._db() as db:
+            self._requeue(db, job_id)
+
+    @staticmethod
+    def _requeue(db: sqlite3.Connection, job_id: str):
+        db.execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, done = 0, total = 0, message = '', owner = NULL, "
+            "heartbeat_at = NULL, cancel_requested = 0 WHERE id = ?",
+            (STATUS_QUEUED, job_id),
+        )
+
+    def requeue_interrupted(self, live_owner: Optional[str] = None, stale_after: float = STALE_AFTER_SECONDS) -> int:
+        """
+        Queues running jobs whose process is gone: its pid has exited (same
+        host) or its heartbeat is older than stale_after. live_owner's jobs
+        are never touched. A job the user asked to cancel becomes cancelled
+        instead. Returns how many jobs were requeued or cancelled.
+        """
+        now = time.time()
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute(
+                "SELECT id, owner, heartbeat_at, cancel_requested FROM jobs WHERE status = ?", (STATUS_RUNNING,)
+            ).fetchall()
+            stale = [
+                r for r in rows
+                if (r["owner"] is None or r["owner"] != live_owner) and _owner_gone(r["owner"], r["heartbeat_at"], now - stale_after)
+            ]
+            for r in stale:
+                if r["cancel_requested"] == CANCEL_USER:
+                    db.execute(
+                        "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?", (STATUS_CANCELLED, now, r["id"])
+                    )
+                else:
+                    self._requeue(db, r["id"])
+            db.execute("COMMIT")
+        return len(stale)
+
+    def load_result(self, job: Job) -> pd.DataFrame:
+        return pd.read_pickle(job.result)
+
+
+#############################################################################
+#                         Running a job (worker side)                        #
+#############################################################################
+
+class _JobProgress:
+    """Progress writes and cancel checks for one job, throttled to the store."""
+
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self._last_write = 0.0
+        self._last_check = 0.0
+        self._cancelled = False
+
+    def update(self, done: Optional[int] = None, total: Optional[int] = None, message: Optional[str] = None,
+               force: bool = False):
+        self.done = self.done if done is None else done
+        self.total = self.total if total is None else total
+        self.message = self.message if message is None else message
+        now = time.monotonic()
+        if force or now - self._last_write >= PROGRESS_INTERVAL_SECONDS:
+            self._last_write = now
+            self.store.set_progress(self.job_id, self.done, self.total, self.message)
+
+    def is_cancelled(self) -> bool:
+        now = time.monotonic()
+        if not self._cancelled and now - self._last_check >= PROGRESS_INTERVAL_SECONDS:
+            self._last_check = now
+            self._cancelled = self.store.cancel_requested(self.job_id)
+        return self._cancelled
+
+
+class _JobTrace(Trace):
+    """Reports each invoice stage as the job's progress and stops at a cancel request."""
+
+    def __init__(self, progress: _JobProgress, stages: int):
+        super().__init__("job")
+        self.job_progress = progress
+        self.stage_count = stages
+
+    @contextmanager
+    def stage(self, name, rows=None, pages=None):
+        if self.job_progress.is_cancelled():
+            raise ExtractionCancelled()
+        done = min(len(self.spans), self.stage_count - 1)
+        self.job_progress.update(done=done, total=self.stage_count, message=name, force=True)
+        with super().stage(name, rows=rows, pages=pages) as span:
+            yield span
+
+
+# Stages extract_filtered_data_with_following_rows usually records (cache
+# lookup, page scan, camelot, build tables, parse blocks, record rows);
+# progress only.
+INVOICE_STAGES = 6
+
+
+def run_job(root: str, job_id: str) -> Tuple[int, str]:
+    """
+    Worker entry point: runs the job and pickles its result. Returns (rows,
+    result path). Raises ExtractionCancelled when the job was cancelled.
+    """
+    store = JobStore(root)
+    job = store.get(job_id)
+    progress = _JobProgress(store, job_id)
+
+    if job.kind == KIND_INVOICE:
+        (pdf_path,) = job.inputs["files"]
+        try:
+            df = extract_filtered_data_with_following_rows(
+                pdf_path,
+                cache=default_cache(),
+                max_workers=1,
+                trace=_JobTrace(progress, INVOICE_STAGES),
+                records=default_records(),
+            )
+        except RuntimeError:
+            # The extractor wraps every error, a cancel included.
+            if progress.is_cancelled():
+                raise ExtractionCancelled()
+            raise
+        if df is None:
+            df = pd.DataFrame()
+    else:
+        files = job.inputs["parents"] + job.inputs["children"]
+        pages_done = [0] * len(files)
+        pages_total = [0] * len(files)
+
+        def on_progress(file_index: int, done: int, total: int):
+            pages_done[file_index], pages_total[file_index] = done, total
+            name = os.path.basename(files[file_index])
+            progress.update(sum(pages_done), sum(pages_total), f"{name}: page {done}/{total}")
+
+        df = run_compare_pipeline(
+            job.inputs["parents"],
+            job.inputs["children"],
+            on_progress=on_progress,
+            is_cancelled=progress.is_cancelled,
+            on_stage=lambda message: progress.update(message=message, force=True),
+            cache=default_cache(),
+            max_workers=1,
+            records=default_records(),
+        )
+
+    progress.update(message="Saving result", force=True)
+    path = store.result_path(job_id)
+    df.to_pickle(path)
+    return len(df), path
+
+
+#############################################################################
+#                          Scheduling (parent side)                          #
+#############################################################################
+
+class JobManager:
+    """
+    Submits jobs to the store and runs them. Pass an executor to run jobs in
+    a pool set up elsewhere (e.g. with warm workers); otherwise one is
+    created. Either way the pool must run nothing but these jobs: `workers`
+    counts jobs to decide how many to claim, and a job queued behind other
+    work would hold its claim without running.
+    """
+
+    def __init__(self, store: JobStore, workers: Optional[int] = None, policy: str = POLICY_FIFO,
+                 executor: Optional[Executor] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.store = store
+        self.workers = max(1, workers or default_workers())
+        self.policy = policy
+        self._own_executor = executor is None
+        self.executor = executor or ProcessPoolExecutor(max_workers=self.workers)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.owner = process_owner()
+        self.requeued = 0
+
+    def start(self):
+        self.requeued = self.store.requeue_interrupted(live_owner=self.owner)
+        self._thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, inputs: Dict[str, List[str]], job_id: Optional[str] = None,
+               uploads: Optional[str] = None) -> Job:
+        job = self.store.add(kind, inputs, job_id=job_id, uploads=uploads)
+        self._wake.set()
+        return job
+
+    def status(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.store.cancel(job_id)
+        if job is not None and job.status == STATUS_CANCELLED:
+            self._remove_uploads(job)
+        return job
+
+    def result(self, job_id: str) -> pd.DataFrame:
+        """The finished job's rows. Raises KeyError for an unknown job, ValueError if it isn't done."""
+        job = self.store.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status != STATUS_DONE:
+            raise ValueError(f"Job {job_id} is {job.status}, not done.")
+        return self.store.load_result(job)
+
+    def close(self):
+        """
+        Stops the scheduler. Running jobs are asked to stop at their next
+        page (compare) or stage (invoice) and are queued again for the next
+        start; a job that finishes first is recorded as done.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._own_executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def _remove_uploads(self, job: Job):
+        if job.uploads:
+            shutil.rmtree(job.uploads, ignore_errors=True)
+
+    def _run(self):
+        running: Dict[Future, str] = {}
+        last_beat = time.monotonic()
+        while not self._stop.is_set():
+            if time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+                last_beat = time.monotonic()
+                self._heartbeat()
+
+            # Claim only what a worker can start now, so the policy decides
+            # among everything queued at that moment.
+            while len(running) < self.workers:
+                try:
+                    job = self.store.claim_next(self.policy, self.owner)
+                except sqlite3.Error as e:
+                    print(f"jobs: could not claim a job: {e}", file=sys.stderr)
+                    job = None
+                if job is None:
+                    break
+                running[self.executor.submit(run_job, self.store.root, job.id)] = job.id
+
+            if not running:
+                self._wake.wait(SCHEDULER_POLL_SECONDS)
+                self._wake.clear()
+                continue
+
+            done, _ = wait(list(running), timeout=SCHEDULER_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for fut in done:
+                self._finish(running.pop(fut), fut)
+
+        # Don't wait out whole jobs: ask them to stop, then record them
+        # (queued again, or done if they finished before noticing).
+        if running:
+            try:
+                self.store.interrupt(self.owner)
+            except sqlite3.Error as e:
+                print(f"jobs: could not interrupt running jobs: {e}", file=sys.stderr)
+        for fut, job_id in running.items():
+            self._finish(job_id, fut)
+
+    def _heartbeat(self):
+        # Keeps our jobs from looking abandoned, and picks up jobs another
+        # process abandoned since we started.
+        try:
+            self.store.heartbeat(self.owner)
+            self.requeued += self.store.requeue_interrupted(live_owner=self.owner)
+        except sqlite3.Error as e:
+            print(f"jobs: heartbeat failed: {e}", file=sys.stderr)
+
+    def _finish(self, job_id: str, fut: Future):
+        # A store error here must not take the scheduler thread down with it;
+        # the job stays "running" and is requeued on the next start.
+        try:
+            self._record(job_id, fut)
+        except sqlite3.Error as e:
+            print(f"jobs: could not record job {job_id}: {e}", file=sys.stderr)
+
+    def _record(self, job_id: str, fut: Future):
+        try:
+            rows, path = fut.result()
+            if self.store.cancel_reason(job_id) == CANCEL_USER:
+                os.remove(path)
+                self.store.finish(job_id, STATUS_CANCELLED)
+            else:
+                self.store.finish(job_id, STATUS_DONE, rows=rows, result=path)
+        except ExtractionCancelled:
+            if self.store.cancel_reason(job_id) == CANCEL_REQUEUE:
+                # Stopped by close(): keep the uploads for the next run.
+                self.store.requeue(job_id)
+                return
+            self.store.finish(job_id, STATUS_CANCELLED)
+        except Exception as e:
+            self.store.finish(job_id, STATUS_FAILED, error=str(e) or type(e).__name__)
+        job = self.store.get(job_id)
+        if job is not None:
+            self._remove_uploads(job)
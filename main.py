@@ -100,8 +100,23 @@ class Ui_Dialog(object):
         )
         self.pushButton_2 = card2.findChild(QtWidgets.QPushButton, "pushButton_2")
 
+        card3 = self._make_card(
+            Dialog,
+            title="Search Records",
+            desc="Find which manifest or invoice a number appeared in, without re-running the PDFs.",
+            bullets=[
+                "HAWB and secondary tracking numbers",
+                "1Z container numbers and HS codes",
+                "Source file and page for every match",
+            ],
+            button_text="Open",
+            button_obj_name="searchRecordsButton",
+        )
+        self.searchRecordsButton = card3.findChild(QtWidgets.QPushButton, "searchRecordsButton")
+
         row.addWidget(card1)
         row.addWidget(card2)
+        row.addWidget(card3)
         root.addLayout(row)
 
         # -------------------------
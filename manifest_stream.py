@@ -0,0 +1,528 @@
+"""
+Out-of-core Compare Cargo Manifests for batches too large for memory.
+
+    python manifest_stream.py --parents Q4/parent*.pdf --children Q4/child*.pdf -o q4.parquet
+
+Pages are extracted as a stream of page-range chunks and each chunk is
+normalised and spilled to a SpillStore: one Arrow IPC file per chunk in a
+temporary directory, its rows hash-partitioned by HAWB into one record
+batch per partition. The join then runs one partition at a time: only that
+partition's child rows (the columns that can reach the output) are indexed
+in memory, and the parent rows of the same partition are joined in bounded
+chunks and spilled again. Finally the joined partitions are merged back
+into parent order, expanded into Master/Baby rows and handed straight to
+the exporter's writer, so neither manifest, the child index nor the result
+is ever held in full.
+
+The output has the same rows, columns and values as run_compare_pipeline.
+Categorical columns are written as plain strings, and a column name
+repeated within one table keeps only its first column.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pdfplumber
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # streaming mode needs pyarrow; the in-memory pipeline doesn't
+    pa = None
+    pa_ipc = None
+
+from cargo_manifest import (
+    CANCEL_POLL_SECONDS,
+    FINAL_COLUMNS,
+    MAX_PAGES_PER_TASK,
+    CancelCallback,
+    ProgressCallback,
+    _check_cancelled,
+    _page_tables,
+    as_path_list,
+    build_frame,
+    count_pages,
+    expand_secondary_to_master_baby,
+    extract_page_range,
+    rename_columns_child,
+    rename_columns_parent,
+)
+from exporters import EXPORTERS, Exporter, ExportProgressCallback, exporter_for_path, get_exporter
+from extraction_cache import PageTables
+from hawb_join import KEY_COLUMN, ChildIndex, JoinReport, left_join
+from record_store import KIND_CHILD, KIND_PARENT, RecordFile, RecordStore, default_records, page_numbers
+from tracing import Trace, stage
+
+
+# Parent rows joined, expanded and written per step. Bounds the working set
+# of the merge together with the size of the child index.
+STREAM_CHUNK_ROWS = 50_000
+
+# HAWB hash partitions of the spill stores; the join holds one partition of
+# the child manifest in memory at a time.
+SPILL_PARTITIONS = 16
+
+# Parent row number, carried through the partitioned join to restore order.
+SEQ_COLUMN = "__seq"
+
+# Page-range tasks in flight per worker; later ranges wait, so finished
+# chunks can't pile up ahead of the one being spilled.
+TASKS_IN_FLIGHT_PER_WORKER = 2
+
+SPILL_DIR_ENV = "XTRACTPDF_SPILL_DIR"
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def iter_page_chunks(
+    pdf_paths: Sequence[str],
+    max_workers: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    is_cancelled: Optional[CancelCallback] = None,
+    pages_per_chunk: int = MAX_PAGES_PER_TASK,
+) -> Iterator[Tuple[int, PageTables]]:
+    """
+    Yields (file_index, page tables) for consecutive page ranges of every
+    file, in file and page order, while later ranges are parsed in a
+    process pool. At most TASKS_IN_FLIGHT_PER_WORKER ranges per worker are
+    parsed or waiting at any time.
+    """
+    page_counts = [count_pages(p) for p in pdf_paths]
+    pages_done = [0] * len(pdf_paths)
+
+    def report(file_index: int, pages: int):
+        pages_done[file_index] += pages
+        if on_progress is not None:
+            on_progress(file_index, pages_done[file_index], page_counts[file_index])
+
+    tasks = [
+        (file_index, start, min(start + pages_per_chunk, count))
+        for file_index, count in enumerate(page_counts)
+        for start in range(0, count, pages_per_chunk)
+    ]
+    workers = max_workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(tasks) <= 1:
+        for file_index, pdf_path in enumerate(pdf_paths):
+            with pdfplumber.open(pdf_path) as pdf:
+                chunk = []
+                for page in pdf.pages:
+                    _check_cancelled(is_cancelled)
+                    chunk.append(_page_tables(page))
+                    page.close()
+                    if len(chunk) == pages_per_chunk:
+                        report(file_index, len(chunk))
+                        yield file_index, chunk
+                        chunk = []
+                if chunk:
+                    report(file_index, len(chunk))
+                    yield file_index, chunk
+        return
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+    try:
+        window = workers * TASKS_IN_FLIGHT_PER_WORKER
+        futures: Dict[int, object] = {}
+        results: Dict[int, list] = {}
+        submitted = 0
+        for next_task in range(len(tasks)):
+            while submitted < len(tasks) and submitted < next_task + window:
+                file_index, start, stop = tasks[submitted]
+                futures[submitted] = pool.submit(extract_page_range, pdf_paths[file_index], start, stop)
+                submitted += 1
+
+            while next_task not in results:
+                _check_cancelled(is_cancelled)
+                done, _ = wait(list(futures.values()), timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for number in [n for n, fut in futures.items() if fut in done]:
+                    results[number] = futures.pop(number).result()
+
+            file_index, start, stop = tasks[next_task]
+            report(file_index, stop - start)
+            yield file_index, results.pop(next_task)
+    except BaseException:
+        # Don't wait for queued pages once the caller has given up.
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+
+def hawb_partitions(keys: pd.Series, partitions: int) -> np.ndarray:
+    """Partition number of every key; stable across runs and processes."""
+    if partitions <= 1:
+        return np.zeros(len(keys), dtype=np.int64)
+    hashes = pd.util.hash_array(keys.fillna("").astype(str).to_numpy(dtype=object))
+    return (hashes % np.uint64(partitions)).astype(np.int64)
+
+
+def _empty_batch(schema) -> "pa.RecordBatch":
+    return pa.RecordBatch.from_arrays([pa.array([], type=f.type) for f in schema], schema=schema)
+
+
+class SpillStore:
+    """
+    Manifest rows on disk: one Arrow IPC file per appended chunk, all
+    columns as strings. columns is the union of every chunk's columns in
+    order of first appearance, as build_frame orders them for a whole file.
+
+    Each file holds one record batch per HAWB hash partition (rows keep
+    their order within a partition), and seq numbers the rows in
+    SEQ_COLUMN in the order they were appended.
+    """
+
+    def __init__(self, directory: str, name: str, partitions: int = SPILL_PARTITIONS, seq: bool = True):
+        self.directory = directory
+        self.name = name
+        self.partitions = max(1, partitions)
+        self.seq = seq
+        self.parts: List[str] = []
+        self.columns: List[str] = []
+        self.rows = 0
+
+    def append(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        df = df.loc[:, ~df.columns.duplicated()]
+        for col in df.columns:
+            if col not in self.columns and col != SEQ_COLUMN:
+                self.columns.append(col)
+        df = df.astype(object).where(df.notna(), None)
+        if self.seq:
+            df[SEQ_COLUMN] = np.arange(self.rows, self.rows + len(df), dtype=np.int64)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        # Row ranges [bounds[p], bounds[p + 1]) of the file, one per partition.
+        if self.partitions > 1 and KEY_COLUMN in df.columns:
+            part = hawb_partitions(df[KEY_COLUMN], self.partitions)
+            order = np.argsort(part, kind="stable")
+            table = table.take(order)
+            bounds = np.searchsorted(part[order], np.arange(self.partitions + 1))
+            bounds[-1] = len(df)
+        else:
+            # One batch; without a HAWB column nothing in the chunk can match,
+            # so partition 0 gets every row.
+            bounds = np.array([0] + [len(df)] * self.partitions)
+
+        path = os.path.join(self.directory, f"{self.name}-{len(self.parts):06d}.arrow")
+        with pa.OSFile(path, "wb") as sink, pa_ipc.new_file(sink, table.schema) as writer:
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                rows = table.slice(start, stop - start).combine_chunks()
+                writer.write_batch(rows.to_batches()[0] if rows.num_rows else _empty_batch(table.schema))
+        self.parts.append(path)
+        self.rows += len(df)
+
+    def iter_frames(self, columns: Sequence[str], chunk_rows: int = STREAM_CHUNK_ROWS,
+                    partition: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        The stored rows (of one partition, when given), in order, in frames
+        of about chunk_rows rows with exactly these columns.
+        """
+        pending: List["pa.Table"] = []
+        pending_rows = 0
+        for path in self.parts:
+            with pa.OSFile(path, "rb") as source:
+                reader = pa_ipc.open_file(source)
+                if partition is None:
+                    table = reader.read_all()
+                else:
+                    table = pa.Table.from_batches([reader.get_batch(partition)])
+            if not table.num_rows:
+                continue
+            pending.append(table.select([c for c in columns if c in table.schema.names]))
+            pending_rows += table.num_rows
+            if pending_rows >= chunk_rows:
+                yield _to_frame(pending, columns)
+                pending, pending_rows = [], 0
+        if pending:
+            yield _to_frame(pending, columns)
+
+
+def _to_frame(tables: List["pa.Table"], columns: Sequence[str]) -> pd.DataFrame:
+    # One conversion per chunk; columns a file lacks come back as nulls.
+    table = tables[0] if len(tables) == 1 else pa.concat_tables(tables, promote_options="default")
+    return table.to_pandas().reindex(columns=list(columns))
+
+
+class _SeqCursor:
+    """Reads one joined partition, in SEQ_COLUMN order, a window at a time."""
+
+    def __init__(self, frames: Iterator[pd.DataFrame]):
+        self._frames = frames
+        self._buffer: Optional[pd.DataFrame] = None
+
+    def take_below(self, stop: int) -> List[pd.DataFrame]:
+        """Rows with SEQ_COLUMN < stop not yet taken."""
+        taken: List[pd.DataFrame] = []
+        while True:
+            if self._buffer is None:
+                self._buffer = next(self._frames, None)
+                if self._buffer is None:
+                    return taken
+            seq = self._buffer[SEQ_COLUMN].to_numpy()
+            cut = int(np.searchsorted(seq, stop))
+            if cut:
+                taken.append(self._buffer.iloc[:cut])
+            if cut < len(seq):
+                self._buffer = self._buffer.iloc[cut:]
+                return taken
+            self._buffer = None
+
+
+@dataclass
+class ColumnPlan:
+    """Which stored columns each side contributes, and the output columns."""
+
+    parent: List[str]
+    child: List[str]
+    final: List[str]
+
+
+def plan_columns(parent_columns: Sequence[str], child_columns: Sequence[str]) -> ColumnPlan:
+    """
+    Mirrors join_parent_child + select_final_columns: columns present on
+    both sides are suffixed by the join and so never reach the output, and a
+    "secondary" column on both sides leaves the rows without babies.
+    """
+    overlap = (set(parent_columns) & set(child_columns)) - {KEY_COLUMN}
+    wanted = set(FINAL_COLUMNS) | {"secondary"}
+    parent = [c for c in parent_columns if c in wanted and c not in overlap]
+    child = [c for c in child_columns if c in wanted and c != KEY_COLUMN and c not in parent_columns]
+    present = set(parent) | set(child) | {"Type"}
+    return ColumnPlan(parent=parent, child=child, final=[c for c in FINAL_COLUMNS if c in present])
+
+
+@dataclass
+class StreamResult:
+    path: str
+    rows_written: int = 0
+    parent_rows: int = 0
+    child_rows: int = 0
+    columns: List[str] = field(default_factory=list)
+    report: JoinReport = field(default_factory=JoinReport)
+
+
+def _writer_sample(plan: ColumnPlan) -> pd.DataFrame:
+    """Empty frame with the output dtypes, for writers that fix column types up front."""
+    return pd.DataFrame({c: pd.Series(dtype=object) for c in plan.final})
+
+
+def write_compare(
+    parents: SpillStore,
+    children: SpillStore,
+    output_path: str,
+    exporter: Exporter,
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+    is_cancelled: Optional[CancelCallback] = None,
+    on_stage: Optional[Callable[[str], None]] = None,
+    on_rows: Optional[ExportProgressCallback] = None,
+    trace: Optional[Trace] = None,
+) -> StreamResult:
+    """
+    Merge, expansion and export of spilled manifests. Partition by
+    partition, the child rows are indexed by HAWB and the parent rows joined
+    through that index and spilled again (next to the stores, removed
+    afterwards); the joined rows are then merged back into parent order,
+    expanded and written chunk_rows parent rows at a time.
+    """
+    if parents.rows == 0:
+        raise ValueError("Parent PDFs produced no data.")
+    if KEY_COLUMN not in parents.columns:
+        raise ValueError("No 'HAWB' column found in Parent manifests.")
+    if children.rows and KEY_COLUMN not in children.columns:
+        raise ValueError("No 'HAWB' column found in Child manifests.")
+    if not parents.seq or parents.partitions != children.partitions:
+        raise ValueError("Spill stores must number parent rows and share one partitioning.")
+
+    plan = plan_columns(parents.columns, children.columns if children.rows else [])
+    result = StreamResult(path=output_path, parent_rows=parents.rows, child_rows=children.rows, columns=plan.final)
+    report = result.report
+    partitions = parents.partitions
+    # Per partition, a chunk of each joined partition is buffered while
+    # merging back into order; keep their sum at about chunk_rows.
+    step_rows = max(1, chunk_rows // partitions)
+
+    join_dir = tempfile.mkdtemp(prefix="joined-", dir=parents.directory)
+    try:
+        joined = [SpillStore(join_dir, f"joined-{p}", partitions=1, seq=False) for p in range(partitions)]
+
+        _check_cancelled(is_cancelled)
+        if on_stage is not None:
+            on_stage("Joining child manifests…")
+        with stage(trace, "partitioned join", rows=parents.rows + children.rows) as span:
+            largest_index = 0
+            for p in range(partitions):
+                _check_cancelled(is_cancelled)
+                index = None
+                if children.rows:
+                    frames = list(children.iter_frames([KEY_COLUMN] + plan.child, partition=p))
+                    if frames:
+                        index = ChildIndex(pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0])
+                        del frames
+                        report.duplicate_keys.extend(index.duplicate_keys)
+                        report.dropped_child_rows += index.dropped_rows
+                        largest_index = max(largest_index, len(index))
+                for chunk in parents.iter_frames(plan.parent + [SEQ_COLUMN], step_rows, partition=p):
+                    _check_cancelled(is_cancelled)
+                    if index is not None:
+                        chunk, chunk_report = left_join(chunk, index)
+                        report.matched_rows += chunk_report.matched_rows
+                    joined[p].append(chunk)
+                del index
+            report.duplicate_keys.sort()
+            span.info["partitions"] = partitions
+            span.info["largest_child_index"] = largest_index
+
+        if on_stage is not None:
+            on_stage("Merging and writing…")
+        columns = plan.parent + plan.child + [SEQ_COLUMN]
+        cursors = [_SeqCursor(store.iter_frames(columns, step_rows)) for store in joined]
+        with stage(trace, "merge + expand + write", rows=parents.rows) as span:
+            with exporter.open_writer(output_path, plan.final, sample=_writer_sample(plan)) as writer:
+                for start in range(0, parents.rows, chunk_rows):
+                    _check_cancelled(is_cancelled)
+                    stop = min(start + chunk_rows, parents.rows)
+                    pieces = [piece for cursor in cursors for piece in cursor.take_below(stop)]
+                    merged = pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0]
+                    merged = merged.sort_values(SEQ_COLUMN, kind="stable", ignore_index=True)
+                    if "secondary" not in merged.columns:
+                        merged["secondary"] = ""
+                    out = expand_secondary_to_master_baby(merged)[plan.final]
+                    writer.write(out)
+
+                    result.rows_written += len(out)
+                    if on_rows is not None:
+                        on_rows(stop, parents.rows)
+            span.info["output_rows"] = result.rows_written
+    finally:
+        shutil.rmtree(join_dir, ignore_errors=True)
+    report.parent_rows = parents.rows
+    return result
+
+
+def stream_compare_pipeline(
+    parent_paths: Sequence[str],
+    child_paths: Union[str, Sequence[str]],
+    output_path: str,
+    fmt: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    is_cancelled: Optional[CancelCallback] = None,
+    on_stage: Optional[Callable[[str], None]] = None,
+    on_rows: Optional[ExportProgressCallback] = None,
+    spill_dir: Optional[str] = None,
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+    trace: Optional[Trace] = None,
+    records: Optional[RecordStore] = None,
+    partitions: int = SPILL_PARTITIONS,
+) -> StreamResult:
+    """
+    run_compare_pipeline, written to output_path in bounded memory. Spill
+    files go to a temporary directory under spill_dir (default:
+    XTRACTPDF_SPILL_DIR, else the system temp directory) and are removed
+    afterwards. on_rows(parent_rows_done, parent_rows_total) reports the
+    merge/write phase. Parsed rows are added to records chunk by chunk,
+    when given. The join holds one of `partitions` HAWB hash partitions of
+    the child manifest in memory at a time. Raises ValueError for problems
+    with the manifests.
+    """
+    if not available():
+        raise RuntimeError("Streaming mode needs pyarrow (pip install pyarrow).")
+    exporter = get_exporter(fmt) if fmt else exporter_for_path(output_path)
+
+    parent_paths = as_path_list(parent_paths)
+    child_paths = as_path_list(child_paths)
+    base_dir = spill_dir or os.environ.get(SPILL_DIR_ENV) or None
+    work_dir = tempfile.mkdtemp(prefix="xtractpdf-spill-", dir=base_dir)
+    try:
+        parents = SpillStore(work_dir, "parent", partitions=partitions)
+        children = SpillStore(work_dir, "child", partitions=partitions, seq=False)
+
+        paths = parent_paths + child_paths
+        # Chunks arrive in page order per file; a file's rows become
+        # searchable once all of its chunks are in.
+        record_files: Dict[int, Optional[RecordFile]] = {}
+        first_page = [1] * len(paths)
+        with stage(trace, "extract + spill") as span:
+            for file_index, pages in iter_page_chunks(
+                paths, max_workers=max_workers, on_progress=on_progress, is_cancelled=is_cancelled
+            ):
+                is_parent = file_index < len(parent_paths)
+                tables = (tbl for tables in pages for tbl in tables)
+                rename = rename_columns_parent if is_parent else rename_columns_child
+                df = build_frame(tables, rename=rename)
+                (parents if is_parent else children).append(df)
+                if records is not None:
+                    if file_index not in record_files:
+                        record_files[file_index] = records.open_file(
+                            paths[file_index], KIND_PARENT if is_parent else KIND_CHILD
+                        )
+                    if record_files[file_index] is not None:
+                        record_files[file_index].append(df, page_numbers(pages, first_page[file_index]))
+                first_page[file_index] += len(pages)
+                span.pages = (span.pages or 0) + len(pages)
+            span.rows = parents.rows + children.rows
+        for record_file in record_files.values():
+            if record_file is not None:
+                record_file.close()
+
+        return write_compare(
+            parents, children, output_path, exporter,
+            chunk_rows=chunk_rows, is_cancelled=is_cancelled, on_stage=on_stage, on_rows=on_rows, trace=trace,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Compare parent and child manifests in bounded memory.")
+    ap.add_argument("--parents", nargs="+", required=True, help="parent manifest PDFs")
+    ap.add_argument("--children", nargs="*", default=[], help="child manifest PDFs")
+    ap.add_argument("-o", "--output", required=True, help="output (.xlsx, .csv, .parquet or .arrow)")
+    ap.add_argument("-f", "--format", choices=sorted(EXPORTERS), help="output format (default: from the extension)")
+    ap.add_argument("-w", "--workers", type=int, default=None, help="extraction worker processes")
+    ap.add_argument("--spill-dir", help=f"where to keep spill files (default: ${SPILL_DIR_ENV} or the temp dir)")
+    ap.add_argument("--chunk-rows", type=int, default=STREAM_CHUNK_ROWS, help="parent rows merged per step")
+    ap.add_argument("--partitions", type=int, default=SPILL_PARTITIONS,
+                    help="HAWB hash partitions; the child index holds one at a time")
+    ap.add_argument("--no-records", action="store_true", help="don't add the parsed rows to the record store")
+    args = ap.parse_args(argv)
+
+    def progress(file_index: int, done: int, total: int):
+        print(f"\r{file_index + 1}/{len(args.parents) + len(args.children)}: page {done}/{total}   ",
+              end="", file=sys.stderr, flush=True)
+
+    try:
+        result = stream_compare_pipeline(
+            args.parents,
+            args.children,
+            args.output,
+            fmt=args.format,
+            max_workers=args.workers,
+            on_progress=progress,
+            spill_dir=args.spill_dir,
+            chunk_rows=max(1, args.chunk_rows),
+            partitions=max(1, args.partitions),
+            records=None if args.no_records else default_records(),
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"\nerror: {e}", file=sys.stderr)
+        return 1
+
+    print(f"\nWrote {result.rows_written} rows to {args.output} "
+          f"({result.parent_rows} parent rows, {result.report.matched_rows} matched).")
+    if result.report.duplicate_keys:
+        print(result.report.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
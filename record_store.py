@@ -0,0 +1,415 @@
+"""
+Local store of every parsed row, searchable by HAWB, secondary tracking
+number, 1Z container number and HS code.
+
+Each pipeline run hands the rows it parsed (normalised headers and cells,
+before merge and expansion) to a RecordStore, tagged with the source file
+and page. A source file is stored once per (path, size, mtime) and kind:
+running the same PDFs again only bumps its last_seen time. Lookup keys are
+upper-cased with whitespace removed and kept in a clustered SQLite table,
+so an exact or prefix lookup is an index range scan, not a table scan,
+however many rows are stored.
+
+    python record_store.py 1Z663E000435193488
+    python record_store.py 5212 --field hs --prefix
+    python record_store.py --stats
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from extraction_cache import PageTables
+from invoice_parser import RX_1Z
+
+
+RECORDS_ENV = "XTRACTPDF_RECORDS"
+RECORDS_DB_ENV = "XTRACTPDF_RECORDS_DB"
+DEFAULT_RECORDS_DB = os.path.join(os.path.expanduser("~"), ".xtractpdf", "records.sqlite3")
+
+KIND_PARENT = "parent"
+KIND_CHILD = "child"
+KIND_INVOICE = "invoice"
+
+FIELD_HAWB = "hawb"
+FIELD_SECONDARY = "secondary"
+FIELD_CONTAINER = "container"
+FIELD_HS = "hs"
+FIELDS = (FIELD_HAWB, FIELD_SECONDARY, FIELD_CONTAINER, FIELD_HS)
+
+# Where each key is read from, by column name after header normalisation.
+HAWB_COLUMNS = ["HAWB"]
+SECONDARY_COLUMNS = ["secondary"]
+CONTAINER_COLUMNS = ["Marks & Nosof Packages"]
+HS_CODE_COLUMNS = ["Commodity_Code"]
+# Manifests carry HS codes inside the goods description ("... HS- 52122400").
+HS_TEXT_COLUMNS = ["Description\nof Goods", "Description"]
+RX_HS_IN_TEXT = re.compile(r"(?i)\bHS\s*(?:CODE)?\s*[-:.]?\s*(\d[\d.]{3,}\d)")
+RX_WHITESPACE = re.compile(r"\s+")
+
+DEFAULT_SEARCH_LIMIT = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    kind TEXT NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_stamp ON files (path, size, mtime, kind);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    page INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_file ON records (file_id);
+CREATE TABLE IF NOT EXISTS record_keys (
+    key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    record_id INTEGER NOT NULL,
+    PRIMARY KEY (key, field, record_id)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_key(value: str) -> str:
+    return RX_WHITESPACE.sub("", str(value)).upper()
+
+
+def _stamp(path: str) -> Tuple[str, int, float]:
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime
+
+
+def page_numbers(pages: PageTables, first_page: int = 1) -> np.ndarray:
+    """1-based page of every row build_frame() stacks from pages (header rows excluded)."""
+    counts = [sum(max(len(tbl) - 1, 0) for tbl in tables) for tables in pages]
+    return np.repeat(np.arange(first_page, first_page + len(pages)), counts)
+
+
+def _normalized(values: pd.Series) -> pd.Series:
+    return values.str.replace(RX_WHITESPACE, "", regex=True).str.upper()
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    # Columns may be typed (categoricals); keys are read from their text.
+    values = df[column]
+    return values.astype(object).where(values.notna(), "").astype(str)
+
+
+def row_keys(df: pd.DataFrame) -> List[Tuple[int, str, str]]:
+    """(row position, field, key) for every lookup key found in df's rows."""
+    df = df.reset_index(drop=True)
+    found: List[pd.DataFrame] = []
+
+    def collect(field: str, keys: pd.Series):
+        keys = keys[keys.notna() & (keys != "")]
+        if len(keys):
+            found.append(pd.DataFrame({"row": keys.index.to_numpy(), "field": field, "key": keys.to_numpy()}))
+
+    for column in HAWB_COLUMNS:
+        if column in df.columns:
+            collect(FIELD_HAWB, _normalized(_text(df, column)))
+    for column in SECONDARY_COLUMNS:
+        if column in df.columns:
+            collect(FIELD_SECONDARY, _normalized(_text(df, column).str.split(",").explode()))
+    for column in CONTAINER_COLUMNS:
+        if column in df.columns:
+            collect(FIELD_CONTAINER, _normalized(_text(df, column).str.findall(RX_1Z).explode()))
+    for column in HS_CODE_COLUMNS:
+        if column in df.columns:
+            collect(FIELD_HS, _normalized(_text(df, column)).str.replace(".", "", regex=False))
+    for column in HS_TEXT_COLUMNS:
+        if column in df.columns:
+            codes = _text(df, column).str.extractall(RX_HS_IN_TEXT)[0]
+            collect(FIELD_HS, codes.droplevel(1).str.replace(".", "", regex=False))
+
+    if not found:
+        return []
+    keys = pd.concat(found, ignore_index=True).drop_duplicates()
+    return list(zip(keys["row"].tolist(), keys["field"].tolist(), keys["key"].tolist()))
+
+
+def row_documents(df: pd.DataFrame) -> List[str]:
+    """Each row as JSON of its non-blank cells."""
+    columns = [str(c) for c in df.columns]
+    values = df.to_numpy(dtype=object)
+    blank = pd.isna(df).to_numpy() | (values == "")
+    return [
+        json.dumps(
+            {c: v for c, v, b in zip(columns, row, skip) if not b}, ensure_ascii=False, default=str
+        )
+        for row, skip in zip(values, blank)
+    ]
+
+
+@dataclass
+class RecordHit:
+    field: str
+    key: str
+    kind: str
+    path: str
+    page: Optional[int]
+    last_seen: float
+    data: Dict[str, object]
+
+
+class RecordFile:
+    """
+    Rows of one source file being added; they are searchable once close()
+    marks the file complete. A file left incomplete (crash, cancel) is
+    replaced the next time it is opened.
+    """
+
+    def __init__(self, store: "RecordStore", file_id: int):
+        self.store = store
+        self.file_id = file_id
+        self.rows = 0
+
+    def append(self, df: pd.DataFrame, pages: Optional[Sequence[int]] = None):
+        if df is None or df.empty:
+            return
+        self.rows += self.store._insert_rows(self.file_id, df, pages)
+
+    def close(self):
+        with self.store._db() as db:
+            db.execute("UPDATE files SET complete = 1, rows = ? WHERE id = ?", (self.rows, self.file_id))
+
+
+class RecordStore:
+    """The files, records and record_keys tables in one SQLite database."""
+
+    def __init__(self, db_path: str = DEFAULT_RECORDS_DB):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        # A connection per call: runs add rows from worker threads and
+        # processes while the search page reads.
+        db = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def open_file(self, path: str, kind: str) -> Optional[RecordFile]:
+        """
+        A RecordFile to add path's rows to, or None when this version of the
+        file is already stored (its last_seen time is bumped instead).
+        """
+        abs_path, size, mtime = _stamp(path)
+        now = time.time()
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = db.execute(
+                    "SELECT id, complete FROM files WHERE path = ? AND size = ? AND mtime = ? AND kind = ?",
+                    (abs_path, size, mtime, kind),
+                ).fetchall()
+                if any(row["complete"] for row in rows):
+                    db.execute(
+                        "UPDATE files SET last_seen = ? WHERE path = ? AND size = ? AND mtime = ? AND kind = ?",
+                        (now, abs_path, size, mtime, kind),
+                    )
+                    db.execute("COMMIT")
+                    return None
+                for row in rows:
+                    self._delete_file(db, row["id"])
+                file_id = db.execute(
+                    "INSERT INTO files (path, size, mtime, kind, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?)",
+                    (abs_path, size, mtime, kind, now, now),
+                ).lastrowid
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return RecordFile(self, file_id)
+
+    def add_frame(self, path: str, kind: str, df: pd.DataFrame, pages: Optional[Sequence[int]] = None) -> bool:
+        """Stores df as path's rows; False when they were already stored."""
+        record_file = self.open_file(path, kind)
+        if record_file is None:
+            return False
+        record_file.append(df, pages)
+        record_file.close()
+        return True
+
+    def add_manifests(self, paths: Sequence[str], kind: str, files: Sequence[PageTables], df: pd.DataFrame) -> int:
+        """
+        Stores the rows of df, the frame built from files (one PageTables per
+        path, stacked in order), under their own file and page. Returns the
+        number of files that were new.
+        """
+        added, start = 0, 0
+        for path, pages in zip(paths, files):
+            numbers = page_numbers(pages)
+            stop = start + len(numbers)
+            if self.add_frame(path, kind, df.iloc[start:stop], numbers):
+                added += 1
+            start = stop
+        return added
+
+    def _insert_rows(self, file_id: int, df: pd.DataFrame, pages: Optional[Sequence[int]]) -> int:
+        documents = row_documents(df)
+        keys = row_keys(df)
+        page_list = [None] * len(df) if pages is None else [int(p) for p in pages]
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                first = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM records").fetchone()[0]
+                db.executemany(
+                    "INSERT INTO records (id, file_id, page, data) VALUES (?, ?, ?, ?)",
+                    zip(range(first, first + len(documents)), [file_id] * len(documents), page_list, documents),
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO record_keys (key, field, record_id) VALUES (?, ?, ?)",
+                    ((key, field, first + row) for row, field, key in keys),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return len(documents)
+
+    @staticmethod
+    def _delete_file(db: sqlite3.Connection, file_id: int):
+        db.execute(
+            "DELETE FROM record_keys WHERE record_id IN (SELECT id FROM records WHERE file_id = ?)", (file_id,)
+        )
+        db.execute("DELETE FROM records WHERE file_id = ?", (file_id,))
+        db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def search(
+        self,
+        term: str,
+        field: Optional[str] = None,
+        prefix: bool = False,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+    ) -> List[RecordHit]:
+        """
+        Rows with a key equal to term (or starting with it, with prefix),
+        in any field or only in field. Matching ignores case and whitespace.
+        """
+        if field is not None and field not in FIELDS:
+            raise ValueError(f"Unknown field '{field}'; use one of {', '.join(FIELDS)}.")
+        key = normalize_key(term)
+        if not key:
+            return []
+
+        if prefix:
+            where, params = "k.key >= ? AND k.key < ?", [key, key + "\uffff"]
+        else:
+            where, params = "k.key = ?", [key]
+        if field is not None:
+            where += " AND k.field = ?"
+            params.append(field)
+        params.append(limit)
+
+        # Ordered like the record_keys primary key, so the scan stops at limit.
+        with self._db() as db:
+            rows = db.execute(
+                f"""
+                SELECT k.field, k.key, f.kind, f.path, r.page, f.last_seen, r.data
+                FROM record_keys k
+                JOIN records r ON r.id = k.record_id
+                JOIN files f ON f.id = r.file_id
+                WHERE {where} AND f.complete = 1
+                ORDER BY k.key, k.field, k.record_id
+                LIMIT ?
+                """,
+                params,
+            ).fetchall()
+        return [
+            RecordHit(
+                field=row["field"],
+                key=row["key"],
+                kind=row["kind"],
+                path=row["path"],
+                page=row["page"],
+                last_seen=row["last_seen"],
+                data=json.loads(row["data"]),
+            )
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._db() as db:
+            files, rows = db.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM files WHERE complete = 1").fetchone()
+            keys = db.execute("SELECT COUNT(*) FROM record_keys").fetchone()[0]
+        return {"files": files, "rows": rows, "keys": keys}
+
+
+_default_records: Optional[RecordStore] = None
+_default_lock = threading.Lock()
+
+
+def default_records() -> Optional[RecordStore]:
+    """
+    Shared store for the app and the headless tools, or None when it is
+    switched off (XTRACTPDF_RECORDS=0). XTRACTPDF_RECORDS_DB overrides its
+    location.
+    """
+    global _default_records
+
+    if os.environ.get(RECORDS_ENV, "1") == "0":
+        return None
+
+    with _default_lock:
+        if _default_records is None:
+            try:
+                _default_records = RecordStore(os.environ.get(RECORDS_DB_ENV, DEFAULT_RECORDS_DB))
+            except (OSError, sqlite3.Error):
+                return None
+        return _default_records
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Look up stored manifest and invoice rows.")
+    ap.add_argument("term", nargs="?", help="HAWB, secondary tracking number, 1Z number or HS code")
+    ap.add_argument("--field", choices=FIELDS, help="only match this kind of key")
+    ap.add_argument("--prefix", action="store_true", help="match keys starting with term")
+    ap.add_argument("--limit", type=int, default=DEFAULT_SEARCH_LIMIT)
+    ap.add_argument("--db", default=None, help=f"store location (default: ${RECORDS_DB_ENV} or {DEFAULT_RECORDS_DB})")
+    ap.add_argument("--stats", action="store_true", help="print how much is stored")
+    args = ap.parse_args(argv)
+
+    store = RecordStore(args.db or os.environ.get(RECORDS_DB_ENV, DEFAULT_RECORDS_DB))
+    if args.stats:
+        stats = store.stats()
+        print(f"{stats['files']} files, {stats['rows']} rows, {stats['keys']} keys")
+    if not args.term:
+        return 0 if args.stats else 2
+
+    t0 = time.perf_counter()
+    hits = store.search(args.term, field=args.field, prefix=args.prefix, limit=args.limit)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    for hit in hits:
+        seen = time.strftime("%Y-%m-%d %H:%M", time.localtime(hit.last_seen))
+        print(f"{hit.key}\t{hit.field}\t{hit.kind}\t{hit.path}\tpage {hit.page}\t{seen}")
+    print(f"{len(hits)} match(es) in {elapsed_ms:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
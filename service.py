@@ -0,0 +1,599 @@
+"""
+Local HTTP extraction service for integrations (no PyQt5 needed).
+
+    python service.py --port 8765 --workers 4
+
+Worker processes are started, and have imported pandas, pdfplumber and
+Camelot, before the first request is accepted, so a request pays only for
+parsing its own pages. Each request runs in one worker; concurrent requests
+spread over the pool and queue when every worker is busy.
+
+    POST /invoice   PDF bytes (Content-Type: application/pdf), or JSON
+                    {"file": <file>}
+    POST /compare   JSON {"parents": [<file>, ...], "children": [<file>, ...]}
+    GET  /metrics   request counts, latency percentiles and throughput per endpoint
+    GET  /health
+
+A <file> is a local path, or {"name": "x.pdf", "content_base64": "..."} for an
+upload. Results are JSON ({"columns", "data", "rows", "seconds"}) unless
+?format=parquet (or csv, arrow, xlsx) asks for a file; the row count and
+time are then in the X-Rows and X-Seconds headers.
+
+The service listens on 127.0.0.1 by default and reads any local path it is
+given; don't expose it beyond the machine.
+"""
+import argparse
+import base64
+import binascii
+import importlib
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from batch_extract import extract_file
+from cargo_manifest import run_compare_pipeline
+from exporters import EXPORTERS, get_exporter
+from extraction_cache import default_cache
+from hawb_join import JoinReport
+from invoice_extract import default_workers
+from jobs import (
+    DEFAULT_JOBS_DIR,
+    JOBS_DIR_ENV,
+    KIND_COMPARE,
+    KIND_INVOICE,
+    POLICIES,
+    POLICY_FIFO,
+    STATUS_DONE,
+    Job,
+    JobManager,
+    JobStore,
+)
+from record_store import default_records
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Largest request body accepted (uploads arrive base64-encoded in JSON).
+MAX_BODY_MB = 256
+
+# Imported by every worker process before it takes a request. The image
+# backends are what lattice pages need; missing optional ones are skipped.
+WORKER_WARM_MODULES = [
+    "pandas",
+    "pdfplumber",
+    "camelot",
+    "camelot.backends.image_conversion",
+    "pypdfium2",
+    "ghostscript",
+    "invoice_extract",
+    "cargo_manifest",
+]
+
+# Requests a worker serves before it is replaced, bounding memory held by
+# rasterised pages (Python 3.11+).
+TASKS_PER_WORKER = 200
+
+# Latencies kept per endpoint for the percentiles in /metrics.
+LATENCY_SAMPLES = 1000
+# /metrics reports throughput over this trailing window as well as since start.
+THROUGHPUT_WINDOW_SECONDS = 60
+
+RESULT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+class RequestError(ValueError):
+    """A request the service can't act on; status is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+#############################################################################
+#                              Worker processes                              #
+#############################################################################
+
+def _warm_worker():
+    for name in WORKER_WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def _worker_pid() -> int:
+    # Long enough that each warm-up call lands on a different worker.
+    time.sleep(0.1)
+    return os.getpid()
+
+
+def invoice_job(pdf_path: str) -> Tuple[Optional[pd.DataFrame], float]:
+    # Requests already run in parallel, so each one is parsed by a single process.
+    return extract_file(pdf_path, max_workers=1, use_records=True)
+
+
+def compare_job(parent_paths: List[str], child_paths: List[str]) -> Tuple[pd.DataFrame, Dict[str, Any], float]:
+    started = time.perf_counter()
+    reports: List[JoinReport] = []
+    df = run_compare_pipeline(
+        parent_paths,
+        child_paths,
+        cache=default_cache(),
+        on_report=reports.append,
+        max_workers=1,
+        records=default_records(),
+    )
+    report = asdict(reports[0]) if reports else {}
+    return df, report, time.perf_counter() - started
+
+
+#############################################################################
+#                                  Metrics                                   #
+#############################################################################
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    errors: int = 0
+    rows: int = 0
+    busy_seconds: float = 0.0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+    finished_at: Deque[float] = field(default_factory=deque)
+
+    def snapshot(self, now: float, uptime: float) -> Dict[str, Any]:
+        while self.finished_at and self.finished_at[0] < now - THROUGHPUT_WINDOW_SECONDS:
+            self.finished_at.popleft()
+        latencies = list(self.latencies)
+        out: Dict[str, Any] = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rows": self.rows,
+            "requests_per_second": round(self.requests / uptime, 3) if uptime else 0.0,
+            "requests_per_second_recent": round(len(self.finished_at) / min(uptime, THROUGHPUT_WINDOW_SECONDS), 3)
+            if uptime else 0.0,
+            "mean_seconds": round(self.busy_seconds / self.requests, 4) if self.requests else None,
+        }
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            out[f"{name}_seconds"] = round(_percentile(latencies, q), 4) if latencies else None
+        return out
+
+
+class Metrics:
+    """Per-endpoint counters, shared by the request threads."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self.in_flight = 0
+        self.pool_restarts = 0
+        self.last_pool_failure: Optional[str] = None
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, endpoint: str, seconds: float, ok: bool, rows: int = 0):
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.errors += 0 if ok else 1
+            stats.rows += rows
+            stats.busy_seconds += seconds
+            stats.latencies.append(seconds)
+            stats.finished_at.append(time.monotonic())
+
+    def pool_restarted(self, reason: str):
+        with self._lock:
+            self.pool_restarts += 1
+            self.last_pool_failure = reason
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            uptime = now - self.started
+            return {
+                "uptime_seconds": round(uptime, 1),
+                "in_flight": self.in_flight,
+                "pool_restarts": self.pool_restarts,
+                "last_pool_failure": self.last_pool_failure,
+                "endpoints": {name: stats.snapshot(now, uptime) for name, stats in self._endpoints.items()},
+            }
+
+
+#############################################################################
+#                                  Service                                   #
+#############################################################################
+
+class ExtractionService:
+    """The warm worker pool plus the request-level logic, independent of HTTP."""
+
+    def __init__(self, workers: Optional[int] = None, jobs_dir: Optional[str] = None, policy: str = POLICY_FIFO,
+                 job_workers: Optional[int] = None):
+        self.workers = max(1, workers or default_workers())
+        self.job_workers = max(1, job_workers or self.workers)
+        self.pool = self._new_pool(self.workers)
+        self._pool_lock = threading.Lock()
+        self.metrics = Metrics()
+        # Background jobs get their own pool: a long job never holds up a
+        # direct request, and the scheduler's worker count stays true.
+        self.job_pool = self._new_pool(self.job_workers)
+        store = JobStore(jobs_dir or os.environ.get(JOBS_DIR_ENV) or DEFAULT_JOBS_DIR)
+        self.jobs = JobManager(store, workers=self.job_workers, policy=policy, executor=self.job_pool)
+        self.jobs.start()
+
+    @staticmethod
+    def _new_pool(workers: int) -> ProcessPoolExecutor:
+        pool_kwargs = {"initializer": _warm_worker}
+        if sys.version_info >= (3, 11):
+            pool_kwargs["max_tasks_per_child"] = TASKS_PER_WORKER
+        return ProcessPoolExecutor(max_workers=workers, **pool_kwargs)
+
+    def warm_up(self) -> int:
+        """Starts every worker now rather than on first use; returns how many answered."""
+        pids = {fut.result() for fut in [self.pool.submit(_worker_pid) for _ in range(self.workers)]}
+        return len(pids)
+
+    def _run(self, fn: Callable, *args):
+        """
+        fn(*args) in a warm worker. A worker that dies (a segfault, the OOM
+        killer) breaks the whole pool, so it is replaced before re-raising.
+        """
+        pool = self.pool
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool as e:
+            self._replace_pool(pool, f"{type(e).__name__}: {e}")
+            raise RuntimeError("A worker process died during the request; the worker pool was restarted.") from e
+
+    def _replace_pool(self, broken: ProcessPoolExecutor, reason: str):
+        # Every request in flight on the broken pool fails at once; only the
+        # first one through here replaces it.
+        with self._pool_lock:
+            if self.pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool(self.workers)
+            self.metrics.pool_restarted(reason)
+            try:
+                self.warm_up()
+            except BrokenProcessPool:
+                pass  # the next request replaces it again
+
+    def invoice(self, pdf_path: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """Runs now and waits; long files are better submitted as jobs."""
+        df, seconds = self._run(invoice_job, pdf_path)
+        if df is None:
+            df = pd.DataFrame()
+        return df, {"file": os.path.basename(pdf_path), "extract_seconds": round(seconds, 4)}
+
+    def compare(self, parent_paths: List[str], child_paths: List[str]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        df, report, seconds = self._run(compare_job, parent_paths, child_paths)
+        return df, {"report": report, "extract_seconds": round(seconds, 4)}
+
+    def close(self):
+        self.jobs.close()
+        self.job_pool.shutdown(wait=True, cancel_futures=True)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def save_upload(name: str, content: bytes, work_dir: str, number: int) -> str:
+    name = os.path.basename(name or "") or f"upload-{number}.pdf"
+    if not content:
+        raise RequestError(f"Upload '{name}' is empty.")
+    # Keep the original name (it shows up in results) but never collide.
+    path = os.path.join(work_dir, f"{number:04d}", name)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as fh:
+        fh.write(content)
+    return path
+
+
+def _write_upload(entry: Dict[str, Any], work_dir: str, number: int) -> str:
+    name = str(entry.get("name") or "")
+    try:
+        content = base64.b64decode(entry.get("content_base64") or "", validate=True)
+    except (binascii.Error, ValueError):
+        raise RequestError(f"Upload '{name}' is not valid base64.")
+    return save_upload(name, content, work_dir, number)
+
+
+def resolve_files(entries: Any, work_dir: str, first_number: int = 0) -> List[str]:
+    """Paths for a list of <file> entries, writing uploads into work_dir."""
+    if not isinstance(entries, list):
+        raise RequestError("Expected a list of files.")
+    paths = []
+    for number, entry in enumerate(entries, start=first_number):
+        if isinstance(entry, str):
+            if not os.path.isfile(entry):
+                raise RequestError(f"No such file: {entry}", status=404)
+            paths.append(entry)
+        elif isinstance(entry, dict):
+            paths.append(_write_upload(entry, work_dir, number))
+        else:
+            raise RequestError("A file is a path or {\"name\", \"content_base64\"}.")
+    return paths
+
+
+#############################################################################
+#                                    HTTP                                    #
+#############################################################################
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "XtractPDF"
+    # Set on the subclass made by make_server().
+    service: ExtractionService = None
+    quiet = False
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        self._send(status, json.dumps(payload, default=str).encode("utf-8"), "application/json")
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_MB * 1024 * 1024:
+            raise RequestError(f"Request body is over {MAX_BODY_MB} MB.", status=413)
+        return self.rfile.read(length)
+
+    def _read_json(self, body: bytes) -> Dict[str, Any]:
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as e:
+            raise RequestError(f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise RequestError("Expected a JSON object.")
+        return payload
+
+    def _handle(self, endpoint: Optional[str], action: Callable[[], Optional[int]]):
+        """
+        Runs action (which sends the response and returns the rows it
+        served), answering errors as JSON. Counts the request in /metrics
+        under endpoint, if given.
+        """
+        metrics = self.service.metrics
+        if endpoint:
+            metrics.begin()
+        started = time.perf_counter()
+        rows, ok = 0, False
+        try:
+            rows, ok = action() or 0, True
+        except RequestError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except ValueError as e:
+            # Problems with the PDFs themselves (no HAWB column, no data, ...).
+            self._send_json(422, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            if endpoint:
+                metrics.end(endpoint, time.perf_counter() - started, ok, rows)
+
+    def _format(self) -> str:
+        fmt = (parse_qs(urlparse(self.path).query).get("format") or ["json"])[0].lower()
+        if fmt != "json" and fmt not in EXPORTERS:
+            raise RequestError(f"Unknown format '{fmt}'; use json or one of {', '.join(sorted(EXPORTERS))}.")
+        return fmt
+
+    def _job(self, job_id: str) -> Job:
+        job = self.service.jobs.status(job_id)
+        if job is None:
+            raise RequestError(f"No such job: {job_id}", status=404)
+        return job
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok", "workers": self.service.workers})
+        elif url.path == "/metrics":
+            self._send_json(200, self.service.metrics.snapshot())
+        elif url.path == "/jobs":
+            self._handle(None, self._list_jobs)
+        elif parts[0] == "jobs" and len(parts) == 2:
+            self._handle(None, lambda: self._send_json(200, self._job(parts[1]).to_dict()))
+        elif parts[0] == "jobs" and len(parts) == 3 and parts[2] == "result":
+            self._handle("jobs/result", lambda: self._job_result(parts[1]))
+        else:
+            self._send_json(404, {"error": f"Unknown path: {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if url.path in ("/invoice", "/compare"):
+            self._handle(parts[0], lambda: self._run_now(parts[0]))
+        elif url.path == "/jobs":
+            self._handle("jobs", self._submit_job)
+        elif parts[0] == "jobs" and len(parts) == 3 and parts[2] == "cancel":
+            self._handle(None, lambda: self._cancel_job(parts[1]))
+        else:
+            self._send_json(404, {"error": f"Unknown path: {url.path}"})
+
+    def _read_inputs(self, kind: Optional[str], work_dir: str) -> Tuple[str, Dict[str, List[str]]]:
+        """The request's job kind and input paths, with uploads written into work_dir."""
+        body = self._read_body()
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type == "application/pdf":
+            if kind not in (None, KIND_INVOICE):
+                raise RequestError("Only an invoice can be sent as a PDF body.")
+            name = (parse_qs(urlparse(self.path).query).get("name") or ["upload.pdf"])[0]
+            return KIND_INVOICE, {"files": [save_upload(name, body, work_dir, 0)]}
+
+        payload = self._read_json(body)
+        kind = kind or payload.get("kind", KIND_INVOICE)
+        if kind == KIND_INVOICE:
+            if payload.get("file") is None:
+                raise RequestError("Send the PDF as application/pdf, or JSON {\"file\": ...}.")
+            return kind, {"files": resolve_files([payload["file"]], work_dir)}
+        if kind == KIND_COMPARE:
+            parents = resolve_files(payload.get("parents", []), work_dir)
+            children = resolve_files(payload.get("children", []), work_dir, first_number=len(parents))
+            if not parents:
+                raise RequestError("'parents' must list at least one file.")
+            return kind, {"parents": parents, "children": children}
+        raise RequestError(f"Unknown kind '{kind}'; use {KIND_INVOICE} or {KIND_COMPARE}.")
+
+    def _run_now(self, kind: str) -> int:
+        started = time.perf_counter()
+        fmt = self._format()
+        work_dir = tempfile.mkdtemp(prefix="xtractpdf-request-")
+        try:
+            kind, inputs = self._read_inputs(kind, work_dir)
+            if kind == KIND_INVOICE:
+                df, info = self.service.invoice(inputs["files"][0])
+            else:
+                df, info = self.service.compare(inputs["parents"], inputs["children"])
+            self._send_result(df, info, fmt, time.perf_counter() - started, work_dir)
+            return len(df)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _submit_job(self) -> None:
+        store = self.service.jobs.store
+        job_id = store.new_id()
+        work_dir = store.upload_dir(job_id)
+        try:
+            kind, inputs = self._read_inputs(None, work_dir)
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        uploads = work_dir
+        if not os.listdir(work_dir):
+            os.rmdir(work_dir)
+            uploads = None
+        job = self.service.jobs.submit(kind, inputs, job_id=job_id, uploads=uploads)
+        self._send(
+            202, json.dumps(job.to_dict()).encode("utf-8"), "application/json", {"Location": f"/jobs/{job.id}"}
+        )
+
+    def _list_jobs(self) -> None:
+        query = parse_qs(urlparse(self.path).query)
+        status = (query.get("status") or [None])[0]
+        try:
+            limit = int((query.get("limit") or [100])[0])
+        except ValueError:
+            raise RequestError("'limit' must be a number.")
+        jobs = self.service.jobs.store.list(status=status, limit=limit)
+        self._send_json(200, {"jobs": [job.to_dict() for job in jobs]})
+
+    def _cancel_job(self, job_id: str) -> None:
+        self._job(job_id)
+        self._send_json(200, self.service.jobs.cancel(job_id).to_dict())
+
+    def _job_result(self, job_id: str) -> int:
+        fmt = self._format()
+        job = self._job(job_id)
+        if job.status != STATUS_DONE:
+            raise RequestError(f"Job {job_id} is {job.status}; results exist only for done jobs.", status=409)
+        df = self.service.jobs.result(job_id)
+        work_dir = tempfile.mkdtemp(prefix="xtractpdf-request-")
+        try:
+            info = {"id": job.id, "kind": job.kind}
+            self._send_result(df, info, fmt, (job.finished_at or 0) - (job.started_at or 0), work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return len(df)
+
+    def _send_result(self, df: pd.DataFrame, info: Dict[str, Any], fmt: str, seconds: float, work_dir: str):
+        if fmt == "json":
+            data = df.astype(object).where(df.notna(), None).values.tolist()
+            payload = {"rows": len(df), "seconds": round(seconds, 4), "columns": [str(c) for c in df.columns]}
+            payload.update(info)
+            payload["data"] = data
+            self._send_json(200, payload)
+            return
+
+        exporter = get_exporter(fmt)
+        path = os.path.join(work_dir, "result" + exporter.extension)
+        exporter.write(df, path)
+        with open(path, "rb") as fh:
+            body = fh.read()
+        headers = {"X-Rows": str(len(df)), "X-Seconds": f"{seconds:.4f}"}
+        self._send(200, body, RESULT_CONTENT_TYPES.get(fmt, "application/octet-stream"), headers)
+
+
+def make_server(
+    service: ExtractionService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, quiet: bool = False
+) -> ThreadingHTTPServer:
+    handler = type("Handler", (_Handler,), {"service": service, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Local HTTP service for invoice extraction and manifest compare.")
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: XTRACTPDF_WORKERS or CPU count)")
+    ap.add_argument("--job-workers", type=int, default=None,
+                    help="worker processes for background jobs, separate from --workers (default: same number)")
+    ap.add_argument("--jobs-dir", help=f"job database and results (default: ${JOBS_DIR_ENV} or ~/.xtractpdf/jobs)")
+    ap.add_argument("--scheduler", choices=sorted(POLICIES), default=POLICY_FIFO,
+                    help="order queued jobs start in: fifo, or shortest (smallest files first)")
+    ap.add_argument("-q", "--quiet", action="store_true", help="don't log every request")
+    args = ap.parse_args(argv)
+
+    service = ExtractionService(args.workers, jobs_dir=args.jobs_dir, policy=args.scheduler, job_workers=args.job_workers)
+    started = time.perf_counter()
+    ready = service.warm_up()
+    server = make_server(service, args.host, args.port, quiet=args.quiet)
+    print(f"Serving on http://{args.host}:{server.server_port} "
+          f"({ready} warm worker(s), ready in {time.perf_counter() - started:.1f}s)", flush=True)
+    if service.jobs.requeued:
+        print(f"Re-queued {service.jobs.requeued} interrupted job(s).", flush=True)
+    # Stop the same way on SIGTERM as on Ctrl+C, so the workers are shut down too.
+    signal.signal(signal.SIGTERM, lambda *_: _raise_interrupt())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+def _raise_interrupt():
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_extract  # noqa: E402
+
+
+def _run(monkeypatch, tmp_path, *flags):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF")
+    seen = {}
+
+    def fake_run_batch(pdf_paths, output_path, **kwargs):
+        seen.update(kwargs)
+        return []
+
+    monkeypatch.setattr(batch_extract, "run_batch", fake_run_batch)
+    assert batch_extract.main([str(pdf), "-o", str(tmp_path / "out.csv"), *flags]) == 0
+    return seen
+
+
+def test_records_are_opt_in(monkeypatch, tmp_path):
+    assert _run(monkeypatch, tmp_path)["use_records"] is False
+    assert _run(monkeypatch, tmp_path, "--records")["use_records"] is True
+
+
+def test_file_removed_mid_run_is_recorded_as_failed(monkeypatch, tmp_path):
+    kept, gone = tmp_path / "kept.pdf", tmp_path / "gone.pdf"
+    for pdf in (kept, gone):
+        pdf.write_bytes(b"%PDF")
+
+    def fake_extract(path, *args):
+        return pd.DataFrame({"A": [path]}), 0.0
+
+    class InlinePool(ThreadPoolExecutor):
+        def submit(self, fn, path, *args):
+            future = super().submit(fn, path, *args)
+            future.result()
+            if path == str(gone):
+                os.remove(path)
+            return future
+
+    monkeypatch.setattr(batch_extract, "extract_file", fake_extract)
+    monkeypatch.setattr(batch_extract, "ProcessPoolExecutor", InlinePool)
+    statuses = batch_extract.run_batch([str(kept), str(gone)], str(tmp_path / "out.csv"), workers=1)
+
+    assert [s.status for s in statuses] == [batch_extract.STATUS_DONE, batch_extract.STATUS_FAILED]
+    assert statuses[1].error
+    assert len(pd.read_csv(tmp_path / "out.csv")) == 1
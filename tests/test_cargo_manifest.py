@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cargo_manifest import build_frame, rename_columns_parent, type_columns  # noqa: E402
+from exporters import get_exporter  # noqa: E402
+
+TABLES = [
+    [
+        ["#", "Origin", "HAWB\nNumber", "Pcs", "Weight", "Total\nValue(LKR)"],
+        ["1", "CMB", "H1", "2", "1.00 KGS", "1,522,140.38"],
+        ["2", "DXB", "H2", "", "0.50", "0.00"],
+        ["3", "CMB", "H3", "10", "12", ""],
+    ],
+]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx"])
+def test_typed_frame_exports_the_same_text(tmp_path, fmt):
+    exporter = get_exporter(fmt)
+    if not exporter.available():
+        pytest.skip(f"{fmt} writer not installed")
+    plain = build_frame(TABLES, rename=rename_columns_parent)
+    typed = type_columns(build_frame(TABLES, rename=rename_columns_parent))
+
+    exporter.write(plain, str(tmp_path / f"plain.{fmt}"))
+    exporter.write(typed, str(tmp_path / f"typed.{fmt}"))
+    if fmt == "csv":
+        assert (tmp_path / "typed.csv").read_text() == (tmp_path / "plain.csv").read_text()
+    else:
+        read = {name: pd.read_excel(tmp_path / f"{name}.xlsx", dtype=str) for name in ("plain", "typed")}
+        pd.testing.assert_frame_equal(read["typed"], read["plain"])
+    assert list(typed["Total\nValue(LKR)"]) == ["1,522,140.38", "0.00", ""]
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import openpyxl
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exporters  # noqa: E402
+from exporters import ExcelExporter  # noqa: E402
+
+
+def _values(path):
+    return [list(row) for row in openpyxl.load_workbook(path).active.iter_rows(values_only=True)]
+
+
+def test_excel_matches_to_excel_values(tmp_path):
+    df = pd.DataFrame({"HAWB": ["1Z1", None, "1Z3"], "Pcs": [1, 2, 3]})
+    df.to_excel(tmp_path / "pandas.xlsx", index=False)
+    ExcelExporter().write(df, str(tmp_path / "stream.xlsx"), chunk_rows=2)
+    assert _values(tmp_path / "stream.xlsx") == _values(tmp_path / "pandas.xlsx")
+
+
+def test_excel_refuses_more_rows_than_a_sheet_holds(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporters, "EXCEL_MAX_ROWS", 3)
+    df = pd.DataFrame({"HAWB": ["1Z1", "1Z2", "1Z3"]})
+    with pytest.raises(ValueError, match="too large"):
+        ExcelExporter().write(df, str(tmp_path / "big.xlsx"), chunk_rows=2)
+    assert not (tmp_path / "big.xlsx").exists()
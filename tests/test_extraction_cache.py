@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction_cache import ExtractionCache  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not ExtractionCache.available(), reason="pyarrow not installed")
+
+
+def test_round_trip_keeps_tables_without_rows(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    pages = [
+        [[["HAWB", "Pcs"], ["1Z1", "2"]], [], [["HAWB"]], []],
+        [],
+        [[["only header"]]],
+    ]
+    cache.put("entry", pages)
+    assert cache.get("entry") == pages
+
+
+def test_key_follows_content(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"one")
+    first = cache.key(str(pdf), {"x": 1})
+    assert cache.key(str(pdf), {"x": 1}) == first
+    assert cache.key(str(pdf), {"x": 2}) != first
+    pdf.write_bytes(b"two!")
+    assert cache.key(str(pdf), {"x": 1}) != first
+
+
+def test_foreign_entry_is_a_miss_and_evicted(tmp_path):
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+
+    cache = ExtractionCache(str(tmp_path))
+    path = tmp_path / "entry.arrow"
+    table = pa.table({"x": [1, 2]})
+    with pa.OSFile(str(path), "wb") as sink, pa_ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    assert cache.get("entry") is None
+    assert cache.stats()["misses"] == 1
+    assert not path.exists()
+
+
+def test_failed_put_leaves_no_temp_file(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path))
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        cache.put("entry", [[[["a"]]]])
+    with pytest.raises(OSError):
+        cache.put_json("entry", {"a": 1})
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hawb_join import ChildIndex, left_join  # noqa: E402
+
+
+def test_first_child_row_wins_and_blanks_never_match():
+    child = pd.DataFrame({
+        "HAWB": ["B", "A", "", None, "B", "C", "A"],
+        "secondary": ["b1", "a1", "blank", "none", "b2", "c1", "a2"],
+    }, index=[10, 11, 12, 13, 14, 15, 16])
+    index = ChildIndex(child)
+
+    assert len(index) == 3
+    assert index.duplicate_keys == ["A", "B"]
+    assert index.dropped_rows == 2
+    np.testing.assert_array_equal(index.codes(["A", "B", "C", "", None, "Z"]), [1, 0, 2, -1, -1, -1])
+
+    parent = pd.DataFrame({"HAWB": ["C", "", "A", "Z"], "Pcs": ["1", "2", "3", "4"]})
+    joined, report = left_join(parent, index)
+    assert joined["secondary"].tolist()[0] == "c1"
+    assert joined["secondary"].tolist()[2] == "a1"
+    assert joined["secondary"].isna().tolist() == [False, True, False, True]
+    assert report.matched_rows == 2
+
+
+def test_join_matches_merge_on_unique_keys():
+    parent = pd.DataFrame({"HAWB": ["H1", "H2", "H3", "H2"], "Pcs": ["1", "2", "3", "4"]})
+    child = pd.DataFrame({"HAWB": ["H2", "H1", "H9"], "Pcs": ["x", "y", "z"], "secondary": ["s2", "s1", "s9"]})
+    joined, _ = left_join(parent, ChildIndex(child))
+    merged = pd.merge(parent, child, on="HAWB", how="left", suffixes=("_parent", "_child"))
+    pd.testing.assert_frame_equal(joined, merged)
+
+
+def test_codes_agree_for_small_and_large_parent_frames():
+    index = ChildIndex(pd.DataFrame({"HAWB": ["B", "A", "C"], "secondary": ["b", "a", "c"]}))
+    keys = ["C", "", "A", None, "Z", "B"]
+    np.testing.assert_array_equal(index.codes(keys[:2]), [2, -1])
+    np.testing.assert_array_equal(index.codes(keys), [2, -1, 1, -1, -1, 0])
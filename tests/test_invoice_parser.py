@@ -0,0 +1,156 @@
+import os
+import random
+import re
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import invoice_extract  # noqa: E402
+from invoice_extract import (  # noqa: E402
+    parse_all_numbers,
+    parse_commodity_and_grossmass,
+    parse_item_price,
+    parse_marks_and_description,
+)
+from invoice_parser import scan_block  # noqa: E402
+from synthetic import make_block  # noqa: E402
+
+
+def legacy_block(col1_cells, col12_cells, col16_cells):
+    """The block-parsing steps as extract_filtered_data_with_following_rows used to run them."""
+    filtered_lines = [ln for ln in col1_cells if ln.strip().lower() != "marks"]
+    col1_text = " ".join(filtered_lines).strip()
+    col1_text = re.sub(r"(?i)(1Z[A-Za-z0-9]+)(marks)", r"\1 Marks", col1_text)
+    container_number, description = parse_marks_and_description(col1_text)
+
+    col12_text = " ".join(col12_cells).strip()
+    commodity_code, gross_mass = parse_commodity_and_grossmass(col12_text)
+
+    col16_text = " ".join(col16_cells).strip()
+    item_price = parse_item_price(col16_text)
+
+    if not item_price:
+        combined_text = f"{col12_text} {col16_text}"
+        combined_nums = parse_all_numbers(combined_text)
+        if combined_nums:
+            if gross_mass in combined_nums:
+                combined_nums.remove(gross_mass)
+            if combined_nums:
+                item_price = combined_nums[-1]
+
+    return {
+        "Marks & Nosof Packages": container_number,
+        "Description": description,
+        "Commodity_Code": commodity_code,
+        "Gross_Mass": gross_mass,
+        "Item_Price": item_price,
+    }
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_scan_block_matches_legacy_parsers(seed):
+    rng = random.Random(seed)
+    for _ in range(5000):
+        block = make_block(rng)
+        assert scan_block(*block).as_row() == legacy_block(*block), block
+
+
+@pytest.mark.parametrize("block", [
+    (["Marks", "1Z999AA10123456784of", "Description: BRAKE PADS"],
+     ["33 Commodity (HS) Code870830", "35 Gross Mass (Kg)12.50"],
+     ["1,234.56"]),
+    (["Number and kind 4 PK", "description:  spare "],
+     ["33 Commodity (HS) Code8708300010", "35 Gross Mass (Kg)KG3.20", "1,522,140.38"],
+     ["42", ""]),
+    ([], [], []),
+])
+def test_scan_block_hand_written_cases(block):
+    assert scan_block(*block).as_row() == legacy_block(*block)
+
+
+def test_scan_block_fields():
+    fields = scan_block(
+        ["Marks", "1Z999AA10123456784marks", "Description: BRAKE PADS"],
+        ["33 Commodity (HS) Code87083000", "35 Gross Mass (Kg)12.50", "7.00"],
+        [""],
+    )
+    assert fields.container_number == "1Z999AA10123456784"
+    assert fields.description == "BRAKE PADS"
+    assert fields.commodity_code == "870830"
+    assert fields.gross_mass == "12.50"
+    assert fields.item_price == "7.00"
+
+
+def _page(columns):
+    """One raw table: an anchor row and four rows below, cells placed by column."""
+    width = max(columns) + 1
+    rows = [["" for _ in range(width)] for _ in range(5)]
+    for column, cells in columns.items():
+        for r, text in enumerate(cells):
+            rows[r][column] = text
+    return [rows]
+
+
+LATTICE_PAGE = _page({
+    1: ["31 Packages", "1Z999AA10123456784", "Description: BRAKE PADS"],
+    12: ["33 Commodity (HS) Code87083000", "35 Gross Mass (Kg)12.50"],
+    16: ["1,234.56"],
+})
+# The same block as stream splits it: anchor found, fields in other columns.
+STREAM_PAGE = _page({
+    0: ["31 Packages", "1Z999AA10123456784", "Description: BRAKE PADS"],
+    3: ["33 Commodity (HS) Code87083000", "35 Gross Mass (Kg)12.50"],
+    4: ["12"],
+    5: ["1,234.56"],
+})
+# Stream output whose fields are merged into the anchor's cells.
+MERGED_PAGE = _page({
+    0: ["31 Packages", "1Z999AA10123456784 33 Commodity (HS) Code 35 Gross Mass (Kg)"],
+})
+
+
+def _rows(page):
+    return invoice_extract.parse_blocks(pd.DataFrame(raw) for raw in page)[0]
+
+
+def test_stream_columns_are_mapped_by_position():
+    assert _rows(STREAM_PAGE) == _rows(LATTICE_PAGE)
+    assert _rows(LATTICE_PAGE)[0]["Item_Price"] == "1,234.56"
+
+
+@pytest.mark.parametrize("first", ["stream", "lattice"])
+def test_auto_parses_each_page_once(monkeypatch, first):
+    by_flavor = {"lattice": LATTICE_PAGE, "stream": STREAM_PAGE}
+    calls = []
+
+    def fake_read(pdf_path, page_numbers, flavor="lattice"):
+        calls.append(flavor)
+        return [(n, by_flavor[flavor]) for n in page_numbers]
+
+    monkeypatch.setattr(invoice_extract, "read_invoice_pages", fake_read)
+    index = invoice_extract.PageIndex(page_count=1, anchor_pages=[1], ruled_pages=[1] if first == "lattice" else [])
+    pages = invoice_extract._camelot_tables("x.pdf", [1], index, "auto", max_workers=1)
+
+    assert pages == [by_flavor[first]]
+    assert calls == [first]
+
+
+def test_auto_retries_pages_whose_blocks_parse_empty(monkeypatch):
+    by_flavor = {"lattice": LATTICE_PAGE, "stream": MERGED_PAGE}
+    calls = []
+
+    def fake_read(pdf_path, page_numbers, flavor="lattice"):
+        calls.append(flavor)
+        return [(n, by_flavor[flavor]) for n in page_numbers]
+
+    monkeypatch.setattr(invoice_extract, "read_invoice_pages", fake_read)
+    index = invoice_extract.PageIndex(page_count=1, anchor_pages=[1], ruled_pages=[])
+    pages = invoice_extract._camelot_tables("x.pdf", [1], index, "auto", max_workers=1)
+
+    assert pages == [LATTICE_PAGE]
+    assert calls == ["stream", "lattice"]
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ExtractInvoiceData  # noqa: E402
+from ExtractInvoiceData import DataFrameTableModel, InvoiceQueueThread  # noqa: E402
+from tracing import Trace  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def _frame(name, rows):
+    return pd.DataFrame({"File": [name] * rows, "Value": [f"{name}{i}" for i in range(rows)]})
+
+
+def test_model_inserts_frames_in_place(app):
+    model = DataFrameTableModel(pd.DataFrame())
+    inserted = []
+    model.rowsInserted.connect(lambda _, first, last: inserted.append((first, last)))
+
+    model.insert_frame(0, _frame("c", 2))
+    model.insert_frame(0, _frame("a", 3))
+    model.insert_frame(1, _frame("b", 1))
+
+    assert model.rowCount() == 6
+    shown = [model.data(model.index(r, 1)) for r in range(model.rowCount())]
+    assert shown == ["a0", "a1", "a2", "b0", "c0", "c1"]
+    # Only the new rows are announced once the columns are known.
+    assert inserted == [(0, 2), (3, 3)]
+    assert model.frame()["Value"].tolist() == shown
+
+
+def _crash(pdf_path, max_workers=None, use_records=False):
+    os._exit(1)
+
+
+def test_broken_pool_fails_the_remaining_files(app, monkeypatch):
+    monkeypatch.setattr(ExtractInvoiceData, "extract_file", _crash)
+    thread = InvoiceQueueThread(workers=2, trace=Trace("test"))
+    finished = []
+    thread.file_finished.connect(lambda index, df, error, seconds: finished.append((index, error)))
+    for index in range(4):
+        thread.add(index, f"file{index}.pdf")
+
+    thread.run()
+
+    assert sorted(index for index, _ in finished) == [0, 1, 2, 3]
+    assert all(error for _, error in finished)
+    # The queue no longer takes files; the page starts a new one.
+    assert not thread.add(4, "file4.pdf")
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jobs  # noqa: E402
+from cargo_manifest import ExtractionCancelled  # noqa: E402
+from jobs import (  # noqa: E402
+    KIND_INVOICE,
+    STATUS_CANCELLED,
+    STATUS_QUEUED,
+    STATUS_RUNNING,
+    JobManager,
+    JobStore,
+    process_owner,
+)
+
+
+def _store(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF")
+    return JobStore(str(tmp_path / "jobs")), {"files": [str(pdf)]}
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_requeue_only_jobs_whose_owner_is_gone(tmp_path):
+    store, inputs = _store(tmp_path)
+    host = process_owner().rpartition(":")[0]
+    live = store.add(KIND_INVOICE, inputs)
+    dead = store.add(KIND_INVOICE, inputs)
+    stale = store.add(KIND_INVOICE, inputs)
+    cancelled = store.add(KIND_INVOICE, inputs)
+
+    # A live process on this host: the parent of the test run.
+    store.claim_next(owner=f"{host}:{os.getppid()}")
+    store.claim_next(owner=f"{host}:{_dead_pid()}")
+    store.claim_next(owner="elsewhere:1")
+    store.claim_next(owner=f"{host}:{_dead_pid()}")
+    store.cancel(cancelled.id)
+    with sqlite3.connect(store.db_path) as db:
+        db.execute("UPDATE jobs SET heartbeat_at = 0 WHERE id = ?", (stale.id,))
+
+    assert store.requeue_interrupted(live_owner=process_owner()) == 3
+    assert store.get(live.id).status == STATUS_RUNNING
+    assert store.get(dead.id).status == STATUS_QUEUED
+    assert store.get(dead.id).owner is None
+    assert store.get(stale.id).status == STATUS_QUEUED
+    assert store.get(cancelled.id).status == STATUS_CANCELLED
+
+
+def test_old_store_gains_owner_columns(tmp_path):
+    root = tmp_path / "jobs"
+    root.mkdir()
+    with sqlite3.connect(root / "jobs.sqlite3") as db:
+        db.execute(
+            "CREATE TABLE jobs (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, kind TEXT NOT NULL, "
+            "status TEXT NOT NULL, inputs TEXT NOT NULL, size_bytes INTEGER NOT NULL DEFAULT 0, "
+            "submitted_at REAL NOT NULL, started_at REAL, finished_at REAL, done INTEGER NOT NULL DEFAULT 0, "
+            "total INTEGER NOT NULL DEFAULT 0, message TEXT NOT NULL DEFAULT '', error TEXT NOT NULL DEFAULT '', "
+            "rows INTEGER, result TEXT, uploads TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0)"
+        )
+        db.execute("INSERT INTO jobs (id, kind, status, inputs, submitted_at) VALUES ('old', 'invoice', 'running', '{}', 0)")
+
+    store = JobStore(str(root))
+    # Rows from before owners were recorded count as interrupted.
+    assert store.requeue_interrupted() == 1
+    assert store.get("old").status == STATUS_QUEUED
+
+
+def _run_until_stopped(root, job_id):
+    store = JobStore(root)
+    while not store.cancel_requested(job_id):
+        time.sleep(0.01)
+    raise ExtractionCancelled()
+
+
+def test_close_requeues_running_jobs_without_waiting_for_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "run_job", _run_until_stopped)
+    store, inputs = _store(tmp_path)
+    manager = JobManager(store, workers=1, executor=ThreadPoolExecutor(max_workers=1))
+    manager.start()
+    job = manager.submit(KIND_INVOICE, inputs)
+    deadline = time.monotonic() + 10
+    while store.get(job.id).status != STATUS_RUNNING and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    t0 = time.monotonic()
+    manager.close()
+    assert time.monotonic() - t0 < 5
+    after = store.get(job.id)
+    assert after.status == STATUS_QUEUED
+    assert not after.cancel_requested
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import manifest_stream  # noqa: E402
+from cargo_manifest import (  # noqa: E402
+    build_frame,
+    combine_children,
+    combine_parents,
+    expand_secondary_to_master_baby,
+    join_parent_child,
+    rename_columns_child,
+    rename_columns_parent,
+    select_final_columns,
+)
+from exporters import get_exporter  # noqa: E402
+from synthetic import make_child_tables, make_parent_tables  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not manifest_stream.available(), reason="pyarrow not installed")
+
+
+def _spill(store, pages, rename, pages_per_chunk=3):
+    for start in range(0, len(pages), pages_per_chunk):
+        chunk = pages[start:start + pages_per_chunk]
+        store.append(build_frame((tbl for tables in chunk for tbl in tables), rename=rename))
+
+
+@pytest.mark.parametrize("partitions", [1, 4])
+def test_partitioned_join_writes_the_in_memory_result(tmp_path, partitions):
+    parent_pages = make_parent_tables(3000)
+    child_pages = make_child_tables(3000)
+    # A repeated child HAWB (first row wins) and a blank one (never matches).
+    child_pages[1][0][5] = list(child_pages[0][0][1])
+    child_pages[2][0][3][child_pages[2][0][0].index("HAWB\nShipment")] = ""
+
+    merged, expected_report = join_parent_child(combine_parents([parent_pages]), combine_children([child_pages]))
+    expected = select_final_columns(expand_secondary_to_master_baby(merged)).reset_index(drop=True)
+
+    parents = manifest_stream.SpillStore(str(tmp_path), "parent", partitions=partitions)
+    children = manifest_stream.SpillStore(str(tmp_path), "child", partitions=partitions, seq=False)
+    _spill(parents, parent_pages, rename_columns_parent)
+    _spill(children, child_pages, rename_columns_child)
+    out = str(tmp_path / "out.parquet")
+    result = manifest_stream.write_compare(parents, children, out, get_exporter("parquet"), chunk_rows=700)
+
+    got = pd.read_parquet(out)
+    assert result.rows_written == len(expected)
+    pd.testing.assert_frame_equal(got.astype(object).fillna(""), expected.astype(object).fillna(""))
+    assert expected_report.duplicate_keys
+    assert result.report.duplicate_keys == expected_report.duplicate_keys
+    assert result.report.matched_rows == expected_report.matched_rows
+    # The joined partitions are removed once written.
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(p) for p in parents.parts + children.parts]
+                                                  + ["out.parquet"])
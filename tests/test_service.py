@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service import ExtractionService  # noqa: E402
+
+
+def test_dead_worker_replaces_the_pool(tmp_path):
+    service = ExtractionService(workers=1, jobs_dir=str(tmp_path / "jobs"), job_workers=1)
+    try:
+        broken = service.pool
+        with pytest.raises(RuntimeError, match="pool was restarted"):
+            service._run(os._exit, 1)
+
+        assert service.pool is not broken
+        assert service._run(abs, -3) == 3
+        snapshot = service.metrics.snapshot()
+        assert snapshot["pool_restarts"] == 1
+        assert "BrokenProcessPool" in snapshot["last_pool_failure"]
+    finally:
+        service.close()
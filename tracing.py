@@ -0,0 +1,212 @@
+"""
+Stage timings for the compare and invoice pipelines.
+
+A Trace collects one Span per pipeline stage (extraction, merge, expansion,
+preview model, export, ...) with its wall time and, where the stage knows
+them, the rows and pages it handled. Pipeline functions take an optional
+trace and wrap their stages in stage(trace, name); without a trace that is
+a no-op, so headless callers pay nothing.
+
+Setting XTRACTPDF_PROFILE=cprofile (or pyinstrument, when installed) also
+profiles the thread that runs the trace. Only the calling thread is
+profiled; pages parsed in worker processes show up as time spent waiting
+on the pool.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:  # cProfile is always there
+    InstrumentProfiler = None
+
+
+PROFILE_ENV = "XTRACTPDF_PROFILE"
+PROFILE_CPROFILE = "cprofile"
+PROFILE_PYINSTRUMENT = "pyinstrument"
+
+# Functions listed in the JSON export of a cProfile capture, by cumulative time.
+PROFILE_TOP_FUNCTIONS = 30
+
+# Slowest stages spelled out in Trace.summary().
+SUMMARY_MAX_STAGES = 3
+
+
+def profile_mode() -> Optional[str]:
+    """Capture mode requested through XTRACTPDF_PROFILE, None when profiling is off."""
+    mode = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if mode in ("", "0", "off", "none"):
+        return None
+    if mode == PROFILE_PYINSTRUMENT and InstrumentProfiler is not None:
+        return PROFILE_PYINSTRUMENT
+    return PROFILE_CPROFILE
+
+
+@dataclass
+class Span:
+    name: str
+    start: float = 0.0  # seconds since the trace started
+    seconds: float = 0.0
+    rows: Optional[int] = None
+    pages: Optional[int] = None
+    info: Dict[str, Any] = field(default_factory=dict)
+
+    def label(self) -> str:
+        counts = []
+        if self.pages is not None:
+            counts.append(f"{self.pages} pages")
+        if self.rows is not None:
+            counts.append(f"{self.rows} rows")
+        extra = f" ({', '.join(counts)})" if counts else ""
+        return f"{self.name} {_seconds(self.seconds)}{extra}"
+
+
+def _seconds(value: float) -> str:
+    return f"{value:.2f}s" if value < 10 else f"{value:.1f}s"
+
+
+class Trace:
+    """
+    Stage timings of one pipeline run. Use it as a context manager around
+    the run so the total (and the profile, if one is captured) covers it.
+    """
+
+    def __init__(self, name: str, profile: Optional[str] = None):
+        self.name = name
+        self.profile = profile
+        self.spans: List[Span] = []
+        self.info: Dict[str, Any] = {}
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._total: Optional[float] = None
+        self._profiler = None
+        self._profile_result: Optional[Dict[str, Any]] = None
+
+    def __enter__(self) -> "Trace":
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        if self.profile == PROFILE_PYINSTRUMENT:
+            self._profiler = InstrumentProfiler()
+            self._profiler.start()
+        elif self.profile == PROFILE_CPROFILE:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler is not None:
+            if self.profile == PROFILE_PYINSTRUMENT:
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+        self._total = time.perf_counter() - self._t0
+
+    @property
+    def total_seconds(self) -> float:
+        return self._total if self._total is not None else time.perf_counter() - self._t0
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None, pages: Optional[int] = None) -> Iterator[Span]:
+        """Times the with-block as one span; set span.rows / span.pages inside it."""
+        span = Span(name, start=time.perf_counter() - self._t0, rows=rows, pages=pages)
+        t0 = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - t0
+            self.spans.append(span)
+
+    def add(self, name: str, seconds: float, rows: Optional[int] = None, pages: Optional[int] = None) -> Span:
+        """Records a stage timed elsewhere (e.g. in another thread)."""
+        span = Span(name, start=time.perf_counter() - self._t0 - seconds, seconds=seconds, rows=rows, pages=pages)
+        self.spans.append(span)
+        return span
+
+    def summary(self, max_stages: int = SUMMARY_MAX_STAGES) -> str:
+        """One status-line sentence: the total and the slowest stages."""
+        slowest = sorted(self.spans, key=lambda s: s.seconds, reverse=True)[:max_stages]
+        if not slowest:
+            return f"Took {_seconds(self.total_seconds)}."
+        return f"Took {_seconds(self.total_seconds)}: " + ", ".join(s.label() for s in slowest) + "."
+
+    def details(self) -> str:
+        """Every stage on its own line, in the order they ran."""
+        lines = [f"{self.name}: {_seconds(self.total_seconds)}"]
+        lines += [f"  {s.label()}" for s in self.spans]
+        return "\n".join(lines)
+
+    def profile_stats(self) -> Optional[Dict[str, Any]]:
+        """The captured profile in JSON-friendly form, None when nothing was captured."""
+        if self._profiler is None or self._total is None:
+            return None
+        if self._profile_result is not None:
+            return self._profile_result
+
+        if self.profile == PROFILE_PYINSTRUMENT:
+            self._profile_result = {"mode": PROFILE_PYINSTRUMENT, "text": self._profiler.output_text()}
+            return self._profile_result
+
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        top = []
+        for func in stats.fcn_list[:PROFILE_TOP_FUNCTIONS]:
+            calls, primitive, tottime, cumtime, _ = stats.stats[func]
+            filename, line, function = func
+            top.append({
+                "function": f"{os.path.basename(filename)}:{line}({function})",
+                "calls": calls,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6),
+            })
+        self._profile_result = {"mode": PROFILE_CPROFILE, "top": top}
+        return self._profile_result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "total_seconds": self.total_seconds,
+            "info": self.info,
+            "stages": [asdict(s) for s in self.spans],
+            "profile": self.profile_stats(),
+        }
+
+    def write_json(self, path: str) -> List[str]:
+        """
+        Writes the trace to path. A captured profile is also saved in full
+        next to it (<path>.prof for pstats / snakeviz, .html for pyinstrument).
+        Returns the paths written.
+        """
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, indent=2, default=str)
+        written = [path]
+
+        if self._profiler is not None and self._total is not None:
+            base = os.path.splitext(path)[0]
+            if self.profile == PROFILE_PYINSTRUMENT:
+                with open(base + ".html", "w", encoding="utf-8") as fh:
+                    fh.write(self._profiler.output_html())
+                written.append(base + ".html")
+            else:
+                self._profiler.dump_stats(base + ".prof")
+                written.append(base + ".prof")
+        return written
+
+
+@contextmanager
+def stage(
+    trace: Optional[Trace], name: str, rows: Optional[int] = None, pages: Optional[int] = None
+) -> Iterator[Span]:
+    """trace.stage(...), or a throwaway span when there is no trace."""
+    if trace is None:
+        yield Span(name, rows=rows, pages=pages)
+        return
+    with trace.stage(name, rows=rows, pages=pages) as span:
+        yield span